@@ -0,0 +1,89 @@
+'''
+Benchmarks the keep-alive connection pool of SessionWithUrlBase against a local
+stub server. Each "scenario" makes the same requests as a scenario update in
+scenario_from_csv.py: properties, sliders, heat network orders, custom curves and queries.
+
+Run with: python benchmarks/connection_pool.py [number_of_scenarios]
+'''
+import sys
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.settings import Settings
+
+CURVES_PER_SCENARIO = 14
+HEAT_NETWORK_ORDERS = ['lt', 'mt', 'ht']
+REQUESTS_PER_SCENARIO = 3 + len(HEAT_NETWORK_ORDERS) + CURVES_PER_SCENARIO
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''Answers every request with a small JSON body, keeping the connection open'''
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        body = json.dumps({'id': 1, 'end_year': 2050, 'gqueries': {}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+def scenario_requests(session, headers):
+    '''The requests made for a single scenario update and query'''
+    session.put('/scenarios/1', json={'scenario': {'keep_compatible': False}}, headers=headers)
+    session.put('/scenarios/1', json={'scenario': {'user_values': {}}}, headers=headers)
+
+    for network in HEAT_NETWORK_ORDERS:
+        session.put('/scenarios/1/heat_network_order', json={'subtype': network}, headers=headers)
+
+    for index in range(CURVES_PER_SCENARIO):
+        session.put(f'/scenarios/1/custom_curves/curve_{index}',
+            files={'file': ('curve', '\n'.join(['0.0'] * 8760))}, headers=headers)
+
+    session.put('/scenarios/1', json={'detailed': True, 'gqueries': []}, headers=headers)
+
+
+def time_per_scenario(session, scenarios, headers=None):
+    start = time.perf_counter()
+    for _ in range(scenarios):
+        scenario_requests(session, headers)
+
+    return (time.perf_counter() - start) / scenarios
+
+
+if __name__ == '__main__':
+    scenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    Settings.add('personal_etm_token', None)
+    Settings.add('proxy_servers', None)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    closing = time_per_scenario(SessionWithUrlBase(base_url), scenarios, {'Connection': 'close'})
+    pooled = time_per_scenario(SessionWithUrlBase(base_url), scenarios)
+
+    server.shutdown()
+
+    print(f'Scenarios: {scenarios}, requests per scenario: {REQUESTS_PER_SCENARIO}')
+    print(f'Connection: close  {closing * 1000:8.2f} ms per scenario')
+    print(f'Keep-alive pool    {pooled * 1000:8.2f} ms per scenario')
+    print(f'Speedup            {closing / pooled:8.2f}x')
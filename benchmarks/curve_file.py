@@ -0,0 +1,61 @@
+'''
+Benchmarks loading a curve file with 300 price curves, against the original string
+based loading and validation. Also shows loading the same curves from a curve store.
+
+Run with: python benchmarks/curve_file.py
+'''
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from helpers.Curves import CurveFile
+from helpers.curve_store import CurveStore
+from helpers.file_helpers import read_csv
+from helpers.settings import Settings
+
+COLUMNS = 300
+
+
+def reference_load(file_name):
+    '''The original string based loading'''
+    data_df = read_csv(file_name, curve=True, silent=True, dtype=str)
+    data_df.apply(lambda s: pd.to_numeric(s, errors='coerce').notnull().all()).all()
+
+    return {key: column for key, column in data_df.items()}
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        Settings.add('input_curves_folder', folder)
+        pd.DataFrame(
+            np.random.default_rng(1337).uniform(0, 200, (8760, COLUMNS)).round(2),
+            columns=[f'interconnector_{i}_price' for i in range(COLUMNS)]
+        ).to_csv(Path(folder) / 'prices.csv', index=False)
+
+        reference_time = timed(reference_load, 'prices')
+        new_time = timed(lambda: CurveFile(
+            'prices', read_csv('prices', curve=True, silent=True)))
+
+        CurveStore.from_curve_file(Path(folder) / 'prices.csv')
+        store_time = timed(CurveFile.from_csv, 'prices')
+
+    print(f'String based loading   {reference_time * 1000:10.2f} ms')
+    print(f'Numeric loading        {new_time * 1000:10.2f} ms')
+    print(f'Speedup                {reference_time / new_time:10.1f}x')
+    print(f'From a curve store     {store_time * 1000:10.2f} ms')
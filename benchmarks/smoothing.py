@@ -0,0 +1,69 @@
+'''
+Benchmarks calculate_smoothed_demand against the original list based smoothing,
+on a full year house heat demand curve from the test fixtures.
+
+Run with: python benchmarks/smoothing.py
+'''
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from helpers.heat_demand import smoothing
+from helpers.heat_demand.config import insulation_config
+from helpers.heat_demand.house import House, calculate_heat_demand_curves
+from helpers.heat_file_utils import read_heat_demand_input, read_thermostat
+from helpers.settings import Settings
+
+
+def reference_smoothed_demand(heat_demand, insulation_type):
+    '''The original list based smoothing'''
+    steps = smoothing.INTERPOLATION_STEPS
+    deviations = smoothing.generate_deviations(smoothing.NUMBER_OF_HOUSES,
+        smoothing.HOURS_SHIFTED[insulation_type])
+
+    interpolated = []
+    for index, value in enumerate(heat_demand):
+        stop = heat_demand[0] if index == len(heat_demand) - 1 else heat_demand[index + 1]
+        interpolated.extend(value + i * (stop - value) / steps for i in range(steps))
+
+    cumulative = [0] * len(interpolated)
+    for num in deviations:
+        cumulative = [x + y for x, y in zip(cumulative, np.roll(interpolated, num))]
+
+    cumulative = np.roll(cumulative, steps // 2)
+    return [sum(cumulative[i:(i + steps)]) / steps for i in range(0, len(cumulative), steps)]
+
+
+def timed(function, *args, repeat=1):
+    '''Returns the result and the best time of the function with a fresh random seed'''
+    best = float('inf')
+    for _ in range(repeat):
+        np.random.seed(1337)
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return result, best
+
+
+if __name__ == '__main__':
+    Settings.add('input_curves_folder', 'tests/fixtures/')
+
+    house = House('terraced_houses', 'high', read_thermostat('heat_demand'))
+    heat_demand = calculate_heat_demand_curves(
+        [house],
+        read_heat_demand_input('heat_demand', 'temperature'),
+        insulation_config.from_J_cm2_to_Kwh_m2(read_heat_demand_input('heat_demand', 'irradiation'))
+    )[:, 0]
+
+    expected, reference_time = timed(reference_smoothed_demand, heat_demand, 'high')
+    smoothed, new_time = timed(smoothing.calculate_smoothed_demand, heat_demand, 'high', repeat=10)
+
+    print(f'List based smoothing   {reference_time * 1000:10.2f} ms')
+    print(f'Convolution smoothing  {new_time * 1000:10.2f} ms')
+    print(f'Speedup                {reference_time / new_time:10.0f}x')
+    print(f'Max relative deviation {np.max(np.abs(smoothed - expected) / np.max(np.abs(expected))):10.2e}')
@@ -0,0 +1,295 @@
+'''
+Benchmark suite for the heat demand and data preparation hot paths. The heat demand
+benchmarks use the weather inputs in tests/fixtures and data/input/curves/dummy_weather_data,
+the others generate large synthetic inputs.
+
+Results are stored per commit in benchmarks/results/<commit>.json. Compare two commits
+to find regressions: compare exits with an error when a benchmark got slower than the
+threshold.
+
+Run with:       python benchmarks/suite.py run [--repeat 5] [--only smoothing ...]
+Compare with:   python benchmarks/suite.py compare [base] [head] [--threshold 10]
+                (base defaults to the latest other results, head to the current commit)
+'''
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from generate_input import process_data
+from helpers.buildings_profile_helper import BuildingsModel
+from helpers.Curves import CurveFile
+from helpers.heat_demand import smoothing
+from helpers.heat_demand.config import insulation_config
+from helpers.heat_demand.house import House, calculate_heat_demand_curves
+from helpers.heat_demand.weather_years_profile_generator import WeatherYearsGenerator
+from helpers.heat_file_utils import load_g2a_parameters, read_heat_demand_input, read_thermostat
+from helpers.settings import Settings
+from helpers.Template import Template, TemplateCollection
+
+RESULTS_FOLDER = Path(__file__).resolve().parent / 'results'
+DUMMY_WEATHER = ('data/input/curves', 'dummy_weather_data')
+FIXTURE_WEATHER = ('tests/fixtures', 'heat_demand')
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=None):
+    '''
+    Registers a benchmark. The decorated function sets up the inputs in the given
+    temporary folder and returns the function to time.
+    '''
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat)
+        return setup
+
+    return register
+
+
+def weather_inputs(location):
+    '''Reads the weather inputs of a heat_demand folder'''
+    folder, heat_demand = location
+    Settings.add('input_curves_folder', folder)
+
+    inputs = {
+        'temp': read_heat_demand_input(heat_demand, 'temperature'),
+        'irr': read_heat_demand_input(heat_demand, 'irradiation'),
+        'therm': read_thermostat(heat_demand)
+    }
+    if (Path(folder) / heat_demand / 'wind_speed.csv').exists():
+        inputs['wind_speed'] = read_heat_demand_input(heat_demand, 'wind_speed')
+        inputs['g2a_params'] = load_g2a_parameters(heat_demand)
+
+    return inputs
+
+
+# HEAT DEMAND -----------------------------------------------------------------
+
+@benchmark('calculate_smoothed_demand')
+def smoothed_demand(_):
+    inputs = weather_inputs(FIXTURE_WEATHER)
+    heat_demand = calculate_heat_demand_curves(
+        [House('terraced_houses', 'high', inputs['therm'])],
+        inputs['temp'],
+        insulation_config.from_J_cm2_to_Kwh_m2(inputs['irr'])
+    )[:, 0]
+
+    return lambda: smoothing.calculate_smoothed_demand(heat_demand, 'high')
+
+
+@benchmark('generate_house_profiles')
+def house_profiles(_):
+    generator = WeatherYearsGenerator(**weather_inputs(DUMMY_WEATHER))
+
+    def generate():
+        np.random.seed(smoothing.RANDOM_SEED)
+        return generator.generate_house_profiles()
+
+    return generate
+
+
+@benchmark('make_heat_demand_profile')
+def heat_demand_profile(_):
+    generator = WeatherYearsGenerator(**weather_inputs(DUMMY_WEATHER))
+
+    return lambda: generator._make_heat_demand_profile(generator.temp, generator.wind_speed)
+
+
+@benchmark('buildings_make_heat_demand_profile')
+def buildings_profile(_):
+    Settings.add('input_curves_folder', DUMMY_WEATHER[0])
+    model = BuildingsModel()
+    model.load_from_folder(DUMMY_WEATHER[1])
+
+    return lambda: model.make_heat_demand_profile(model.temperature, model.wind_speed)
+
+
+# DATA PREPARATION ------------------------------------------------------------
+
+@benchmark('curve_file_from_csv')
+def curve_file(folder):
+    Settings.add('input_curves_folder', str(folder))
+    pd.DataFrame(
+        np.random.default_rng(1337).uniform(0, 200, (8760, 100)).round(2),
+        columns=[f'interconnector_{i}_price' for i in range(100)]
+    ).to_csv(folder / 'prices.csv', index=False)
+
+    return lambda: CurveFile.from_csv('prices')
+
+
+@benchmark('process_data', repeat=3)
+def generate_input(folder, variables=300, samples=2000):
+    '''A param_encoding.csv with 300 variables for 2000 samples, among 1500 inputs'''
+    rng = np.random.default_rng(1337)
+
+    with open(folder / 'all_var.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['header'] * 21)
+        for index in range(1500):
+            row = [''] * 21
+            row[0], row[20] = str(index), f'input_{index}'
+            row[1] = 'Variable' if index < variables else 'Static'
+            row[12] = '' if index < variables else f'{index % 100}%'
+            writer.writerow(row)
+
+    with open(folder / 'param_encoding.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['var'] + [f's{k}' for k in range(samples)])
+        for index in range(variables):
+            writer.writerow([str(index)] + list(rng.uniform(0, 100, samples).round(3).astype(str)))
+
+    return lambda: process_data(folder / 'all_var.csv', folder / 'param_encoding.csv', output_dir=folder / 'input')
+
+
+@benchmark('template_collection_to_csv', repeat=1)
+def templates_to_csv(folder, templates=50, inputs=1500):
+    '''50 templates, each with user values for a random 800 of 1500 inputs'''
+    Settings.add('output_file_folder', str(folder))
+    rng = np.random.default_rng(1337)
+
+    collection = []
+    for index in range(templates):
+        template = Template(pd.Series({'id': index + 1, 'title': f'template_{index}'}))
+        keys = rng.choice(inputs, 800, replace=False)
+        template.add_user_values({f'input_{key}': float(value) for key, value in zip(keys, rng.uniform(0, 100, 800))})
+        collection.append(template)
+
+    return lambda: TemplateCollection(collection).to_csv('template_settings')
+
+
+# RUNNING AND COMPARING -------------------------------------------------------
+
+def run(names, repeat):
+    '''Runs the benchmarks, returns the best and median time of each in ms'''
+    results = {}
+    for name in names:
+        setup, default_repeat = BENCHMARKS[name]
+
+        with tempfile.TemporaryDirectory() as folder:
+            function = setup(Path(folder))
+
+            times = []
+            for _ in range(default_repeat or repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    function()
+                    times.append((time.perf_counter() - start) * 1000)
+
+        results[name] = {'best_ms': min(times), 'median_ms': float(np.median(times)), 'repeat': len(times)}
+        print(f'{name:40} {results[name]["best_ms"]:10.2f} ms')
+
+    return results
+
+
+def current_commit():
+    '''The short hash of HEAD, with -dirty when there are uncommitted changes'''
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+        capture_output=True, text=True, check=True).stdout.strip()
+    dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+        capture_output=True, text=True, check=True).stdout.strip()
+
+    return f'{commit}-dirty' if dirty else commit
+
+
+def save(commit, results):
+    RESULTS_FOLDER.mkdir(exist_ok=True)
+    path = RESULTS_FOLDER / f'{commit}.json'
+
+    # Keep the results of benchmarks that were not run this time
+    previous = json.loads(path.read_text())['results'] if path.exists() else {}
+    with open(path, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            'results': {**previous, **results}
+        }, f, indent=2)
+
+    return path
+
+
+def load(commit):
+    path = RESULTS_FOLDER / f'{commit}.json'
+    if not path.exists():
+        raise SystemExit(f'No benchmark results for {commit}, run the suite on that commit first')
+
+    return json.loads(path.read_text())
+
+
+def latest_other(commit):
+    '''The commit with the most recent results other than commit'''
+    others = [json.loads(path.read_text()) for path in RESULTS_FOLDER.glob('*.json')]
+    others = [results for results in others if results['commit'] != commit]
+    if not others:
+        raise SystemExit('No earlier benchmark results to compare with')
+
+    return max(others, key=lambda results: results['date'])['commit']
+
+
+def compare(base, head, threshold):
+    '''
+    Prints the change of each benchmark from base to head, and returns the names of the
+    benchmarks that got slower by more than threshold percent
+    '''
+    base_results, head_results = load(base)['results'], load(head)['results']
+    print(f'{"benchmark":40} {base:>12} {head:>12} {"change":>9}')
+
+    regressions = []
+    for name in sorted(set(base_results) & set(head_results)):
+        before, after = base_results[name]['best_ms'], head_results[name]['best_ms']
+        change = (after - before) / before * 100
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+
+        print(f'{name:40} {before:9.2f} ms {after:9.2f} ms {change:+8.1f}%{flag}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths, and compares the results of commits.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and store the results for the current commit')
+    run_parser.add_argument('--repeat', type=int, default=5, help='times to run each benchmark, the best is kept')
+    run_parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run')
+
+    compare_parser = commands.add_parser('compare', help='compare the results of two commits')
+    compare_parser.add_argument('base', nargs='?', help='defaults to the latest other results')
+    compare_parser.add_argument('head', nargs='?', help='defaults to the current commit')
+    compare_parser.add_argument('--threshold', type=float, default=10,
+        help='percentage a benchmark may get slower before it is a regression')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        logging.disable(logging.WARNING)
+        commit = current_commit()
+        print(f'Benchmarking {commit}\n')
+        path = save(commit, run(args.only or list(BENCHMARKS), args.repeat))
+        print(f'\nResults written to {path}')
+    else:
+        head = args.head or current_commit()
+        regressions = compare(args.base or latest_other(head), head, args.threshold)
+
+        if regressions:
+            raise SystemExit(f'\n{len(regressions)} benchmark(s) slower than {args.threshold}%: {", ".join(regressions)}')
+
+        print('\nNo regressions')
@@ -2,6 +2,8 @@ import csv
 import os
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
 class ScenarioList:
     """
     管理 scenario_list.csv 的数据和操作。
@@ -48,54 +50,68 @@ class ScenarioList:
 class ScenarioSettings:
     """
     管理 scenario_settings.csv 的数据和操作。
+
+    数据按行块保存：每个块是若干 input 行在所有 scenario 列上的取值（二维数组），
+    保存时逐行写出，因此即使有大量 scenario 也不需要在内存中构建整张表。
     """
     def __init__(self):
-        self._input_column: List[str] = []
-        self._data_columns: Dict[str, List[Any]] = {}
+        self._column_names: List[str] = []
+        self._input_blocks: List[List[str]] = []
+        self._value_blocks: List[np.ndarray] = []
+
+    def set_columns(self, column_names: List[str]):
+        """设置所有 scenario 列的名称。"""
+        self._column_names = list(column_names)
 
-    def set_input_column(self, data: List[str]):
-        """设置第一列 'input' 的数据。"""
-        if not self._input_column:
-            self._input_column = data
+    def add_rows(self, input_names: List[str], values: np.ndarray):
+        """
+        添加一个行块。values 的形状为 (len(input_names), 列数)，
+        可以是广播视图（例如所有 scenario 相同的静态数据）。
+        """
+        self._input_blocks.append(list(input_names))
+        self._value_blocks.append(values)
+
+    @property
+    def input_column(self) -> List[str]:
+        """第一列 'input' 的数据。"""
+        return [name for block in self._input_blocks for name in block]
+
+    def iter_rows(self):
+        """按列名排序后逐行生成 [input, 值...]。"""
+        # 按列名排序以确保输出顺序一致
+        order = np.array(
+            sorted(range(len(self._column_names)), key=lambda i: self._column_names[i]), dtype=int)
 
-    def add_column(self, column_name: str, data: List[Any]):
-        """按列添加一个 scenario 的数据。"""
-        self._data_columns[column_name] = data
+        for input_names, values in zip(self._input_blocks, self._value_blocks):
+            for input_name, row_values in zip(input_names, values):
+                yield [input_name, *row_values[order]]
 
     def save_to_csv(self, filepath: str):
-        """将数据重构并保存为 CSV 文件。"""
+        """将数据逐行流式保存为 CSV 文件。"""
         print(f"正在保存 scenario_settings 数据到 {filepath}...")
-        if not self._input_column:
+        if not self.input_column or not self._column_names:
             print("错误：'input' 列数据为空，无法保存 scenario_settings.csv。")
             return
-            
-        # 按列名排序以确保输出顺序一致
-        sorted_column_names = sorted(self._data_columns.keys())
-        headers = ['input'] + sorted_column_names
+
+        headers = ['input'] + sorted(self._column_names)
 
         try:
             with open(filepath, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(headers)
-                
-                # 逐行写入数据
-                for i, input_name in enumerate(self._input_column):
-                    row = [input_name]
-                    for col_name in sorted_column_names:
-                        # 确保数据列长度足够
-                        if i < len(self._data_columns[col_name]):
-                            row.append(self._data_columns[col_name][i])
-                        else:
-                            row.append('') # 如果某列数据缺失则填空
-                    writer.writerow(row)
+                writer.writerows(self.iter_rows())
             print("scenario_settings.csv 保存成功。")
         except IOError as e:
             print(f"错误：无法写入文件 {filepath}。原因: {e}")
 
 
-def process_data(all_var_path: str, param_encoding_path: str):
+def process_data(all_var_path: str, param_encoding_path: str, output_dir: str = 'input'):
     """
     主处理函数，执行所有数据转换步骤。
+
+    通过预先建立的索引（变量编号 -> 数据库项）和按列的数组运算，一次性生成
+    所有样本的 scenario_list.csv 和 scenario_settings.csv；scenario_settings.csv
+    逐行写出，适用于大量样本。
     """
     # 1. 初始化
     print("开始处理数据...")
@@ -103,7 +119,6 @@ def process_data(all_var_path: str, param_encoding_path: str):
     scenario_settings = ScenarioSettings()
 
     # 2. 创建输出目录
-    output_dir = 'input'
     os.makedirs(output_dir, exist_ok=True)
 
     # 3. 读取并解析 all_var.csv
@@ -170,53 +185,64 @@ def process_data(all_var_path: str, param_encoding_path: str):
         print(f"处理 {param_encoding_path} 时发生错误: {e}")
         return
 
-    # 识别 param_encoding 中的有效修改行
-    valid_param_rows = []
-    if len(param_data) > 1:
-        for i, row in enumerate(param_data[1:], start=1):
-            try:
-                # A列必须是整数
-                full_data_index = int(row[0].strip())
-                valid_param_rows.append({'row_index': i, 'full_data_index': full_data_index})
-            except (ValueError, IndexError):
-                continue
-    
-    # 将数据转置以便按列遍历
-    transposed_param_data = list(map(list, zip(*param_data)))
+    # 预先建立索引：变量编号 (A列) -> 数据库项名称 (U列)，同一编号以第一次出现为准
+    variable_index: Dict[int, str] = {}
+    for item in full_data:
+        variable_index.setdefault(item[0], item[5])
 
-    # 5. 遍历 scenario 列并生成数据
-    if len(transposed_param_data) < 2:
+    # 识别 param_encoding 中的有效修改行，并找到对应的数据库名
+    param_rows = []
+    param_names = []
+    for i, row in enumerate(param_data[1:], start=1):
+        try:
+            # A列必须是整数
+            full_data_index = int(row[0].strip())
+        except (ValueError, IndexError):
+            continue
+
+        db_name = variable_index.get(full_data_index)
+        if db_name:
+            param_rows.append(i)
+            param_names.append(db_name)
+
+    # 按列处理时只使用所有行共有的列（与逐列转置的结果一致）
+    width = min((len(row) for row in param_data), default=0)
+
+    # 5. 一次性生成所有 scenario 的数据
+    if width < 2:
         print("警告: param_encoding.csv 中没有找到 scenario 数据列。")
     else:
-        # 从第二列开始遍历
-        for k, column_data in enumerate(transposed_param_data[1:]):
-            if len(column_data) < 2 or not column_data[1].strip():
-                break # 如果列第二行为空，则停止
-
-            scenario_name = f"sample_{k}"
-            print(f"正在处理 scenario: {scenario_name}...")
-            
-            # a. 初始化 sample_data (使用静态、非特殊类型数据)
-            sample_data = []
-            for item in full_data:
-                # item[1] == 0 表示 Static, item[4] == '' 表示特殊类型为空
-                if item[1] == 0 and not item[4]:
-                    sample_data.append([item[5], item[3]]) # [数据库名, 初始值]
-
-            # b. 添加变量修改
-            for param_info in valid_param_rows:
-                db_name = None
-                # 通过索引在 full_data 中查找数据库名
-                for item in full_data:
-                    if item[0] == param_info['full_data_index']:
-                        db_name = item[5]
-                        break
-                
-                if db_name:
-                    db_val = column_data[param_info['row_index']].strip()
-                    sample_data.append([db_name, db_val])
+        # scenario 列从第二列开始，遇到第二行为空的列则停止
+        sample_count = 0
+        if len(param_data) >= 2:
+            for cell in param_data[1][1:width]:
+                if not cell.strip():
+                    break
+                sample_count += 1
+
+        scenario_names = [f"sample_{k}" for k in range(sample_count)]
+        print(f"正在处理 {sample_count} 个 scenario...")
 
-            # c. 更新 scenario_list
+        if sample_count:
+            # a. 静态、非特殊类型数据对所有 scenario 相同，使用广播视图避免复制
+            static_items = [item for item in full_data if item[1] == 0 and not item[4]]
+            static_values = np.empty((len(static_items), 1), dtype=object)
+            static_values[:, 0] = [item[3] for item in static_items]
+
+            # b. 变量修改：按列批量取出所有 scenario 的取值
+            param_values = np.array(
+                [param_data[i][1:sample_count + 1] for i in param_rows], dtype=str
+            ).reshape(len(param_rows), sample_count)
+
+            scenario_settings.set_columns(scenario_names)
+            scenario_settings.add_rows(
+                [item[5] for item in static_items],
+                np.broadcast_to(static_values, (len(static_items), sample_count))
+            )
+            scenario_settings.add_rows(param_names, np.char.strip(param_values).astype(object))
+
+        # c. 更新 scenario_list
+        for scenario_name in scenario_names:
             scenario_list.add_row(
                 short_name=scenario_name,
                 title="Scenario_sample",
@@ -228,15 +254,6 @@ def process_data(all_var_path: str, param_encoding_path: str):
                 curve_file=None
             )
 
-            # d. 更新 scenario_settings
-            db_names = [row[0] for row in sample_data]
-            db_values = [row[1] for row in sample_data]
-            
-            if k == 0:
-                scenario_settings.set_input_column(db_names)
-            
-            scenario_settings.add_column(scenario_name, db_values)
-
     # 6. 保存最终结果
     scenario_list.save_to_csv(os.path.join(output_dir, 'scenario_list.csv'))
     scenario_settings.save_to_csv(os.path.join(output_dir, 'scenario_settings.csv'))
@@ -5,6 +5,7 @@ import sys
 from helpers.ETM_API import ETM_API, SessionWithUrlBase
 from helpers.helpers import process_arguments, print_bold
 from helpers.Template import TemplateCollection
+from helpers.request_stats import print_request_stats
 
 if __name__ == "__main__":
 
@@ -41,11 +42,13 @@ if __name__ == "__main__":
             template.add_custom_orders(API_template.get_custom_orders(template.custom_orders))
             template.custom_orders_to_csv()
     
-    templates.to_csv('template_settings')
+    templates.export('template_settings')
 
     if complete_mode:
         # Set to false to obtain balanced values
-        templates.to_csv('template_settings_balanced_values', user_values=False)
+        templates.export('template_settings_balanced_values', user_values=False)
         templates.heat_network_orders_to_csv()
+
+    print_request_stats()
     
     print("\nDone!")
@@ -0,0 +1,485 @@
+import io
+import json
+import asyncio
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from contextlib import suppress
+from json.decoder import JSONDecodeError
+from urllib.parse import urlparse
+
+from helpers.curve_ledger import CurveLedger, curve_body, curve_hash
+from helpers.json_log import scenario_key
+from helpers.helpers import warn
+from helpers.settings import Settings
+from helpers.throttling import TokenBucket, RetryPolicy, register_response
+
+
+class ETMError(Exception):
+    """
+    Raised when the ETM answers with an unsuccessful response.
+    """
+
+    def __init__(self, message, status=None):
+        super(ETMError, self).__init__(message)
+        self.status = status
+
+
+class AsyncResponse:
+    """
+    The parts of an aiohttp response we need, read while the connection was open.
+    """
+
+    def __init__(self, status, content, headers):
+        self.status_code = status
+        self.content = content
+        self.headers = headers
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncSessionWithUrlBase:
+    """
+    Async helper class to store the base url. The number of requests in flight is
+    limited by a semaphore, see async_max_concurrency in settings.yml. The rate limit
+    and retries are shared with SessionWithUrlBase.
+    Use as an async context manager.
+    """
+
+    def __init__(self, url_base=None, max_concurrency=None):
+        self.url_base = url_base
+        self.max_concurrency = max_concurrency or Settings.get('async_max_concurrency') or 10
+        self.proxy = (Settings.get('proxy_servers') or {}).get(urlparse(url_base).scheme)
+        self.rate_limiter = TokenBucket.shared()
+        self.retry_policy = RetryPolicy.from_settings()
+
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        headers = {}
+        if Settings.get('personal_etm_token'):
+            headers['Authorization'] = f"Bearer {Settings.get('personal_etm_token')}"
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    async def request(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.rate_limiter.reserve())
+            response = await self._send(method, url, **kwargs)
+
+            delay = register_response(self.rate_limiter, method, response.status_code,
+                response.headers, attempt, self.retry_policy)
+            if delay is None:
+                return response
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method, url, files=None, **kwargs):
+        if files:
+            # A new form for each attempt, as aiohttp can only send a form once
+            kwargs['data'] = aiohttp.FormData()
+            for field, (file_name, content) in files.items():
+                kwargs['data'].add_field(field, content, filename=file_name)
+
+        async with self._semaphore:
+            async with self._session.request(
+                method, self.url_base + url, proxy=self.proxy, **kwargs) as response:
+                return AsyncResponse(response.status, await response.read(), response.headers)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request('PUT', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+
+class AsyncETM_API(object):
+    """
+    Asyncio counterpart of ETM_API. Each object is connected to a single scenario,
+    many of them can share one AsyncSessionWithUrlBase and event loop. Requests for
+    multiple curves or orders are sent concurrently. Unsuccessful responses raise
+    an ETMError instead of exiting.
+    """
+
+    def __init__(self, session, scenario=None):
+        self.session = session
+        self.scenario = scenario
+        self._attached_curves = {}
+
+
+    @classmethod
+    async def connect(cls, session, scenario):
+        '''Returns an AsyncETM_API for the scenario, creating it in the ETM if it has no id'''
+        api = cls(session, scenario)
+
+        if not scenario.id:
+            await api.create_etm_scenario()
+
+        return api
+
+
+    async def create_etm_scenario(self):
+        """
+        Create a new scenario in the ETM based on the Scenario. The id is saved
+        so we can continue from the new scenario later on.
+        """
+        post_data = {
+            "scenario": self.scenario.create_params_as_json()
+        }
+        response = await self.session.post("/scenarios", json=post_data)
+        self.handle_response(response)
+        self.scenario.id = response.json()['id']
+        self.scenario.remote_user_values = {}
+        self.scenario.changed_in_run = True
+
+        if not self.scenario.end_year == response.json()['end_year']:
+            warn(f'Invalid end year {self.scenario.end_year} for scenario',
+                f'{self.scenario.short_name} was changed to {response.json()["end_year"]}')
+            self.scenario.end_year = response.json()['end_year']
+
+
+    # GETTING -----------------------------------------------------------------
+
+
+    async def get_info(self, detailed=False):
+        """
+        Obtain a basic description of the scenario, see ETM_API.get_info.
+        """
+        response = await self.session.get(f"/scenarios/{self.scenario.id}",
+            params={"detailed": str(detailed).lower()})
+        self.handle_response(response)
+
+        return response.json()
+
+
+    async def get_scenario_settings(self, settings_type='user_values'):
+        """
+        Get an overview of all the modified inputs.
+        """
+        return (await self.get_info(detailed=True))[f'{settings_type}']
+
+
+    async def get_data_download(self, download_name, hourly=False):
+        """
+        Collect a data download from the ETM. A data download is
+        a set of data predefined by the ETM.
+        """
+        suffix = f'curves/{download_name}' if hourly else download_name
+        response = await self.session.get(f"/scenarios/{self.scenario.id}/{suffix}")
+        self.handle_data_download_response(response, download_name)
+
+        return pd.read_csv(io.BytesIO(response.content))
+
+
+    async def get_data_downloads(self, download_dict):
+        """
+        Downloads all downloads specified in a dict(list) concurrently. Returns a
+        list of (str, pd.DataFrame) tuples in the order of the dict.
+        """
+        names = (
+            [(name, False) for name in download_dict['annual_data']] +
+            [(name, True) for name in download_dict['hourly_data']]
+        )
+        downloads = await asyncio.gather(
+            *(self.get_data_download(name, hourly=hourly) for name, hourly in names))
+
+        return [(name, download) for (name, _), download in zip(names, downloads)]
+
+
+    async def query(self, query_list):
+        """
+        Perform gqueries on the ETM. Sets the results on the scenario. Returns a pd.DataFrame.
+        """
+        put_data = {"detailed": True, "gqueries": query_list}
+        response = await self.session.put(f'/scenarios/{self.scenario.id}', json=put_data)
+
+        self.handle_response(
+            response,
+            fail_info="Error retrieving queries. Please check your queries file.\n"
+        )
+
+        self.scenario.query_results = pd.DataFrame.from_dict(response.json()["gqueries"],
+            orient="index")
+
+        return self.scenario.query_results
+
+
+    async def get_custom_curves(self):
+        '''
+        Get custom curves attached to the scenario, including internal curves.
+        The curves are fetched concurrently and collected in one pd.DataFrame.
+        '''
+        curves_attached = await self.get_attached_curve_keys()
+        curves = await asyncio.gather(*(self._get_custom_curve(key) for key in curves_attached))
+
+        return pd.DataFrame(dict(zip(curves_attached, curves)))
+
+
+    async def get_attached_curve_keys(self):
+        '''Returns the keys of the custom curves attached to the scenario, including internal ones'''
+        response = await self.session.get(f"/scenarios/{self.scenario.id}/custom_curves",
+            params={"include_internal": "true"})
+        self.handle_response(
+            response,
+            fail_info="Error obtaining custom curves.\n")
+
+        return [curve['key'] for curve in response.json() if curve['attached']]
+
+
+    async def get_custom_orders(self, orders):
+        '''
+        Get custom orders for the scenario concurrently. Returns pd.DataFrame with
+        one string per order type.
+        '''
+        order_strings = await asyncio.gather(*(self._get_order(f'/{order}', order) for order in orders))
+
+        return pd.DataFrame({order: [string] for order, string in zip(orders, order_strings)})
+
+
+    async def get_heat_network_orders(self, heat_orders):
+        """
+        Get the scenario's heat network orders concurrently.
+        """
+        temperature_level = [order.split('_')[-1] for order in heat_orders]
+        order_strings = await asyncio.gather(*(
+            self._get_order('/heat_network_order', f"temperature level '{t}'", params={"subtype": t})
+            for t in temperature_level
+        ))
+
+        return pd.DataFrame({
+            f'heat_network_order_{t}': [string] for t, string in zip(temperature_level, order_strings)
+        }).transpose()
+
+
+    # UPDATING ----------------------------------------------------------------
+
+
+    async def update(self, curve_file_dict):
+        '''
+        Updates everything at once, like ETM_API.update. Properties and sliders are set
+        first, heat network orders and custom curves are uploaded concurrently after that.
+        '''
+        await self.update_properties()
+
+        if self.scenario.user_values or self.scenario.sent_user_values:
+            await self.update_inputs()
+
+        uploads = []
+        if self.scenario.heat_network_orders:
+            uploads.append(self.update_heat_network_order())
+
+        if self.scenario.curve_file:
+            curves = curve_file_dict[self.scenario.curve_file].curves
+            uploads.extend(
+                self.upload_custom_curve(curve.key, curve.data, self.scenario.curve_file)
+                for curve in curves
+            )
+
+        uploads.extend(self._heat_demand_uploads(curve_file_dict))
+
+        await asyncio.gather(*uploads)
+
+
+    async def update_properties(self):
+        """
+        Update scenario properties such as title and description
+        """
+        put_data = {
+            "scenario": self.scenario.properties_as_json()
+        }
+        response = await self.session.put(f"/scenarios/{self.scenario.id}", json=put_data)
+
+        self.handle_response(response)
+        self.scenario.changed_in_run = True
+
+
+    async def update_inputs(self):
+        """
+        Change inputs to ETM according to dictionary user_values. Only the inputs that
+        differ from the ones in the ETM are sent, like ETM_API.update_inputs.
+        """
+        if self.scenario.remote_user_values is None:
+            self.scenario.remote_user_values = await self.get_scenario_settings()
+
+        update = self.scenario.user_values_update()
+        if not update:
+            return False
+
+        put_data = {"scenario": {"user_values": update}}
+        response = await self.session.put(f'/scenarios/{self.scenario.id}', json=put_data)
+
+        self.handle_response(response, fail_info=f"Error for scenario {self.scenario.short_name}")
+        self.scenario.user_values_sent(update)
+        self.scenario.changed_in_run = True
+
+        return True
+
+
+    async def update_heat_network_order(self):
+        """
+        Update the scenarios heat network orders in the ETM concurrently.
+        """
+        responses = await asyncio.gather(*(
+            self.session.put(f'/scenarios/{self.scenario.id}/heat_network_order',
+                json={"order": order, "subtype": network})
+            for network, order in self.scenario.heat_network_orders.items()
+        ))
+
+        for response in responses:
+            self.handle_response(response)
+
+        if responses:
+            self.scenario.changed_in_run = True
+
+
+    async def upload_custom_curve(self, curve_key, curve_data, curve_file_name):
+        """
+        Upload custom curve to ETM, unless the curve ledger shows the same curve is
+        already attached. Returns False when the upload was skipped.
+        """
+        ledger = CurveLedger.shared() if Settings.get('curve_ledger') else None
+        content_hash = curve_hash(curve_data)
+
+        if ledger and await self._curve_is_attached(ledger, curve_key, content_hash, curve_file_name):
+            return False
+
+        put_data = {'file': (curve_file_name, curve_body(curve_data, content_hash))}
+
+        response = await self.session.put(
+            f'/scenarios/{self.scenario.id}/custom_curves/{curve_key}', files=put_data)
+
+        self.handle_response(response)
+        self.scenario.changed_in_run = True
+
+        if ledger:
+            ledger.record(self._scenario_key(), curve_key, content_hash, curve_file_name)
+
+        return True
+
+
+    # RESPONSES ---------------------------------------------------------------
+
+
+    def handle_response(self, response, fail_info=''):
+        '''
+        Lets sucessful responses through, raises an ETMError when response is bad
+        '''
+        if response.ok:
+            return
+
+        if response.status_code == 404:
+            fail_info += f'Scenario {self.scenario.short_name} was not found.'
+
+        if response.status_code == 403:
+            fail_info += (
+                "You don't have access to this scenario. " +
+                "Please update your personal token (see the online docs)."
+            )
+
+        with suppress(JSONDecodeError, KeyError, TypeError):
+            fail_info += '\n ' + ',\n '.join(response.json()['errors'])
+
+        raise ETMError(fail_info, status=response.status_code)
+
+
+    def handle_data_download_response(self, response, download_name):
+        if not response.ok:
+            raise ETMError("Something went wrong retrieving a data download. "
+                "Check your data_downloads.csv!\n", status=response.status_code)
+
+        if response.text.startswith('<!DOCTYPE html>'):
+            raise ETMError(f'Download "{download_name}" is not available for scenarios '
+                'with Merit turned off.\n', status=response.status_code)
+
+
+    #  PRIVATE ----------------------------------------------------------------
+
+
+    async def _get_custom_curve(self, curve_key):
+        '''Returns the float values of an attached custom curve'''
+        response = await self.session.get(f"/scenarios/{self.scenario.id}/custom_curves/{curve_key}.csv")
+        self.handle_response(response, fail_info=f"Error obtaining custom curve '{curve_key}'.\n")
+
+        return [float(value) for value in response.text.split()]
+
+
+    def _scenario_key(self):
+        '''The key of the scenario in the curve ledger and query cache'''
+        return scenario_key(self.session.url_base, self.scenario.id)
+
+
+    def _heat_demand_uploads(self, curve_file_dict=None):
+        '''
+        Returns the uploads of the heat demand curves, like ETM_API._check_and_update_heat_demand:
+        the curves in curve_file_dict when it is given, otherwise the heat_demand_curves of
+        the scenario, which are also written to the output curves folder. Curves without
+        data are skipped.
+        '''
+        if not self.scenario.heat_demand or not self.scenario.heat_demand_curves:
+            return []
+
+        curves = curve_file_dict.values() if curve_file_dict else self.scenario.heat_demand_curves
+
+        uploads = []
+        for curve in curves:
+            if not np.any(curve.data):
+                print(f"Curve {curve.key} has no data to upload.")
+                continue
+
+            if not curve_file_dict:
+                curve.to_csv(self.scenario.short_name)
+
+            uploads.append(self.upload_custom_curve(f'weather/{curve.key}', curve.data, curve.key))
+
+        return uploads
+
+
+    async def _curve_is_attached(self, ledger, curve_key, content_hash, curve_file_name):
+        '''
+        True when the ledger recorded the same upload of the curve, and the curve is still
+        attached. Concurrent uploads share one request for the attached curves.
+        '''
+        entry = ledger.lookup(self._scenario_key(), curve_key)
+        if not entry or entry != {'hash': content_hash, 'file_name': curve_file_name}:
+            return False
+
+        if self.scenario.id not in self._attached_curves:
+            self._attached_curves[self.scenario.id] = asyncio.ensure_future(self.get_attached_curve_keys())
+
+        if curve_key in await self._attached_curves[self.scenario.id]:
+            return True
+
+        ledger.forget(self._scenario_key(), [curve_key])
+        return False
+
+
+    async def _get_order(self, endpoint, description, **kwargs):
+        '''Returns the order on the endpoint as one string'''
+        response = await self.session.get(f'/scenarios/{self.scenario.id}{endpoint}', **kwargs)
+        self.handle_response(response, fail_info=f"Error in obtaining custom order for {description}")
+
+        return ' '.join(response.json()['order'])
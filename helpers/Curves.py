@@ -1,20 +1,31 @@
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
 import pandas as pd
 
-from helpers.file_helpers import read_csv, get_folder, check_duplicates
+from helpers.curve_store import CurveStore
+from helpers.file_helpers import read_csv, get_folder
 from helpers.helpers import exit
+from helpers.settings import Settings
+
+# The number of invalid cells listed when a curve file is not valid
+MAX_REPORTED_CELLS = 20
 
 
 class CurveFile:
     """
     Creates an object containing all the curves specified in a curve file
-    in the data/input/curves folder.
+    in the data/input/curves folder. The curves are stored as contiguous
+    float arrays.
     """
     def __init__(self, file_name, data_df):
         self.file_name = file_name
-        self._validate(data_df)
+        values = self._validate(data_df)
 
         self.curves = set()
-        self._add_curves(data_df)
+        self._add_curves(data_df.columns, values)
 
 
     def _validate_length(self, data_df):
@@ -23,36 +34,72 @@ class CurveFile:
 
 
     def _validate_types(self, data_df):
-        # Generate series returning True for all columns of numeric type
-        type_series = data_df.apply(
-                        lambda s: pd.to_numeric(s, errors='coerce')
-                        .notnull().all())
-        # Exit if one column contains non-numeric values
-        if not type_series.all():
-            exit("All curves should only consist of numeric values "
-                  f"Please check {self.file_name}")
+        '''
+        Returns the values of the curves as a 2D float array. Exits when any of the cells
+        are empty or not numeric, listing all of them.
+        '''
+        numeric = data_df
+        if not all(pd.api.types.is_float_dtype(dtype) for dtype in data_df.dtypes):
+            numeric = data_df.apply(pd.to_numeric, errors='coerce')
+
+        values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        invalid_rows, invalid_columns = np.nonzero(np.isnan(values))
+        if invalid_rows.size:
+            cells = '\n'.join(
+                f"  - {data_df.columns[column]}, line {data_df.index[row] + 2}: "
+                f"'{_cell_text(data_df.iat[row, column])}'"
+                for row, column in zip(invalid_rows[:MAX_REPORTED_CELLS], invalid_columns[:MAX_REPORTED_CELLS])
+            )
+            if invalid_rows.size > MAX_REPORTED_CELLS:
+                cells += f"\n  ..and {invalid_rows.size - MAX_REPORTED_CELLS} more"
+
+            exit("All curves should only consist of numeric values. "
+                  f"Please check {self.file_name}, {invalid_rows.size} cells are invalid:\n{cells}")
+
+        return values
 
 
     def _validate_columns(self, data_df):
-        columns = list(data_df.columns.str.lower())
-        check_duplicates(columns, self.file_name, 'column')
+        columns = data_df.columns.str.lower()
+        duplicates = ', '.join(f"'{column}'" for column in columns[columns.duplicated()].unique())
+        if duplicates:
+            exit(f"Warning! {duplicates} included twice as a column in {self.file_name}. "
+                  "Please remove one!")
 
 
     def _validate(self, data_df):
+        '''Validates the curves, and returns their values as a 2D float array'''
         self._validate_length(data_df)
-        self._validate_types(data_df)
         self._validate_columns(data_df)
 
+        return self._validate_types(data_df)
 
-    def _add_curves(self, data_df):
-        '''Create and add a Curve for each column in the data_df'''
-        for key, arr in data_df.items():
-            self.curves.add(Curve(key, arr))
+
+    def _add_curves(self, keys, values):
+        '''Create and add a Curve for each column, with the values as one contiguous array'''
+        curves = np.ascontiguousarray(values.T)
+        for key, curve in zip(keys, curves):
+            self.curves.add(Curve(key, curve))
 
 
     @classmethod
     def from_csv(cls, file_name):
-        return cls(file_name, read_csv(file_name, curve=True, dtype=str))
+        '''
+        Reads the curve file from data/input/curves. When a curve store was imported from
+        the file (see scripts/curve_store.py) and is up to date, the store is read instead.
+        '''
+        path = get_folder('input_curves_folder') / file_name
+        if CurveStore.is_current(path, path.with_name(f'{path.name}.csv')):
+            return cls(file_name, CurveStore(path).to_frame())
+
+        data_df = read_csv(file_name, curve=True)
+
+        # pandas renames a repeated column (a_price.1), the header as written is validated
+        data_df.columns = read_csv(file_name, curve=True, silent=True, header=None, nrows=1,
+            dtype=str, keep_default_na=False).iloc[0].to_list()
+
+        return cls(file_name, data_df)
 
 
 class Curve():
@@ -80,8 +127,121 @@ class Curve():
             print(f"File {path} already exists. Skipping export.")
 
 
-def load_curve_file_dict(scenarios):
-    # TODO: move to Scenarios
-    curve_csvs = set([s.curve_file for s in scenarios if s.curve_file])
+def _cell_text(value):
+    return '' if pd.isna(value) else value
+
+
+class CurveFileRegistry:
+    """
+    The curve files used by a set of scenarios, by file name. A file is read on first
+    access, and released when the last scenario using it was updated (see release).
+    When max_size_mb is given, the least recently used files are dropped once the curves
+    take more memory than that; they are read again when needed. A released file can
+    still be looked up, but is then read without being kept.
+
+    Thread safe. Files are read outside the lock, so scenarios needing a loaded file do
+    not wait for another file being read. Scenarios needing the same file wait for one read.
+    """
+    def __init__(self, file_names, max_size_mb=None):
+        self.refcounts = Counter(file_names)
+        self.max_size_mb = max_size_mb
+        self.loaded = OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+
+
+    def __getitem__(self, file_name):
+        if file_name not in self.refcounts:
+            raise KeyError(file_name)
+
+        with self.lock:
+            if file_name in self.loaded:
+                self.loaded.move_to_end(file_name)
+                return self.loaded[file_name]
+
+            reading = self.loading.get(file_name)
+            reader = reading is None
+            if reader:
+                reading = self.loading[file_name] = Future()
+
+        if reader:
+            return self._read(file_name, reading)
+
+        return reading.result()
+
+
+    def __contains__(self, file_name):
+        return file_name in self.refcounts
 
-    return {file: CurveFile.from_csv(file) for file in curve_csvs}
+
+    def __iter__(self):
+        return iter(list(self.refcounts))
+
+
+    def __len__(self):
+        return len(self.refcounts)
+
+
+    def items(self):
+        for file_name in self:
+            yield file_name, self[file_name]
+
+
+    def release(self, file_name):
+        '''Called when a scenario using the file is done with it. Drops the file after the last one'''
+        with self.lock:
+            if self.refcounts[file_name] > 0:
+                self.refcounts[file_name] -= 1
+
+            if self.refcounts[file_name] == 0:
+                self.loaded.pop(file_name, None)
+
+
+    def size(self):
+        '''Bytes taken by the curves of the loaded files'''
+        return sum(curve_file_size(curve_file) for curve_file in self.loaded.values())
+
+
+    def _read(self, file_name, reading):
+        '''Reads the file for everyone waiting on reading, and keeps it unless it was released'''
+        try:
+            curve_file = CurveFile.from_csv(file_name)
+        except BaseException as error:
+            with self.lock:
+                self.loading.pop(file_name, None)
+            reading.set_exception(error)
+            raise
+
+        with self.lock:
+            self.loading.pop(file_name, None)
+            if self.refcounts[file_name] > 0:
+                self.loaded[file_name] = curve_file
+                self._evict(keep=file_name)
+
+        reading.set_result(curve_file)
+
+        return curve_file
+
+
+    def _evict(self, keep):
+        if not self.max_size_mb:
+            return
+
+        while self.size() > self.max_size_mb * 1024 * 1024 and len(self.loaded) > 1:
+            file_name = next(name for name in self.loaded if name != keep)
+            del self.loaded[file_name]
+
+
+def curve_file_size(curve_file):
+    return sum(np.asarray(curve.data).nbytes for curve in curve_file.curves)
+
+
+def load_curve_file_dict(scenarios):
+    '''
+    Returns a CurveFileRegistry with the curve files of the scenarios. Files are read
+    when a scenario first needs them. See curve_file_memory_mb in settings.yml.
+    '''
+    return CurveFileRegistry(
+        [s.curve_file for s in scenarios if s.curve_file],
+        Settings.get('curve_file_memory_mb')
+    )
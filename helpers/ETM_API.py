@@ -1,18 +1,31 @@
 import io
+import time
 import pandas as pd
 import requests
 import json
 
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from json.decoder import JSONDecodeError
 
+from helpers.curve_ledger import CurveLedger, curve_body, curve_hash
+from helpers.json_log import scenario_key
+from helpers.file_helpers import output_csv_path, uses_etm_csv_format, write_csv
 from helpers.helpers import exit, warn
+from helpers.query_cache import QueryCache, scenario_fingerprint
+from helpers.request_stats import RequestStats
 from helpers.settings import Settings
+from helpers.throttling import TokenBucket, RetryPolicy, register_response
 
 
 class SessionWithUrlBase(requests.Session):
     """
-    Helper class to store the base url.
+    Helper class to store the base url. Connections are pooled and kept alive
+    between requests, see connection_pool in settings.yml. Requests are rate limited
+    and GET and PUT requests are retried when the ETM is busy, see rate_limit and
+    retries in settings.yml. With request_stats on, the latency and size of each
+    request is recorded in RequestStats.
     """
 
     def __init__(self, url_base=None, *args, **kwargs):
@@ -22,14 +35,66 @@ class SessionWithUrlBase(requests.Session):
         if Settings.get('proxy_servers'):
             self.proxies = Settings.get('proxy_servers')
 
-    def request(self, method, url, headers={}, **kwargs):
+        self._mount_connection_pool()
+        self.rate_limiter = TokenBucket.shared()
+        self.retry_policy = RetryPolicy.from_settings()
+        self.request_stats = RequestStats.shared()
+
+    def _mount_connection_pool(self):
+        '''Mounts an HTTPAdapter with a connection pool tuned from the settings'''
+        pool_settings = Settings.get('connection_pool') or {}
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_settings.get('pool_connections', DEFAULT_POOLSIZE),
+            pool_maxsize=pool_settings.get('pool_maxsize', DEFAULT_POOLSIZE),
+            pool_block=pool_settings.get('pool_block', False)
+        )
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        if not pool_settings.get('keep_alive', True):
+            self.headers['Connection'] = 'close'
+
+    def request(self, method, url, headers=None, **kwargs):
         modified_url = self.url_base + url
+        headers = dict(headers) if headers else {}
 
         if Settings.get('personal_etm_token'):
             headers['Authorization'] = f"Bearer {Settings.get('personal_etm_token')}"
 
-        return super(SessionWithUrlBase, self).request(
-            method, modified_url, headers=headers, **kwargs)
+        attempt = 0
+        while True:
+            time.sleep(self.rate_limiter.reserve())
+            started = time.perf_counter()
+            response = super(SessionWithUrlBase, self).request(
+                method, modified_url, headers=headers, **kwargs)
+
+            if self.request_stats:
+                self._record(method, url, response, time.perf_counter() - started, kwargs.get('stream'))
+
+            delay = register_response(self.rate_limiter, method, response.status_code,
+                response.headers, attempt, self.retry_policy)
+            if delay is None:
+                return response
+
+            # Release the connection of a streamed response before trying again
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _record(self, method, url, response, latency, stream=False):
+        '''Records the request in the request stats. Streamed responses are not read for it'''
+        body = response.request.body if response.request is not None else None
+        if stream:
+            response_bytes = int(response.headers.get('Content-Length', 0))
+        else:
+            response_bytes = len(response.content)
+
+        self.request_stats.record(method, url, response.status_code, latency,
+            len(body) if body else 0, response_bytes)
+
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class ETM_API(object):
@@ -44,6 +109,7 @@ class ETM_API(object):
     def __init__(self, session, scenario=None):
         self.session = session
         self.scenario = scenario
+        self._attached_curves = {}
 
         if self.scenario and not self.scenario.id:
             self.create_etm_scenario()
@@ -57,9 +123,11 @@ class ETM_API(object):
         post_data = {
             "scenario": self.scenario.create_params_as_json()
         }
-        response = self.session.post("/scenarios", json=post_data, headers={'Connection': 'close'})
+        response = self.session.post("/scenarios", json=post_data)
         self.handle_response(response)
         self.scenario.id = response.json()['id']
+        self.scenario.remote_user_values = {}
+        self.scenario.changed_in_run = True
 
         # Note: This behaviour is not yet part of ETE
         if not self.scenario.end_year == response.json()['end_year']:
@@ -68,6 +136,23 @@ class ETM_API(object):
             self.scenario.end_year = response.json()['end_year']
 
 
+    def clone_etm_scenario(self, title=None):
+        """
+        Create a copy of the scenario in the ETM, including all of its inputs, and
+        return the id of the copy.
+        """
+        post_data = {
+            "scenario": {
+                "scenario_id": self.scenario.id,
+                "title": title or self.scenario.title
+            }
+        }
+        response = self.session.post("/scenarios", json=post_data)
+        self.handle_response(response)
+
+        return response.json()['id']
+
+
     # GETTING -----------------------------------------------------------------
 
 
@@ -102,21 +187,88 @@ class ETM_API(object):
         return pd.read_csv(io.StringIO(response.content.decode('utf-8')))
 
 
-    def query(self, query_list):
+    def stream_data_download(self, download_name, path, hourly=False):
         """
-        Perform gqueries on the ETM. Sets the results on the scenario. Returns a pd.DataFrame.
+        Write a data download from the ETM straight to a file at path, in chunks,
+        without parsing it.
         """
-        put_data = {"detailed": True, "gqueries": query_list}
-        response = self.session.put(f'/scenarios/{self.scenario.id}', json=put_data,
-                             headers={'Connection': 'close'})
+        suffix = f'curves/{download_name}' if hourly else download_name
 
-        self.handle_response(
-            response,
-            fail_info="Error retrieving queries. Please check your queries file.\n"
+        with self.session.get(f"/scenarios/{self.scenario.id}/{suffix}", stream=True) as response:
+            chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            first_chunk = next(chunks, b'')
+            self.handle_data_download_response(response, download_name,
+                first_chunk.decode('utf-8', errors='ignore'))
+
+            with open(path, 'wb') as f:
+                f.write(first_chunk)
+                for chunk in chunks:
+                    f.write(chunk)
+
+
+    def export_data_download(self, download_name, hourly=False):
+        """
+        Write a data download to {short_name}/{short_name}_{download_name}.csv in
+        the output folder. The download is streamed to disk when the csv settings
+        match the ETM, otherwise it is converted through a pd.DataFrame.
+        """
+        name = f'{self.scenario.short_name}_{download_name}'
+
+        if uses_etm_csv_format():
+            self.stream_data_download(download_name,
+                output_csv_path(name, self.scenario.short_name), hourly=hourly)
+        else:
+            write_csv(self.get_data_download(download_name, hourly=hourly), name,
+                folder=self.scenario.short_name, sep=Settings.get('csv_separator'),
+                decimal=Settings.get('decimal_seperator'), index=False, header=True)
+
+
+    def export_data_downloads(self, download_dict):
+        """
+        Export all downloads specified in a dict(list) to the output folder. The
+        downloads are fetched in parallel, see download_workers in settings.yml.
+        """
+        downloads = (
+            [(name, False) for name in download_dict['annual_data']] +
+            [(name, True) for name in download_dict['hourly_data']]
         )
 
-        self.scenario.query_results = pd.DataFrame.from_dict(response.json()["gqueries"],
-            orient="index")
+        with ThreadPoolExecutor(max_workers=Settings.get('download_workers') or 1) as executor:
+            futures = [
+                executor.submit(self.export_data_download, name, hourly=hourly)
+                for name, hourly in downloads
+            ]
+            for future in futures:
+                future.result()
+
+
+    def query(self, query_list, use_cache=True):
+        """
+        Perform gqueries on the ETM. Sets the results on the scenario. Returns a pd.DataFrame.
+        Results of unchanged scenarios are served from the query cache, the other queries are
+        sent in batches. See query_cache and query_batch_size in settings.yml. Scenarios that
+        were changed in this run skip the cache. Pass use_cache=False for scenarios that
+        change on every query, like in a sweep.
+        """
+        use_cache = use_cache and Settings.get('query_cache') and not self.scenario.changed_in_run
+        cache = QueryCache.shared() if use_cache else None
+        results = {}
+
+        if cache:
+            fingerprint = scenario_fingerprint(self.get_info(detailed=True))
+            results = cache.lookup(self._scenario_key(), fingerprint, query_list)
+
+        missing = [query for query in dict.fromkeys(query_list) if query not in results]
+        batch_size = Settings.get('query_batch_size') or len(missing) or 1
+
+        for start in range(0, len(missing), batch_size):
+            results.update(self._query_batch(missing[start:start + batch_size]))
+
+        if cache and missing:
+            cache.store(self._scenario_key(), fingerprint, {query: results[query] for query in missing})
+
+        self.scenario.query_results = pd.DataFrame.from_dict(
+            {query: results[query] for query in query_list if query in results}, orient="index")
 
         return self.scenario.query_results
 
@@ -136,16 +288,8 @@ class ETM_API(object):
         Collects custom curves in one pd.DataFrame output.
         Internal curves (not visible in the frontend if uploaded) are included.
         '''
-        response = self.session.get(f"/scenarios/{self.scenario.id}/custom_curves?include_internal=true")
-        self.handle_response(
-            response,
-            fail_info="Error obtaining custom curves.\n")
-
-        # Filter the curve keys attached to the scenario and create dataframe
-        curves_data = json.loads(response.content)
-        curves_attached = [curve['key'] for curve in curves_data if curve['attached']]
         df = pd.DataFrame()
-        for curve in curves_attached:
+        for curve in self.get_attached_curve_keys():
             response = self.session.get(f"/scenarios/{self.scenario.id}/custom_curves/{curve}.csv")
             # Decode and obtain float values of curve
             decoded_response = response.content.decode('utf-8').split('\n')
@@ -156,6 +300,16 @@ class ETM_API(object):
         return df
 
 
+    def get_attached_curve_keys(self):
+        '''Returns the keys of the custom curves attached to the scenario, including internal ones'''
+        response = self.session.get(f"/scenarios/{self.scenario.id}/custom_curves?include_internal=true")
+        self.handle_response(
+            response,
+            fail_info="Error obtaining custom curves.\n")
+
+        return [curve['key'] for curve in json.loads(response.content) if curve['attached']]
+
+
     def get_custom_orders(self, orders):
         '''
         Get custom orders for the scenario. Obtains custom orders in one
@@ -218,22 +372,42 @@ class ETM_API(object):
         put_data = {
             "scenario": self.scenario.properties_as_json()
         }
-        response = self.session.put(f"/scenarios/{self.scenario.id}", json=put_data,
-                             headers={'Connection': 'close'})
+        response = self.session.put(f"/scenarios/{self.scenario.id}", json=put_data)
 
         self.handle_response(response)
+        self.scenario.changed_in_run = True
 
 
-    def update_inputs(self):
+    def update_inputs(self, reset=False):
         """
-        Change inputs to ETM according to dictionary user_values. Also the
-        metrics are updated by passing a gquery via gquery_metrics
+        Change inputs to ETM according to dictionary user_values. Only the inputs that
+        differ from the ones in the ETM are sent, and inputs that were sent before but
+        were removed from user_values are reset. With reset, all user_values are sent and
+        all other inputs of the scenario are reset in the same request.
+
+        Returns True when the inputs were updated, False when nothing had changed.
         """
-        put_data = {"scenario": {"user_values": self.scenario.user_values}}
-        response = self.session.put(f'/scenarios/{self.scenario.id}', json=put_data,
-                             headers={'Connection': 'close'})
+        if reset:
+            update = dict(self.scenario.user_values or {})
+        else:
+            if self.scenario.remote_user_values is None:
+                self.scenario.remote_user_values = self.get_scenario_settings()
+
+            update = self.scenario.user_values_update()
+            if not update:
+                return False
+
+        put_data = {"scenario": {"user_values": update}}
+        if reset:
+            put_data["reset"] = True
+
+        response = self.session.put(f'/scenarios/{self.scenario.id}', json=put_data)
 
         self.handle_response(response, fail_info=f"Error for scenario {self.scenario.short_name}")
+        self.scenario.user_values_sent(update, reset=reset)
+        self.scenario.changed_in_run = True
+
+        return True
 
 
     def update_heat_network_order(self):
@@ -243,23 +417,35 @@ class ETM_API(object):
         for network, order in self.scenario.heat_network_orders.items():
             put_data = {"order": order, "subtype": network}
 
-            response = self.session.put(f'/scenarios/{self.scenario.id}/heat_network_order',
-                                json=put_data, headers={'Connection': 'close'})
+            response = self.session.put(f'/scenarios/{self.scenario.id}/heat_network_order', json=put_data)
 
             self.handle_response(response)
+            self.scenario.changed_in_run = True
 
 
     def upload_custom_curve(self, curve_key, curve_data, curve_file_name):
         """
-        Upload custom curve to ETM
+        Upload custom curve to ETM. The upload is skipped when the curve ledger shows the
+        same curve is already attached to the scenario, see curve_ledger in settings.yml.
+        Returns False when the upload was skipped.
         """
-        curve_string = '\n'.join(str(e) for e in curve_data)
-        put_data = {'file': (curve_file_name, curve_string)}
+        ledger = CurveLedger.shared() if Settings.get('curve_ledger') else None
+        content_hash = curve_hash(curve_data)
+
+        if ledger and self._curve_is_attached(ledger, curve_key, content_hash, curve_file_name):
+            return False
+
+        put_data = {'file': (curve_file_name, curve_body(curve_data, content_hash))}
 
-        response = self.session.put(f'/scenarios/{self.scenario.id}/custom_curves/{curve_key}',
-                             files=put_data, headers={'Connection': 'close'})
+        response = self.session.put(f'/scenarios/{self.scenario.id}/custom_curves/{curve_key}', files=put_data)
 
         self.handle_response(response)
+        self.scenario.changed_in_run = True
+
+        if ledger:
+            ledger.record(self._scenario_key(), curve_key, content_hash, curve_file_name)
+
+        return True
 
 
     # RESPONSES ---------------------------------------------------------------
@@ -287,14 +473,21 @@ class ETM_API(object):
         exit(fail_info)
 
 
-    def handle_data_download_response(self, response, download_name):
+    def handle_data_download_response(self, response, download_name, content_start=None):
+        '''
+        Exits when the download failed. Pass the start of the content when the
+        response is streamed, so the body does not have to be read at once.
+        '''
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as err:
             exit("Something went wrong retrieving a data download. "
                   "Check your data_downloads.csv!\n", err=err)
 
-        if response.text.startswith('<!DOCTYPE html>'):
+        if content_start is None:
+            content_start = response.text
+
+        if content_start.startswith('<!DOCTYPE html>'):
             exit(f'Download "{download_name}" is not available for scenarios '
                     'with Merit turned off. Aborting...\n')
 
@@ -302,6 +495,19 @@ class ETM_API(object):
     #  PRIVATE ----------------------------------------------------------------
 
 
+    def _query_batch(self, query_list):
+        '''Returns the results of the gqueries as a dict'''
+        put_data = {"detailed": True, "gqueries": query_list}
+        response = self.session.put(f'/scenarios/{self.scenario.id}', json=put_data)
+
+        self.handle_response(
+            response,
+            fail_info="Error retrieving queries. Please check your queries file.\n"
+        )
+
+        return response.json()["gqueries"]
+
+
     def _get_downloads(self, download_names, hourly=False):
         '''Downloads and yields all requested files'''
         for download in download_names:
@@ -310,10 +516,12 @@ class ETM_API(object):
 
     def _check_and_update_user_values(self):
         '''Checks if user values should be updated, and updates them'''
-        if not self.scenario.user_values: return
+        if not self.scenario.user_values and not self.scenario.sent_user_values: return
 
-        print(" Setting sliders")
-        self.update_inputs()
+        if self.update_inputs():
+            print(" Setting sliders")
+        else:
+            print(" Sliders are unchanged")
 
 
     def _check_and_update_heat_network(self):
@@ -331,8 +539,8 @@ class ETM_API(object):
         curves = curve_file_dict[self.scenario.curve_file].curves
         print(f" Uploading {len(curves)} custom curves:")
         for curve in curves:
-            print(f"  - {curve.key}")
-            self.upload_custom_curve(curve.key, curve.data, self.scenario.curve_file)
+            uploaded = self.upload_custom_curve(curve.key, curve.data, self.scenario.curve_file)
+            print(f"  - {curve.key}" if uploaded else f"  - {curve.key} (unchanged)")
 
 
     def _check_and_update_heat_demand(self, curve_file_dict=None):
@@ -348,8 +556,10 @@ class ETM_API(object):
                     print(f"Curve {curve_key} has no data to upload.") # Final check
                     continue
                 # Upload each curve
-                self.upload_custom_curve(f'weather/{curve.key}', curve.data, curve.key)
-                print(f"  - Uploaded {curve_key}")
+                if self.upload_custom_curve(f'weather/{curve.key}', curve.data, curve.key):
+                    print(f"  - Uploaded {curve_key}")
+                else:
+                    print(f"  - {curve_key} is unchanged")
         else:
             for curve in self.scenario.heat_demand_curves:
                 if not curve.data.any():
@@ -357,5 +567,33 @@ class ETM_API(object):
                     continue
                 curve.to_csv(self.scenario.short_name)
                 # Upload each curve
-                self.upload_custom_curve(f'weather/{curve.key}', curve.data, curve.key)
-                print(f"  - Uploaded {curve.key}")
+                if self.upload_custom_curve(f'weather/{curve.key}', curve.data, curve.key):
+                    print(f"  - Uploaded {curve.key}")
+                else:
+                    print(f"  - {curve.key} is unchanged")
+
+
+    def _scenario_key(self):
+        '''The key of the scenario in the curve ledger and query cache'''
+        return scenario_key(self.session.url_base, self.scenario.id)
+
+
+    def _curve_is_attached(self, ledger, curve_key, content_hash, curve_file_name):
+        '''
+        True when the ledger recorded the same upload of the curve, and the curve is still
+        attached to the scenario. The attached curves are requested once per scenario,
+        and only when the ledger knows about the scenario.
+        '''
+        entry = ledger.lookup(self._scenario_key(), curve_key)
+        if not entry or entry != {'hash': content_hash, 'file_name': curve_file_name}:
+            return False
+
+        if self.scenario.id not in self._attached_curves:
+            self._attached_curves[self.scenario.id] = set(self.get_attached_curve_keys())
+
+        if curve_key in self._attached_curves[self.scenario.id]:
+            return True
+
+        # Detached remotely, e.g. in the ETM itself
+        ledger.forget(self._scenario_key(), [curve_key])
+        return False
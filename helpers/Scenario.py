@@ -1,14 +1,19 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 from helpers.file_helpers import check_duplicate_index, read_csv, check_duplicates, get_folder
 from helpers.heat_demand.weather_years_profile_generator import WeatherYearsGenerator
+from helpers.heat_demand.smoothing import RANDOM_SEED
+from helpers.heat_curve_cache import HeatCurveCache
 from helpers.heat_file_utils import (contains_building_ag_profiles, load_g2a_parameters, read_building_ag_profiles, read_heat_demand_input, read_profiles,
     contains_heating_profiles, read_thermostat)
 from helpers.helpers import warn
 from helpers.ETM_API import ETM_API
 from helpers.buildings_profile_helper import BuildingsModel
+from helpers.Curves import CurveFileRegistry
 from helpers.settings import Settings
 
 
@@ -20,6 +25,14 @@ class Scenario:
     """
     ORDERS = ["heat_network_order_lt", "heat_network_order_mt", "heat_network_order_ht"]
 
+    # The input files needed to generate the missing heat profiles, by the number of
+    # profiles already in the heat demand folder
+    HEAT_INPUT_FILES = {
+        0: ['temperature.csv', 'irradiation.csv', 'wind_speed.csv', 'thermostat.csv', 'G2A_parameters.csv'],
+        12: ['temperature.csv', 'wind_speed.csv', 'G2A_parameters.csv'],
+        2: ['temperature.csv', 'irradiation.csv', 'thermostat.csv']
+    }
+
     ATTRIBUTES = [
         "short_name",
         "id",
@@ -49,6 +62,11 @@ class Scenario:
 
         self.query_results = None
         self.user_values = {}
+        # The user values as last known in the ETM, None until they are requested
+        self.remote_user_values = None
+        self.sent_user_values = set()
+        # True once this run created or changed the scenario in the ETM
+        self.changed_in_run = False
         self.api = None
         if self.id: self.id = int(self.id)
 
@@ -78,6 +96,43 @@ class Scenario:
         self.user_values = scenario_settings
 
 
+    def user_values_update(self):
+        '''
+        Returns the user values that differ from the ones last known in the ETM, and
+        'reset' for inputs that were sent before but were removed from user_values
+        '''
+        user_values = self.user_values or {}
+        remote = self.remote_user_values or {}
+
+        update = {key: value for key, value in user_values.items() if remote.get(key) != value}
+        update.update({
+            key: 'reset' for key in self.sent_user_values
+            if key not in user_values and key in remote
+        })
+
+        return update
+
+
+    def user_values_sent(self, update, reset=False):
+        '''
+        Records that the update was sent to the ETM. With reset, all other inputs of
+        the scenario were reset in the same request.
+        '''
+        remote = {} if reset else dict(self.remote_user_values or {})
+
+        for key, value in update.items():
+            if value == 'reset':
+                remote.pop(key, None)
+                self.sent_user_values.discard(key)
+            else:
+                remote[key] = value
+                self.sent_user_values.add(key)
+
+        self.remote_user_values = remote
+        if reset:
+            self.sent_user_values = set(update)
+
+
     def create_params_as_json(self):
         '''Returns the basic scenario parameters as json'''
         return {
@@ -107,6 +162,17 @@ class Scenario:
         self.heat_demand_curves = self._check_for_heat_profiles(input_folder)
         curves_length = len(self.heat_demand_curves)
 
+        cache = HeatCurveCache.from_settings() if curves_length in self.HEAT_INPUT_FILES else None
+        if cache:
+            cache_key = cache.key(Path(get_folder('input_curves_folder'), input_folder),
+                self.HEAT_INPUT_FILES[curves_length])
+            cached_profiles = cache.get(cache_key)
+
+            if cached_profiles is not None:
+                print(f"Found generated heat profiles for {input_folder} in the cache")
+                self.heat_demand_curves.extend(cached_profiles)
+                return
+
         # Initialize all variables to None
         temp = irr = wind_speed = therm = parameters = None
         if curves_length == 0:
@@ -127,12 +193,17 @@ class Scenario:
             irr = self._load_heat_data(read_heat_demand_input, input_folder, 'irradiation')
             therm = self._load_heat_data(read_thermostat, input_folder)
 
-        # Initialize the weather years generator with the loaded data
+        # Initialize the weather years generator with the loaded data. The smoothing starts
+        # from the same seed each time, so the same inputs always give the same profiles
+        np.random.seed(RANDOM_SEED)
         generator = WeatherYearsGenerator(temp, irr, wind_speed, therm, parameters)
         new_profiles = generator.generate_all_profiles()
         for profile in new_profiles:
             self.heat_demand_curves.append(profile)
 
+        if cache and new_profiles:
+            cache.put(cache_key, new_profiles)
+
     def _load_heat_data(self, loader_function, input_folder, data_type=None, ):
         file_loc = self._determine_file_loc(loader_function, data_type, input_folder)
         if file_loc and file_loc.exists():
@@ -199,6 +270,23 @@ class Scenario:
         self.api = ETM_API(session, self)
 
 
+    def clone(self, session, short_name):
+        '''
+        Returns a copy of the scenario with the given short_name, that is created in the
+        ETM as a copy of this scenario, including its current inputs
+        '''
+        clone = Scenario(pd.Series({
+            key: getattr(self, key, None) for key in self.ATTRIBUTES if key != 'heat_demand_curves'
+        }))
+        clone.short_name = short_name
+        clone.user_values = dict(self.user_values or {})
+        clone.id = int(self.api.clone_etm_scenario(title=f'{self.title or self.short_name} ({short_name})'))
+        clone.changed_in_run = True
+        clone.setup_connection(session)
+
+        return clone
+
+
     def update(self, curve_file_dict):
         '''Updates the scenario in ETM'''
         self.api.update(curve_file_dict)
@@ -213,6 +301,11 @@ class Scenario:
         yield from self.api.get_data_downloads(downloads)
 
 
+    def export_data_downloads(self, downloads):
+        '''Writes the downloads to the scenario's folder in the output folder'''
+        self.api.export_data_downloads(downloads)
+
+
 class ScenarioCollection:
     def __init__(self, collection):
         self.collection = collection
@@ -257,6 +350,51 @@ class ScenarioCollection:
             scenario.setup_connection(session)
 
 
+    def update(self, scenario, curve_file_dict):
+        '''
+        Updates the scenario in the ETM. Afterwards its curve file is released from the
+        curve_file_dict when that is a CurveFileRegistry, so the file can be dropped from
+        memory once all scenarios using it are updated.
+        '''
+        try:
+            scenario.update(curve_file_dict)
+        finally:
+            if scenario.curve_file and isinstance(curve_file_dict, CurveFileRegistry):
+                curve_file_dict.release(scenario.curve_file)
+
+
+    def process(self, pipeline, workers=None):
+        '''
+        Runs pipeline(scenario) for each scenario on a pool of worker threads and
+        yields (scenario, result) tuples in collection order. The number of workers
+        defaults to the scenario_workers setting. When a pipeline fails (e.g. a fatal
+        response from the ETM), the scenarios that have not started yet are cancelled
+        and the error is raised once the running ones are finished.
+        '''
+        workers = workers or Settings.get('scenario_workers') or 1
+        results = {}
+        next_index = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(pipeline, scenario): index
+                for index, scenario in enumerate(self.collection)
+            }
+
+            try:
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+                    # Yield everything that is ready, keeping the collection order
+                    while next_index in results:
+                        yield self.collection[next_index], results.pop(next_index)
+                        next_index += 1
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+
     def query_all_and_export_outcomes(self, queries, target='scenario_outcomes.csv', sections={}):
         '''Queries can be list or dict shortcut to query all and export immedeately'''
         query_list = list(queries.keys()) if isinstance(queries, dict) else queries
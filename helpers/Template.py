@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 from helpers.file_helpers import read_csv, check_duplicates, get_folder
+from helpers.helpers import exit
+from helpers.settings import Settings
 
 class Template:
     """
@@ -88,30 +90,65 @@ class TemplateCollection:
 
 
     def to_csv(self, file_name, user_values=True):
-        '''Exports the templates to csv'''
-        ids = []
-        titles = []
-        all_keys = []
-        for template in self.collection:
-            value_attribute_dict = template.user_values if user_values else template.balanced_values
-            ids.append(template.id)
-            titles.append(template.title)
-            for input in value_attribute_dict.keys():
-                all_keys.append(input)
-        cols = pd.MultiIndex.from_tuples(zip(titles, ids))
-        unique_keys = list(set(all_keys))
+        '''Exports the templates to csv, with a column per template and a row per input'''
+        df = self.to_frame(user_values)
+        df.to_csv(get_folder('output_file_folder') / f'{file_name}.csv', index=True, header=True)
 
-        df = pd.DataFrame(columns=ids, index=unique_keys)
 
-        for template in self.collection:
-            value_attribute_dict = template.user_values if user_values else template.balanced_values
-            template_id = template.id
-            for input_key, val in value_attribute_dict.items():
-                df.loc[input_key, template_id] = val
+    def to_parquet(self, file_name, user_values=True):
+        '''
+        Exports the templates to parquet, like to_csv. Faster to write and read for very large
+        template sets, but needs pyarrow (or fastparquet) to be installed.
+        '''
+        df = self.to_frame(user_values)
+
+        # Parquet columns hold one type, inputs with text values are stored as text
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].astype('string')
+        df.columns = pd.MultiIndex.from_tuples((str(title), str(id)) for title, id in df.columns)
+
+        try:
+            df.to_parquet(get_folder('output_file_folder') / f'{file_name}.parquet', index=True)
+        except ImportError as err:
+            exit('Exporting to parquet needs pyarrow, install it with: pipenv install pyarrow', err=err)
+
+
+    def export(self, file_name, user_values=True):
+        '''Exports the templates in the template_settings_format from settings.yml'''
+        if Settings.get('template_settings_format') == 'parquet':
+            self.to_parquet(file_name, user_values)
+        else:
+            self.to_csv(file_name, user_values)
+
+
+    def to_frame(self, user_values=True):
+        '''
+        Returns the user values (or balanced values) of the templates as a pd.DataFrame with
+        a row per input, in the order the inputs are first seen, and a (title, id) column per
+        template. Inputs that are not set in a template are empty. Templates with only
+        numeric values get numeric columns.
+        '''
+        value_dicts = [
+            (template.user_values if user_values else template.balanced_values) or {}
+            for template in self.collection
+        ]
+        keys = pd.Index(list(dict.fromkeys(key for values in value_dicts for key in values)))
+
+        columns = pd.MultiIndex.from_arrays([
+            [template.title for template in self.collection],
+            [template.id for template in self.collection]
+        ])
+        if not value_dicts:
+            return pd.DataFrame(index=keys, columns=columns)
+
+        df = pd.concat(
+            [pd.Series(values, dtype=None if values else float).reindex(keys) for values in value_dicts],
+            axis=1, ignore_index=True
+        )
+        df.columns = columns
+
+        return df
 
-        df.columns = cols
-        df.to_csv(get_folder('output_file_folder') / f'{file_name}.csv', index=True, header=True)
-        
 
     def heat_network_orders_to_csv(self):
         '''Exports the heat network orders to csv'''
@@ -0,0 +1,114 @@
+'''Ledger of the custom curves uploaded to each scenario, so unchanged curves are not uploaded again'''
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from helpers.file_helpers import get_folder
+from helpers.json_log import JsonLog
+
+CURVE_LEDGER_FILE = 'curve_ledger.jsonl'
+
+# Serialized curve bodies kept in memory, by content hash
+MAX_CACHED_BODIES = 64
+
+
+class CurveLedger:
+    '''
+    The content hash and file name of each curve uploaded to a scenario, by scenario
+    (see scenario_key) and curve key. Each upload is appended to curve_ledger.jsonl in
+    the output folder, superseded records are dropped when the ledger is opened in a
+    next run. Thread safe, and shared by all scenarios through shared().
+    '''
+    instance = None
+
+    def __init__(self, path):
+        self.log = JsonLog(path)
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        records = self.log.read()
+        for record in records:
+            self._apply(record)
+
+        if len(records) > sum(len(curves) for curves in self.entries.values()):
+            self.log.rewrite(self._records())
+
+    @classmethod
+    def shared(cls):
+        if not cls.instance:
+            cls.instance = cls(get_folder('output_file_folder') / CURVE_LEDGER_FILE)
+
+        return cls.instance
+
+    def lookup(self, scenario, curve_key):
+        '''Returns the recorded entry of the curve, or None'''
+        with self.lock:
+            return self.entries.get(str(scenario), {}).get(curve_key)
+
+    def record(self, scenario, curve_key, content_hash, file_name):
+        self._add({'scenario': str(scenario), 'curve': curve_key, 'hash': content_hash, 'file_name': file_name})
+
+    def forget(self, scenario, curve_keys=None):
+        '''Removes the given curves of the scenario from the ledger, or all of them'''
+        self._add({'scenario': str(scenario), 'forget': curve_keys})
+
+    def _add(self, record):
+        with self.lock:
+            self._apply(record)
+            self.log.append(record)
+
+    def _apply(self, record):
+        scenario_entries = self.entries.setdefault(record['scenario'], {})
+
+        if 'forget' not in record:
+            scenario_entries[record['curve']] = {'hash': record['hash'], 'file_name': record['file_name']}
+            return
+
+        for curve_key in list(scenario_entries) if record['forget'] is None else record['forget']:
+            scenario_entries.pop(curve_key, None)
+
+    def _records(self):
+        return [
+            {'scenario': scenario, 'curve': curve_key, **entry}
+            for scenario, curves in self.entries.items()
+            for curve_key, entry in curves.items()
+        ]
+
+
+_bodies = OrderedDict()
+_bodies_lock = threading.Lock()
+
+
+def curve_hash(curve_data):
+    '''
+    Returns a hash of the values of the curve. The values are hashed as floats, so a
+    curve read as strings hashes the same as the numbers it holds.
+    '''
+    data = np.ascontiguousarray(curve_data, dtype=float)
+
+    return hashlib.sha256(data.tobytes()).hexdigest()
+
+
+def curve_body(curve_data, content_hash=None):
+    '''
+    Returns the curve as the text of an upload, one value per line. Bodies are cached
+    by content hash, so a curve shared by many scenarios is formatted once.
+    '''
+    content_hash = content_hash or curve_hash(curve_data)
+
+    with _bodies_lock:
+        if content_hash in _bodies:
+            _bodies.move_to_end(content_hash)
+            return _bodies[content_hash]
+
+    body = '\n'.join(str(e) for e in curve_data)
+
+    with _bodies_lock:
+        _bodies[content_hash] = body
+        while len(_bodies) > MAX_CACHED_BODIES:
+            _bodies.popitem(last=False)
+
+    return body
@@ -0,0 +1,180 @@
+'''Binary store for a set of curves, read without parsing text'''
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from helpers.settings import Settings
+
+STORE_SUFFIX = '.npy'
+INDEX_SUFFIX = '.index.json'
+
+
+class CurveStore:
+    '''
+    A set of curves of equal length stored in one .npy file, with a curve on each row, and
+    an index of the keys next to it. The file is memory mapped: reading a curve returns a
+    read-only view on the file, without copying or parsing.
+
+    Create a store with CurveStore.write, or import the existing csv layout with
+    from_csv_folder or from_curve_file.
+    '''
+
+    def __init__(self, path):
+        '''
+        Params:
+            path (Path): Path of the store, with or without the .npy suffix
+        '''
+        self.path = store_path(path)
+        self._index = None
+        self._data = None
+
+
+    @classmethod
+    def write(cls, path, curves):
+        '''
+        Writes the curves to a new store at path, and returns it.
+
+        Params:
+            curves (dict or Iterable[tuple]): The values of each curve by key, all of the
+                same length
+        '''
+        curves = list(curves.items() if isinstance(curves, dict) else curves)
+        keys = [key for key, _ in curves]
+
+        if len(set(keys)) != len(keys):
+            raise ValueError('Curves in a store should have unique keys.')
+
+        path = store_path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = np.lib.format.open_memmap(path.with_suffix('.tmp.npy'), mode='w+', dtype=np.float64,
+            shape=(len(curves), len(curves[0][1]) if curves else 0))
+        for row, (_, values) in enumerate(curves):
+            data[row] = np.asarray(values, dtype=np.float64)
+
+        data.flush()
+        header_size = data.offset
+        del data
+
+        tmp_index_path = index_path(path).with_suffix('.tmp')
+        with open(tmp_index_path, 'w') as f:
+            json.dump({
+                'length': len(curves[0][1]) if curves else 0,
+                'header_size': header_size,
+                'curves': {key: row for row, key in enumerate(keys)}
+            }, f)
+
+        path.with_suffix('.tmp.npy').replace(path)
+        tmp_index_path.replace(index_path(path))
+
+        return cls(path)
+
+
+    @classmethod
+    def from_csv_folder(cls, folder, path):
+        '''Imports a folder with a csv file per curve, as written by Curve.to_csv'''
+        return cls.write(path, (
+            (file.stem, pd.read_csv(file, header=None).iloc[:, 0].to_numpy(dtype=np.float64))
+            for file in sorted(folder.glob('*.csv'))
+        ))
+
+
+    @classmethod
+    def from_curve_file(cls, csv_path, path=None):
+        '''
+        Imports a curve file with a column per curve, like the ones in data/input/curves.
+        By default the store is written next to the csv file.
+        '''
+        df = pd.read_csv(csv_path, sep=Settings.get('csv_separator') or ',',
+            decimal=Settings.get('decimal_seperator') or '.', encoding='utf-8-sig', dtype=np.float64)
+
+        return cls.write(path or csv_path.with_suffix(STORE_SUFFIX),
+            ((key, column.to_numpy()) for key, column in df.items()))
+
+
+    @property
+    def index(self):
+        '''Dict with the length of the curves, and the row of each key'''
+        if self._index is None:
+            with open(index_path(self.path), 'r') as f:
+                self._index = json.load(f)
+
+        return self._index
+
+
+    @property
+    def data(self):
+        '''Read-only memory mapped array with a row per curve'''
+        if self._data is None:
+            self._data = np.load(self.path, mmap_mode='r')
+
+        return self._data
+
+
+    def keys(self):
+        return list(self.index['curves'])
+
+
+    def offset(self, key):
+        '''Byte offset of the curve in the store file'''
+        return self.index['header_size'] + self.index['curves'][key] * self.index['length'] * 8
+
+
+    def get(self, key):
+        '''Returns the values of the curve as a read-only view on the store'''
+        return self.data[self.index['curves'][key]]
+
+
+    def items(self):
+        '''Yields the key and values of each curve, backed by the store'''
+        for key in self.keys():
+            yield key, self.get(key)
+
+
+    def to_frame(self):
+        '''All curves as a pd.DataFrame with a column per key, backed by the store'''
+        return pd.DataFrame(self.data.T, columns=self.keys(), copy=False)
+
+
+    def to_csv_folder(self, folder):
+        '''Exports each curve to a csv file in the folder, like Curve.to_csv'''
+        folder.mkdir(parents=True, exist_ok=True)
+        for key in self.keys():
+            pd.Series(self.get(key)).to_csv(folder / f'{key}.csv', index=False, header=False)
+
+
+    def to_curve_file(self, csv_path):
+        '''Exports the curves to one csv file with a column per curve'''
+        self.to_frame().to_csv(csv_path, index=False)
+
+
+    def __contains__(self, key):
+        return key in self.index['curves']
+
+
+    def __len__(self):
+        return len(self.index['curves'])
+
+
+    @staticmethod
+    def exists(path):
+        return store_path(path).exists() and index_path(store_path(path)).exists()
+
+
+    @staticmethod
+    def is_current(path, csv_path):
+        '''True when the store at path exists, and is newer than the csv it was imported from'''
+        if not CurveStore.exists(path):
+            return False
+
+        return not csv_path.exists() or store_path(path).stat().st_mtime >= csv_path.stat().st_mtime
+
+
+def store_path(path):
+    return path if path.suffix == STORE_SUFFIX else path.with_name(path.name + STORE_SUFFIX)
+
+
+def index_path(path):
+    return path.with_name(path.name[:-len(STORE_SUFFIX)] + INDEX_SUFFIX)
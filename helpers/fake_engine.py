@@ -0,0 +1,333 @@
+'''A local stand-in for the ETM engine, to measure the throughput of the tool without the live engine'''
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HOURS = 8760
+HEAT_NETWORK_ORDER = ['energy_heat_network_storage', 'energy_heat_burner_network_gas',
+    'energy_heat_heatpump_water_water_electricity', 'energy_heat_boiler_network_electricity']
+CUSTOM_ORDER = ['households_flexibility_p2p_electricity', 'energy_flexibility_pumped_storage_electricity',
+    'energy_flexibility_hv_opac_electricity']
+
+SCENARIO_PATH = re.compile(r'^.*?/scenarios(?:/(\d+))?(?:/(.*))?$')
+
+
+class FakeEngine(ThreadingHTTPServer):
+    '''
+    An HTTP server that answers the endpoints of the ETM engine used by the tool:
+    creating, cloning, reading and updating scenarios with gqueries, custom curves,
+    heat network orders, custom orders and data downloads. Scenarios are kept in memory.
+
+    Each request waits latency seconds (plus a random jitter), after which it can be
+    answered with a 429 (throttle_rate) or a 500 (error_rate), chosen at random from
+    seed. Pass failing_methods to only inject failures in e.g. GET and PUT requests,
+    which the tool retries. Use as a context manager to serve from a thread:
+
+        with FakeEngine(latency=0.05, throttle_rate=0.02) as engine:
+            session = SessionWithUrlBase(engine.url)
+    '''
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+            throttle_rate=0.0, retry_after=1, seed=None, failing_methods=None):
+        super().__init__((host, port), FakeEngineHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.failing_methods = failing_methods
+
+        self.scenarios = {}
+        self.next_id = 1
+        self.counts = Counter()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self._thread = None
+
+
+    @property
+    def url(self):
+        '''The base url to give to SessionWithUrlBase'''
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/api/v3'
+
+
+    def start(self):
+        '''Serves requests from a background thread'''
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+    def injected_failure(self, method):
+        '''
+        Waits the latency, and returns the status to answer the request with instead of
+        the real response (429 or 500), or None
+        '''
+        with self.lock:
+            delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0.0)
+            draw = self.random.random()
+
+        time.sleep(delay)
+
+        if self.failing_methods is not None and method not in self.failing_methods:
+            return None
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.error_rate:
+            return 500
+
+        return None
+
+
+    def create_scenario(self, params):
+        '''Creates a scenario, or a copy of params['scenario_id'] with its inputs and curves'''
+        with self.lock:
+            scenario_id = self.next_id
+            self.next_id += 1
+
+            base = self.scenarios.get(params.get('scenario_id'), {})
+            self.scenarios[scenario_id] = scenario = {
+                'id': scenario_id,
+                'title': params.get('title') or base.get('title'),
+                'area_code': params.get('area_code') or base.get('area_code', 'nl'),
+                'end_year': int(params.get('end_year') or base.get('end_year', 2050)),
+                'keep_compatible': False,
+                'metadata': {},
+                'user_values': dict(base.get('user_values', {})),
+                'custom_curves': dict(base.get('custom_curves', {})),
+                'heat_network_orders': dict(base.get('heat_network_orders', {})),
+                'updated_at': _now()
+            }
+
+            return scenario
+
+
+    def update_scenario(self, scenario, body):
+        '''Applies the scenario params, user values and reset of a PUT /scenarios/{id}'''
+        params = body.get('scenario') or {}
+
+        with self.lock:
+            if body.get('reset'):
+                scenario['user_values'] = {}
+
+            for key, value in (params.get('user_values') or {}).items():
+                if value == 'reset':
+                    scenario['user_values'].pop(key, None)
+                else:
+                    scenario['user_values'][key] = value
+
+            for key in ('title', 'metadata', 'keep_compatible'):
+                if key in params:
+                    scenario[key] = params[key]
+
+            if params:
+                scenario['updated_at'] = _now()
+
+
+def gquery_result(scenario, query):
+    '''A result that depends on the query and the user values of the scenario'''
+    present = float(len(query))
+    total = sum(value for value in scenario['user_values'].values() if isinstance(value, (int, float)))
+
+    return {'present': present, 'future': present + total / 100, 'unit': 'PJ'}
+
+
+def scenario_info(scenario, detailed=False):
+    info = {key: scenario[key] for key in
+        ('id', 'title', 'area_code', 'end_year', 'keep_compatible', 'metadata', 'updated_at')}
+
+    if detailed:
+        info['user_values'] = scenario['user_values']
+        info['balanced_values'] = {}
+
+    return info
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    '''Routes the requests to a FakeEngine'''
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, without Nagle they are not held back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, *_):
+        pass
+
+
+    def _handle(self, method):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        engine = self.server
+
+        with engine.lock:
+            engine.counts['requests'] += 1
+
+        failure = engine.injected_failure(method)
+        if failure == 429:
+            with engine.lock:
+                engine.counts['throttled'] += 1
+            return self._json({'errors': ['Too many requests']}, 429, {'Retry-After': str(engine.retry_after)})
+        if failure:
+            with engine.lock:
+                engine.counts['errors'] += 1
+            return self._json({'errors': ['Something went wrong']}, 500)
+
+        url = urlsplit(self.path)
+        match = SCENARIO_PATH.match(url.path)
+        if not match:
+            return self._json({'errors': ['Not found']}, 404)
+
+        scenario_id, rest = match.groups()
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if scenario_id is None:
+            if method != 'POST':
+                return self._json({'errors': ['Not found']}, 404)
+
+            params = json.loads(body or b'{}').get('scenario') or {}
+            return self._json(scenario_info(engine.create_scenario(params)))
+
+        scenario = engine.scenarios.get(int(scenario_id))
+        if scenario is None:
+            return self._json({'errors': ['Scenario not found']}, 404)
+
+        if not rest:
+            return self._scenario(method, scenario, body, query)
+        if rest.startswith('custom_curves'):
+            return self._custom_curves(method, scenario, rest[len('custom_curves/'):], body)
+        if rest == 'heat_network_order':
+            return self._heat_network_order(method, scenario, body, query)
+        if rest.endswith('_order'):
+            return self._json({'order': CUSTOM_ORDER})
+        if rest.startswith('curves/'):
+            return self._csv(_hourly_download(rest[len('curves/'):]))
+
+        return self._csv(_annual_download(rest))
+
+
+    def _scenario(self, method, scenario, body, query):
+        if method == 'GET':
+            return self._json(scenario_info(scenario, detailed=query.get('detailed') in ('True', 'true')))
+
+        body = json.loads(body or b'{}')
+        self.server.update_scenario(scenario, body)
+
+        response = {'scenario': scenario_info(scenario)}
+        if body.get('gqueries'):
+            response['gqueries'] = {query: gquery_result(scenario, query) for query in body['gqueries']}
+
+        return self._json(response)
+
+
+    def _custom_curves(self, method, scenario, key, body):
+        if not key:
+            return self._json([
+                {'key': curve_key, 'attached': True, 'name': curve['name'], 'stats': {'length': len(curve['values'])}}
+                for curve_key, curve in scenario['custom_curves'].items()
+            ])
+
+        if method == 'GET':
+            curve = scenario['custom_curves'].get(key[:-len('.csv')] if key.endswith('.csv') else key)
+            if curve is None:
+                return self._json({'errors': [f'No such custom curve: {key}']}, 404)
+
+            return self._csv('\n'.join(curve['values']))
+
+        file_name, values = _uploaded_file(self.headers.get('Content-Type', ''), body)
+        if len(values) != HOURS:
+            return self._json({'errors': [f'Curve must have {HOURS} numeric values, had {len(values)}']}, 422)
+
+        with self.server.lock:
+            scenario['custom_curves'][key] = {'name': file_name, 'values': values}
+
+        return self._json({'key': key, 'attached': True, 'name': file_name})
+
+
+    def _heat_network_order(self, method, scenario, body, query):
+        if method == 'GET':
+            return self._json({'order': scenario['heat_network_orders'].get(query.get('subtype'), HEAT_NETWORK_ORDER)})
+
+        body = json.loads(body or b'{}')
+        with self.server.lock:
+            scenario['heat_network_orders'][body.get('subtype')] = body.get('order')
+
+        return self._json({'order': body.get('order')})
+
+
+    def _json(self, data, status=200, headers={}):
+        self._send(json.dumps(data).encode('utf-8'), 'application/json', status, headers)
+
+
+    def _csv(self, text):
+        self._send(text.encode('utf-8'), 'text/csv')
+
+
+    def _send(self, content, content_type, status=200, headers={}):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _uploaded_file(content_type, body):
+    '''Returns the file name and the lines of the file in a multipart upload'''
+    message = BytesParser(policy=default_policy).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + body)
+
+    for part in message.iter_parts():
+        if part.get_filename() is not None:
+            text = part.get_payload(decode=True).decode('utf-8')
+            return part.get_filename(), [line for line in text.splitlines() if line]
+
+    return None, []
+
+
+def _hourly_download(name, hours=HOURS):
+    '''An hourly data download with a time column and a few value columns'''
+    rows = [f'{hour},{hour % 24 * 0.5:.1f},{hour % 168 * 0.1:.1f}' for hour in range(hours)]
+    return f'Time,{name}.input (MW),{name}.output (MW)\n' + '\n'.join(rows) + '\n'
+
+
+def _annual_download(name):
+    return f'key,present,future\n{name}_demand,1.0,2.0\n{name}_supply,3.0,4.0\n'
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
@@ -10,12 +10,17 @@ def get_folder(kind):
     Kind can be input_file_folder, output_file_folder, input_curves_folder, 
     input_orders_folder, output_curves_folder, output_orders_folder
     '''
-    folder_path = Path(__file__).parents[1] / Settings.get(kind) if Settings.get(kind).startswith('data') else Path(Settings.get(kind)).resolve()
+    folder_path = resolve_folder(kind)
     folder_path.mkdir(parents=True, exist_ok=True)
     
     return folder_path
 
 
+def resolve_folder(kind):
+    '''Like get_folder, but does not create the folder. For reading files in hot paths'''
+    return Path(__file__).parents[1] / Settings.get(kind) if Settings.get(kind).startswith('data') else Path(Settings.get(kind)).resolve()
+
+
 def verify_path(path):
     if path.exists():
         return path
@@ -41,11 +46,21 @@ def read_csv(file, sep=Settings.get('csv_separator'), decimal=Settings.get('deci
         return pd.DataFrame()
 
 
-def write_csv(df, name, folder='', sep=Settings.get('csv_separator'), decimal=Settings.get('decimal_seperator'), **options):
+def output_csv_path(name, folder=''):
+    '''Returns the path of a csv in the output folder, creating its folder if needed'''
     path = get_folder('output_file_folder') / folder / f'{name}.csv'
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    df.to_csv(path, sep=sep, decimal=decimal, **options)
+    return path
+
+
+def uses_etm_csv_format():
+    '''True when the csv settings match the csv files sent by the ETM'''
+    return Settings.get('csv_separator') in (None, ',') and Settings.get('decimal_seperator') in (None, '.')
+
+
+def write_csv(df, name, folder='', sep=Settings.get('csv_separator'), decimal=Settings.get('decimal_seperator'), **options):
+    df.to_csv(output_csv_path(name, folder), sep=sep, decimal=decimal, **options)
 
 
 def read_yml(file):
@@ -0,0 +1,176 @@
+'''On-disk cache of generated heat demand curves, keyed by the content of their inputs'''
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from helpers.Curves import Curve
+from helpers.file_helpers import get_folder
+from helpers.heat_demand import smoothing
+from helpers.heat_demand.config import insulation_config
+from helpers.settings import Settings
+
+# Bump when the way curves are generated changes, so old entries are not used anymore
+CACHE_VERSION = 1
+
+HEAT_INPUT_FILES = [
+    'temperature.csv',
+    'irradiation.csv',
+    'wind_speed.csv',
+    'thermostat.csv',
+    'G2A_parameters.csv'
+]
+
+
+class HeatCurveCache:
+    '''
+    Generated heat demand curves stored as .npz files in a folder, one file per set of
+    inputs. When the folder grows beyond max_size_mb, the least recently used
+    entries are removed.
+    '''
+
+    def __init__(self, folder, max_size_mb=None):
+        self.folder = folder
+        self.max_size_mb = max_size_mb
+
+
+    @classmethod
+    def from_settings(cls):
+        '''Returns the cache configured in settings.yml, or None when it is disabled'''
+        if not Settings.get('heat_curve_cache'):
+            return None
+
+        return cls(get_folder('heat_curve_cache_folder'), Settings.get('heat_curve_cache_size_mb'))
+
+
+    def key(self, input_folder, file_names=HEAT_INPUT_FILES):
+        '''
+        Returns the key for curves generated from the files in the input folder. The key
+        changes when any of the files, the insulation config or the smoothing changes.
+        '''
+        digest = hashlib.sha256()
+        digest.update(json.dumps(generation_constants(), sort_keys=True).encode('utf-8'))
+
+        for file_name in file_names:
+            path = input_folder / file_name
+            digest.update(file_name.encode('utf-8'))
+            digest.update(path.read_bytes() if path.exists() else b'missing')
+
+        return digest.hexdigest()
+
+
+    def get(self, key):
+        '''Returns the cached list of Curves, or None when the key is not cached'''
+        path = self._path(key)
+
+        # Another process can evict the entry at any moment, that is a miss as well
+        try:
+            with np.load(path) as data:
+                curves = [Curve(curve_key, data[curve_key]) for curve_key in data['keys']]
+
+            # Mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return curves
+
+
+    def put(self, key, curves):
+        '''Stores the Curves, and evicts old entries when the cache is too large'''
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        # Worker processes can store the same key at once, each writes its own file
+        tmp_path = self._path(key).with_suffix(f'.{os.getpid()}.tmp.npz')
+        np.savez(tmp_path, keys=np.array([curve.key for curve in curves]),
+            **{curve.key: np.asarray(curve.data, dtype=float) for curve in curves})
+        tmp_path.replace(self._path(key))
+
+        if self.max_size_mb:
+            self.evict(self.max_size_mb, keep=key)
+
+
+    def entries(self):
+        '''
+        Returns a list of dicts with the key, size in bytes, last use and curve keys of
+        each entry, most recently used first
+        '''
+        entries = []
+        for entry in self._stats():
+            try:
+                with np.load(self._path(entry['key'])) as data:
+                    entry['curves'] = list(data['keys'])
+            except FileNotFoundError:
+                continue
+
+            entries.append(entry)
+
+        return entries
+
+
+    def evict(self, max_size_mb, keep=None):
+        '''
+        Removes the least recently used entries until the cache fits in max_size_mb. The
+        entry keep is never removed, also when it alone is larger than max_size_mb.
+        '''
+        entries = self._stats()
+        total = sum(entry['size'] for entry in entries if entry['key'] == keep)
+
+        for entry in entries:
+            if entry['key'] == keep:
+                continue
+
+            total += entry['size']
+            if total > max_size_mb * 1024 * 1024:
+                self._path(entry['key']).unlink(missing_ok=True)
+
+
+    def purge(self):
+        '''Removes all entries, returns the number of removed entries'''
+        paths = list(self.folder.glob('*.npz'))
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+        return len(paths)
+
+
+    def _stats(self):
+        '''
+        Returns a list of dicts with the key, size in bytes and last use of each entry,
+        most recently used first. Entries removed by another process meanwhile are skipped.
+        '''
+        entries = []
+        for path in self.folder.glob('*.npz'):
+            if path.name.endswith('.tmp.npz'):
+                continue
+
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append({'key': path.stem, 'size': stat.st_size, 'last_used': stat.st_mtime})
+
+        return sorted(entries, key=lambda entry: entry['last_used'], reverse=True)
+
+
+    def _path(self, key):
+        return self.folder / f'{key}.npz'
+
+
+def generation_constants():
+    '''Everything besides the input files that determines the generated curves'''
+    return {
+        'version': CACHE_VERSION,
+        'r_values': insulation_config.get_r_values(),
+        'surface_area': insulation_config.get_surface_area(),
+        'behaviour': insulation_config.get_behaviour(),
+        'heat_capacity': insulation_config.get_heat_capacity(),
+        'window_area': {house: insulation_config.get_window_area(house) for house in insulation_config.HOUSE_NAMES},
+        'random_seed': smoothing.RANDOM_SEED,
+        'number_of_houses': smoothing.NUMBER_OF_HOUSES,
+        'hours_shifted': smoothing.HOURS_SHIFTED,
+        'interpolation_steps': smoothing.INTERPOLATION_STEPS
+    }
@@ -0,0 +1,49 @@
+'''Heat demand profile for buildings and agriculture based on the G2A parameters'''
+import numpy as np
+
+HOURS = 8760
+
+
+def effective_temperature(temperature, wind_speed):
+    '''The temperature felt by buildings: the wind makes it colder'''
+    return np.asarray(temperature, dtype=float) - np.asarray(wind_speed, dtype=float) / 1.5
+
+
+def g2a_parameters(g2a_params):
+    '''
+    Returns the reference, slope and constant from a G2A parameters table. A single row
+    is returned as scalars, a row for each hour as arrays.
+
+    Params:
+        g2a_params (pd.DataFrame): G2A parameters with columns reference, slope, constant
+
+    Returns:
+        tuple of (reference, slope, constant)
+    '''
+    if len(g2a_params) == 1:
+        row = g2a_params.iloc[0]
+        return float(row['reference']), float(row['slope']), float(row['constant'])
+
+    if len(g2a_params) != HOURS:
+        raise ValueError("G2A parameters length mismatch and not a single constant value.")
+
+    return tuple(
+        g2a_params[column].to_numpy(dtype=float) for column in ['reference', 'slope', 'constant']
+    )
+
+
+def g2a_heat_demand(effective, reference, slope, constant):
+    '''
+    Calculates the heat demand for each hour. Below the reference temperature the demand
+    grows by slope for each degree, on top of the constant demand. The parameters can be
+    scalars or have a value for each hour, they are broadcast against effective.
+
+    Returns:
+        np.array with the (not normalized) heat demand per hour
+    '''
+    effective = np.asarray(effective, dtype=float)
+    reference, slope, constant = (np.asarray(param, dtype=float) for param in (reference, slope, constant))
+
+    heat_demand = np.where(effective < reference, (reference - effective) * slope + constant, constant)
+
+    return np.broadcast_to(heat_demand, effective.shape).astype(float)
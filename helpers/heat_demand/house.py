@@ -1,6 +1,10 @@
 '''Refactored code from Dorine (etdataset/curves/demand/households/space_heating/script)'''
+import numpy as np
+
 from .config import insulation_config
 
+HOURS_PER_DAY = 24
+
 class House:
     """Class to describe a house"""
 
@@ -67,3 +71,59 @@ class House:
             insulation_config.get_surface_area(self.house_type) /
             1000.0
         )
+
+
+def calculate_heat_demand_curves(houses, outside_temperature, solar_irradiation):
+    '''
+    Simulates the houses side by side over all hours of the curves. Only the hours depend
+    on each other, so each hour is calculated for all houses at once. Gives exactly the
+    same results as calling calculate_heat_demand for each house and hour, and leaves
+    the houses with the same inside temperature.
+
+    The weather can also be given for several years at once, as arrays of shape
+    (hours, years). All years are then simulated in the same pass, each starting
+    from the initial state of the houses, which are left untouched.
+
+    Params:
+        houses (list[House]): The houses to simulate
+        outside_temperature (array-like): Outside temperature per hour
+        solar_irradiation (array-like): Solar irradiation per hour in kWh / m^2
+
+    Returns:
+        np.array of shape (hours, len(houses)), or (hours, years, len(houses)),
+        containing the heat demand curves
+    '''
+    outside_temperature = np.asarray(outside_temperature, dtype=float)[..., np.newaxis]
+    solar_irradiation = np.asarray(solar_irradiation, dtype=float)[..., np.newaxis]
+    years = outside_temperature.shape[1:-1]
+
+    heat_capacity = np.array([house.heat_capacity for house in houses])
+    energy_exchange = np.array([house.energy_exchange_per_delta_T for house in houses])
+    window_area = np.array([house.window_area for house in houses])
+    thermostat = np.array([
+        np.asarray(house.thermostat_temperature, dtype=float)[:HOURS_PER_DAY] for house in houses
+    ]).T
+    inside_temperature = np.broadcast_to(
+        np.array([house.inside_temperature for house in houses], dtype=float),
+        years + (len(houses),)
+    )
+
+    heat_demand = np.zeros((len(outside_temperature),) + years + (len(houses),))
+
+    for hour in range(len(outside_temperature)):
+        thermostat_temperature = thermostat[hour % HOURS_PER_DAY]
+        heating = inside_temperature < thermostat_temperature
+
+        heat_demand[hour] = np.where(
+            heating, (thermostat_temperature - inside_temperature) * heat_capacity, 0.0)
+        inside_temperature = np.where(heating, thermostat_temperature, inside_temperature)
+
+        energy_leaking = energy_exchange * (inside_temperature - outside_temperature[hour])
+        energy_added_by_irradiation = solar_irradiation[hour] * window_area
+        inside_temperature = inside_temperature - (energy_leaking - energy_added_by_irradiation) / heat_capacity
+
+    if not years:
+        for house, temperature in zip(houses, inside_temperature):
+            house.inside_temperature = temperature
+
+    return heat_demand
@@ -35,7 +35,8 @@ HOURS_SHIFTED = {
 }
 
 INTERPOLATION_STEPS = 10  # use intervals of 6 minutes when shifting curves
-np.random.seed(1337)  # random seed
+RANDOM_SEED = 1337
+np.random.seed(RANDOM_SEED)  # random seed
 
 
 def generate_deviations(size, scale):
@@ -64,19 +65,11 @@ def interpolate(arr, steps):
     to allow for smaller intervals than 1
     hour (steps=10 means 6 minute intervals)
     '''
-    interpolated_arr = []
-    for index, value in enumerate(arr):
-        start = value
-        if index == len(arr)-1:
-            stop = arr[0]
-        else:
-            stop = arr[index+1]
+    arr = np.asarray(arr, dtype=float)
+    # The last value is interpolated towards the first one
+    step_size = (np.roll(arr, -1) - arr) / steps
 
-        step_size = (stop - start) / steps
-        for i in range(0, steps):
-            interpolated_arr.append(start + i*step_size)
-
-    return interpolated_arr
+    return (arr[:, np.newaxis] + np.arange(steps) * step_size[:, np.newaxis]).ravel()
 
 
 def shift_curve(arr, num):
@@ -88,6 +81,23 @@ def shift_curve(arr, num):
     return np.roll(arr, num)
 
 
+def sum_shifted_curves(arr, shifts):
+    '''
+    Returns the sum of the array shifted by each of the shifts. This is a circular
+    convolution of the array with a histogram of the shifts, which only spans
+    the range of the shifts. Hours without demand in any of the shifted
+    curves stay exactly zero.
+    '''
+    arr = np.asarray(arr, dtype=float)
+    lowest = shifts.min()
+    histogram = np.bincount(shifts - lowest).astype(float)
+
+    # Wrap the array around so the convolution only has to look one way
+    wrapped = arr[(np.arange(len(arr) + len(histogram) - 1) - (len(histogram) - 1) - lowest) % len(arr)]
+
+    return np.convolve(wrapped, histogram, mode='valid')
+
+
 def trim_interpolated(arr, steps):
     '''
     Converts the curve back to the original number of data points (8760) by
@@ -99,13 +109,10 @@ def trim_interpolated(arr, steps):
     hour.
     '''
     arr = shift_curve(arr, INTERPOLATION_STEPS//2)
-    return [sum(arr[i:(i+steps)])/steps for i in range(0, len(arr), steps)]
+    return arr.reshape(-1, steps).sum(axis=1) / steps
 
 
 def calculate_smoothed_demand(heat_demand, insulation_type):
-    # start out with list of zeroes
-    cumulative_demand = [0]*len(heat_demand)*INTERPOLATION_STEPS
-
     # generate random numbers
     deviations = generate_deviations(NUMBER_OF_HOUSES,
                                      HOURS_SHIFTED[insulation_type])
@@ -115,12 +122,8 @@ def calculate_smoothed_demand(heat_demand, insulation_type):
     interpolated_demand = interpolate(heat_demand, INTERPOLATION_STEPS)
 
     # for each random number, shift the demand curve X places forwards or
-    # backwards (depending on the number value) and add it to the
-    # cumulative demand array
-    for num in deviations:
-        demand_list = shift_curve(interpolated_demand, num)
-        cumulative_demand = [x + y for x, y in zip(cumulative_demand,
-                                                   demand_list)]
+    # backwards (depending on the number value) and add them all up
+    cumulative_demand = sum_shifted_curves(interpolated_demand, deviations)
 
     # Trim the cumulative demand array such that it has 8760 data points again
     # (hourly intervals instead of 6 minute intervals)
@@ -0,0 +1,189 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from helpers.file_helpers import get_folder
+from helpers.heat_file_utils import read_heat_demand_array, read_thermostat, load_g2a_parameters
+
+from .config import insulation_config
+from .g2a import g2a_heat_demand, g2a_parameters, effective_temperature
+from .house import House, calculate_heat_demand_curves
+from .smoothing import calculate_smoothed_demand, RANDOM_SEED
+from .weather_years_profile_generator import normalize_curve, HOURS
+
+logger = logging.getLogger(__name__)
+
+# The house curves in the order WeatherYearsGenerator generates them
+HOUSE_CURVES = [
+    (house_type, insulation_type)
+    for house_type in insulation_config.HOUSE_NAMES
+    for insulation_type in insulation_config.INSULATION_TYPES
+]
+BUILDING_AGRICULTURE_KEYS = ["buildings_heating", "agriculture_heating"]
+
+
+class WeatherYearsBatch:
+    """
+    Generates the heat demand profiles for a stack of weather years at once. The houses
+    and the G2A profiles are calculated for all years in one vectorized pass, the smoothing
+    of the house curves can be spread over a process pool.
+
+    Each year is smoothed starting from the same random seed, so the profiles of a year do
+    not depend on the other years in the batch: they equal the profiles WeatherYearsGenerator
+    generates for that year in a fresh run.
+    """
+
+    def __init__(self, temp, irr=None, wind_speed=None, therm=None, g2a_params=None, years=None):
+        """
+        Params:
+            temp (array-like): Outside temperature, of shape (8760, years)
+            irr (array-like): Solar irradiation in J/cm^2, of shape (8760, years)
+            wind_speed (array-like): Wind speed, of shape (8760, years)
+            therm (pd.DataFrame): Thermostat settings with columns low, medium, high for 24 hours,
+                shared by all years
+            g2a_params (pd.DataFrame): G2A parameters with columns reference, slope, constant,
+                shared by all years
+            years (list[str]): Names of the years, defaults to their position
+        """
+        self.temp = self._as_stack(temp)
+        self.irr = self._as_stack(irr)
+        self.wind_speed = self._as_stack(wind_speed)
+        self.therm = therm
+        self.g2a_params = g2a_params
+        self.years = [str(year) for year in years] if years is not None else \
+            [str(year) for year in range(self.temp.shape[1])]
+
+        for name, stack in [('Irradiation', self.irr), ('Wind speed', self.wind_speed)]:
+            if stack is not None and stack.shape != self.temp.shape:
+                raise ValueError(f"{name} data must have the same shape as the temperature data.")
+
+        if len(self.years) != self.temp.shape[1]:
+            raise ValueError("There should be a name for each weather year.")
+
+
+    @classmethod
+    def from_folder(cls, folder):
+        """
+        Loads a folder inside data/input/curves containing a folder for each weather year,
+        with a temperature.csv, and an irradiation.csv and wind_speed.csv. The thermostat.csv
+        and G2A_parameters.csv are shared by the years and are read once from the folder itself.
+        """
+        path = get_folder('input_curves_folder') / folder
+        years = sorted(year.name for year in path.iterdir() if (year / 'temperature.csv').exists())
+
+        if not years:
+            raise FileNotFoundError(f"No weather year folders with a temperature.csv found in {path}")
+
+        def stack(data_type):
+            if not all((path / year / f'{data_type}.csv').exists() for year in years):
+                return None
+            return np.column_stack([read_heat_demand_array(f'{folder}/{year}', data_type) for year in years])
+
+        therm = read_thermostat(folder) if (path / 'thermostat.csv').exists() else None
+        g2a_params = load_g2a_parameters(folder) if (path / 'G2A_parameters.csv').exists() else None
+
+        return cls(stack('temperature'), stack('irradiation'), stack('wind_speed'), therm, g2a_params, years)
+
+
+    def generate_all_profiles(self, processes=1):
+        """
+        Generates the house, buildings and agriculture profiles for all years.
+
+        Params:
+            processes (int): Number of processes used to smooth the house curves
+
+        Returns:
+            pd.DataFrame with a column for each (year, curve key)
+        """
+        frames = []
+
+        if self.irr is not None and self.therm is not None:
+            frames.append(self.generate_house_profiles(processes))
+        else:
+            logger.info("Skipping house heat demand profiles generation due to missing data.")
+
+        if self.wind_speed is not None and self.g2a_params is not None:
+            frames.append(self.generate_building_agriculture_profiles())
+        else:
+            logger.info("Skipping building and agriculture heat demand profiles generation due to missing data.")
+
+        if not frames:
+            return pd.DataFrame()
+
+        return pd.concat(frames, axis=1)[self.years]
+
+
+    def generate_house_profiles(self, processes=1):
+        """Generates the 12 house profiles for all years, returns a pd.DataFrame"""
+        houses = [House(house_type, insulation_type, self.therm) for house_type, insulation_type in HOUSE_CURVES]
+        heat_demand = calculate_heat_demand_curves(
+            houses, self.temp, insulation_config.from_J_cm2_to_Kwh_m2(self.irr))
+
+        year_curves = [heat_demand[:, year, :] for year in range(len(self.years))]
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                smoothed = list(executor.map(smooth_house_curves, year_curves))
+        else:
+            smoothed = [smooth_house_curves(curves) for curves in year_curves]
+
+        keys = [f'insulation_{house_type}_{insulation_type}' for house_type, insulation_type in HOUSE_CURVES]
+        return pd.DataFrame(
+            np.concatenate(smoothed, axis=1),
+            columns=pd.MultiIndex.from_product([self.years, keys], names=['year', 'curve'])
+        )
+
+
+    def generate_building_agriculture_profiles(self):
+        """Generates the buildings and agriculture profiles for all years, returns a pd.DataFrame"""
+        # Parameters for each hour are lined up with the hours of every year
+        reference, slope, constant = (
+            np.reshape(param, (-1, 1)) if np.ndim(param) else param
+            for param in g2a_parameters(self.g2a_params)
+        )
+        profiles = g2a_heat_demand(
+            effective_temperature(self.temp, self.wind_speed), reference, slope, constant)
+        profiles = np.column_stack([normalize_curve(profiles[:, year]) for year in range(len(self.years))])
+
+        return pd.DataFrame(
+            np.repeat(profiles, len(BUILDING_AGRICULTURE_KEYS), axis=1),
+            columns=pd.MultiIndex.from_product(
+                [self.years, BUILDING_AGRICULTURE_KEYS], names=['year', 'curve'])
+        )
+
+
+    @staticmethod
+    def to_parquet(profiles, path):
+        """Writes the profiles to a parquet file, with a year/curve_key column per profile"""
+        profiles = profiles.copy()
+        profiles.columns = [f'{year}/{curve}' for year, curve in profiles.columns]
+        profiles.to_parquet(path, index=False)
+
+
+    @staticmethod
+    def _as_stack(curves):
+        if curves is None:
+            return None
+
+        stack = np.asarray(curves, dtype=float)
+        if stack.ndim == 1:
+            stack = stack[:, np.newaxis]
+
+        if stack.ndim != 2 or stack.shape[0] != HOURS:
+            raise ValueError("Weather data must be given as an array of shape (8760, years).")
+
+        return stack
+
+
+def smooth_house_curves(heat_demand):
+    '''
+    Smooths and normalizes the house curves of one year, in the order of HOUSE_CURVES,
+    starting from the random seed
+    '''
+    np.random.seed(RANDOM_SEED)
+
+    return np.column_stack([
+        normalize_curve(calculate_smoothed_demand(heat_demand[:, column], insulation_type))
+        for column, (_, insulation_type) in enumerate(HOUSE_CURVES)
+    ])
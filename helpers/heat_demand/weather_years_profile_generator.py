@@ -5,9 +5,10 @@ from pathlib import Path
 from helpers.Curves import Curve
 from helpers.settings import Settings
 
-from .house import House
+from .house import House, calculate_heat_demand_curves
 from .config import insulation_config
 from .smoothing import calculate_smoothed_demand
+from .g2a import effective_temperature, g2a_heat_demand, g2a_parameters
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +18,15 @@ logger = logging.getLogger(__name__)
 HOURS = 8760
 HOURS_PER_DAY = 24
 
+def normalize_curve(curve):
+    """Normalizes a curve to sum up to 1/3600."""
+    total = np.sum(curve)
+    if total == 0:
+        logger.warning("Total heat demand is zero during normalization.")
+        return curve
+    return curve / total / 3600
+
+
 class WeatherYearsGenerator:
     def __init__(self, temp=None, irr=None, wind_speed=None, therm=None, g2a_params=None):
         """
@@ -91,8 +101,8 @@ class WeatherYearsGenerator:
 
     def generate_house_profiles(self):
         """
-        Generates profiles for the heat demand of the five house types for three
-        insulation types, resulting in 5 * 3 = 15 profiles.
+        Generates profiles for the heat demand of the four house types for three
+        insulation types, resulting in 4 * 3 = 12 profiles.
 
         Returns:
             list of Curve objects
@@ -103,43 +113,27 @@ class WeatherYearsGenerator:
 
         irr_kwh_m2 = insulation_config.from_J_cm2_to_Kwh_m2(self.irr)
 
+        # Simulate all houses at once. The smoothing draws from one random stream,
+        # so the curves are smoothed in a fixed order
+        combinations = [
+            (house_type, insulation_type)
+            for house_type in insulation_config.HOUSE_NAMES
+            for insulation_type in insulation_config.INSULATION_TYPES
+        ]
+        houses = [House(house_type, insulation_type, self.therm) for house_type, insulation_type in combinations]
+        heat_demand = calculate_heat_demand_curves(houses, self.temp, irr_kwh_m2)
+
         curves = []
-        for house_type in insulation_config.HOUSE_NAMES:
-            for insulation_type in insulation_config.INSULATION_TYPES:
-                curve_name = f'insulation_{house_type}_{insulation_type}'
-                try:
-                    demand_curve = self._heat_demand_curve(house_type, insulation_type, self.temp, irr_kwh_m2, self.therm)
-                    curves.append(Curve(curve_name, demand_curve))
-                    logger.debug(f"Generated curve: {curve_name}")
-                except Exception as e:
-                    logger.error(f"Failed to generate curve {curve_name}: {e}")
+        for column, (house_type, insulation_type) in enumerate(combinations):
+            curve_name = f'insulation_{house_type}_{insulation_type}'
+            try:
+                demand_curve = self._smoothe_and_aggregate(heat_demand[:, column], insulation_type)
+                curves.append(Curve(curve_name, demand_curve))
+                logger.debug(f"Generated curve: {curve_name}")
+            except Exception as e:
+                logger.error(f"Failed to generate curve {curve_name}: {e}")
         return curves
 
-    def _heat_demand_curve(self, house_type, insulation_type, temp, irr, therm):
-        """
-        Calculates the heat demand curve for a house and insulation type.
-
-        Returns:
-            np.array of length 8760 containing the heat demand curve
-        """
-        house = House(house_type, insulation_type, therm)
-        heat_demand = np.array([
-            self._heat_demand_at_hour(house, hour, temp, irr)
-            for hour in range(HOURS)
-        ])
-        return self._smoothe_and_aggregate(heat_demand, insulation_type)
-
-    def _heat_demand_at_hour(self, house, hour, temp, irr):
-        """
-        Calculates the heat demand for the house type at the specified hour.
-
-        Returns:
-            float value of heat demand
-        """
-        # Hour of the day (0 to 23)
-        hour_of_the_day = hour % HOURS_PER_DAY
-        return house.calculate_heat_demand(temp[hour], irr[hour], hour_of_the_day)
-
     def _smoothe_and_aggregate(self, curve, insulation_type):
         """
         Smooth demand curve to turn individual household curves into average/aggregate
@@ -150,11 +144,7 @@ class WeatherYearsGenerator:
 
     def _normalize(self, curve):
         """Normalizes a curve to sum up to 1/3600."""
-        total = np.sum(curve)
-        if total == 0:
-            logger.warning("Total heat demand is zero during normalization.")
-            return curve
-        return curve / total / 3600
+        return normalize_curve(curve)
 
     def generate_building_agriculture_profiles(self):
         """Generate Curve objects for the buildings and agriculture heating profiles."""
@@ -177,38 +167,7 @@ class WeatherYearsGenerator:
 
     def _make_heat_demand_profile(self, temperature, wind_speed):
         """Generate a heat demand profile for buildings based on temperature and wind speed."""
-        # Effective temperature = temperature - (wind speed / 1.5)
-        effective_temp = temperature - (wind_speed / 1.5)
-
-        # Ensure G2A parameters are aligned
-        if len(self.g2a_params) != HOURS:
-            # If parameters are constants, repeat them
-            if len(self.g2a_params) == 1:
-                parameters = self.g2a_params.iloc[0].to_dict()
-                parameters_df = pd.DataFrame([parameters] * HOURS)
-                logger.debug("G2A parameters are constants; repeating for all hours.")
-            else:
-                raise ValueError("G2A parameters length mismatch and not a single constant value.")
-        else:
-            parameters_df = self.g2a_params.reset_index(drop=True)
-
-        # Combine effective temperature with G2A parameters
-        parameters_df['effective'] = effective_temp.values
-
-        # Apply the heat demand calculation
-        profile = parameters_df.apply(
-            lambda row: self._calculate_building_heat_demand(
-                row['effective'], row['reference'], row['slope'], row['constant']
-            ), axis=1
-        )
-
-        # Normalize the profile
-        profile = self._normalize(profile)
-        return profile.values  # Ensure it's a NumPy array
-
-    def _calculate_building_heat_demand(self, effective, reference, slope, constant):
-        """Calculates the required heating demand for buildings."""
-        if effective < reference:
-            return (reference - effective) * slope + constant
-        else:
-            return constant
+        reference, slope, constant = g2a_parameters(self.g2a_params)
+        profile = g2a_heat_demand(effective_temperature(temperature, wind_speed), reference, slope, constant)
+
+        return self._normalize(profile)
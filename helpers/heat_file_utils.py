@@ -1,9 +1,11 @@
 '''Utils for file reading/writing for heat demend'''
 
-from helpers.file_helpers import read_csv, get_folder
+from helpers.file_helpers import get_folder, resolve_folder
 from helpers.helpers import exit
 from helpers.heat_demand.config import insulation_config
 from helpers.Curves import Curve
+from helpers.settings import Settings
+from helpers.weather_input_cache import WeatherInputCache
 import pandas as pd
 
 def read_heat_demand_input(folder, file):
@@ -17,8 +19,14 @@ def read_heat_demand_input(folder, file):
     Returns:
         pd.Series containing the curve in the file
     '''
-    curve = read_csv(f'{folder}/{file}', curve=True, silent=True,
-        header=None).squeeze('columns').astype(float)
+    return pd.Series(read_heat_demand_array(folder, file), copy=False)
+
+def read_heat_demand_array(folder, file):
+    '''
+    Like read_heat_demand_input, but returns the curve as a read-only np.array. The file
+    is parsed once and shared by all callers until it changes on disk.
+    '''
+    curve = WeatherInputCache.shared().load(_input_path(folder, file), _parse_curve)
 
     if not curve.size == 8760:
         exit(f'Curve input {file} in {folder} should be of length 8760')
@@ -29,7 +37,10 @@ def read_thermostat(folder):
     '''
     Reads the thermostat file into a pd.DataFrame, amd performs some checks
     '''
-    therm = read_csv(f'{folder}/thermostat', curve=True, silent=True).astype(float)
+    therm = pd.DataFrame(
+        WeatherInputCache.shared().load(_input_path(folder, 'thermostat'), _parse_thermostat),
+        copy=False
+    )
 
     if not set(list(therm.columns)) == set(['low', 'medium', 'high']):
         exit(f'Thermostat in {folder} should be supplied for low, medium and high.')
@@ -92,8 +103,30 @@ def load_g2a_parameters(folder):
     Returns:
         pd.DataFrame: A DataFrame containing the G2A parameters.
     """
-    path = get_folder('input_curves_folder') / folder
+    path = resolve_folder('input_curves_folder') / folder
     filepath = path / "G2A_parameters.csv"
     if not filepath.exists():
         raise FileNotFoundError(f"G2A_parameters.csv not found in {path}")
-    return pd.read_csv(filepath)
+    return pd.DataFrame(WeatherInputCache.shared().load(filepath, _parse_g2a_parameters), copy=False)
+
+def _input_path(folder, file):
+    path = resolve_folder('input_curves_folder') / folder / f'{file}.csv'
+    if not path.exists():
+        exit(f"File '{file}.csv' not found in '{path.parent}' folder. Aborting...")
+
+    return path
+
+def _read_input_csv(path, **options):
+    return pd.read_csv(path, sep=Settings.get('csv_separator') or ',',
+        decimal=Settings.get('decimal_seperator') or '.', **options).dropna(how='all')
+
+def _parse_curve(path):
+    return _read_input_csv(path, header=None).squeeze('columns').astype(float).to_numpy()
+
+def _parse_thermostat(path):
+    therm = _read_input_csv(path).astype(float)
+    return {column: therm[column].to_numpy() for column in therm.columns}
+
+def _parse_g2a_parameters(path):
+    params = pd.read_csv(path)
+    return {column: params[column].to_numpy() for column in params.columns}
@@ -0,0 +1,114 @@
+'''Generates heat demand curves in worker processes, ahead of the scenarios that upload them'''
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from helpers.Scenario import Scenario
+from helpers.settings import Settings
+
+
+class HeatCurvePipeline:
+    '''
+    Generates the heat demand curves of the scenarios on a pool of worker processes, in
+    collection order, while earlier scenarios are being updated. At most lookahead
+    scenarios are generated ahead of the scenarios being updated, so the workers wait
+    when the uploads fall behind. The lookahead defaults to the number of workers.
+
+    Scenarios get their curves through curves(scenario), which waits for them and can
+    be set as the heat_demand_curves of the scenario.
+
+    The workers are spawned rather than forked: the main process is running threads
+    with open sessions, and a forked child could inherit one of their locks held.
+    '''
+
+    def __init__(self, scenarios, workers, lookahead=None):
+        self.scenarios = [scenario for scenario in scenarios if scenario.heat_demand]
+        self.slots = threading.Semaphore(max(lookahead or workers, 1))
+        self.futures = {}
+        self.submitted = threading.Condition()
+        self.closed = False
+
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'), initializer=_load_settings,
+            initargs=(dict(Settings().instance.settings),))
+        self.producer = threading.Thread(target=self._submit_all, daemon=True)
+        self.producer.start()
+
+
+    @classmethod
+    def from_settings(cls, scenarios):
+        '''
+        Returns a pipeline with heat_curve_workers processes, or None when it is disabled
+        or none of the scenarios has heat demand
+        '''
+        workers = Settings.get('heat_curve_workers')
+        if not workers or not any(scenario.heat_demand for scenario in scenarios):
+            return None
+
+        return cls(scenarios, workers, lookahead=Settings.get('heat_curve_lookahead'))
+
+
+    def curves(self, scenario):
+        '''
+        Claims the heat demand curves of the scenario, so the next scenario can be
+        generated, and returns them as a list once they are generated
+        '''
+        with self.submitted:
+            self.submitted.wait_for(lambda: id(scenario) in self.futures or self.closed)
+            future = self.futures.pop(id(scenario), None)
+
+        if future is None:
+            return []
+
+        self.slots.release()
+
+        return list(future.result())
+
+
+    def close(self):
+        '''Stops generating curves, and waits for the running workers to finish'''
+        with self.submitted:
+            self.closed = True
+            self.submitted.notify_all()
+
+        # Wake the producer when it is waiting for a free slot
+        self.slots.release()
+        self.producer.join()
+        self.executor.shutdown(cancel_futures=True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *_):
+        self.close()
+
+
+    def _submit_all(self):
+        for scenario in self.scenarios:
+            self.slots.acquire()
+            if self.closed:
+                return
+
+            future = self.executor.submit(generate_heat_demand_curves, scenario.heat_demand)
+            with self.submitted:
+                self.futures[id(scenario)] = future
+                self.submitted.notify_all()
+
+
+def generate_heat_demand_curves(heat_demand):
+    '''Returns the heat demand curves of the heat_demand folder, as a Scenario would set them'''
+    scenario = Scenario(pd.Series({'heat_demand': heat_demand}))
+    scenario.set_heat_demand_curves()
+
+    return scenario.heat_demand_curves
+
+
+def _load_settings(settings):
+    '''Uses the settings of the main process in a worker process'''
+    for setting, value in settings.items():
+        Settings.add(setting, value)
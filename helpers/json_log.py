@@ -0,0 +1,50 @@
+'''Append-only logs of json records, for the ledgers and caches that are kept between runs'''
+
+import json
+
+
+class JsonLog:
+    '''
+    Records stored as one json object per line. Appending a record does not rewrite the
+    file, so recording stays cheap however large the log grows. A line that was cut off
+    by an interrupted run is skipped when reading. Not thread safe, the owner locks.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        '''Returns the records in the order they were appended'''
+        if not self.path.exists():
+            return []
+
+        records = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+
+        return records
+
+    def append(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def rewrite(self, records):
+        '''Replaces all records at once, e.g. to drop the ones that were superseded'''
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+        tmp_path.replace(self.path)
+
+
+def scenario_key(url_base, scenario_id):
+    '''
+    Identifies a scenario across engines: scenarios on e.g. the pro and beta engine can
+    have the same id
+    '''
+    return f'{url_base}/scenarios/{scenario_id}'
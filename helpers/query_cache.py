@@ -0,0 +1,105 @@
+'''Cache of gquery results per scenario, so unchanged scenarios are not queried again'''
+
+import hashlib
+import json
+import threading
+import time
+
+from helpers.file_helpers import get_folder
+from helpers.json_log import JsonLog
+from helpers.settings import Settings
+
+QUERY_CACHE_FILE = 'query_cache.jsonl'
+
+
+class QueryCache:
+    '''
+    Query results per scenario (see scenario_key). The results are valid as long as the
+    fingerprint of the scenario is the same, and for at most max_age hours, so changes
+    to the engine or its datasets are picked up. Stored results are appended to
+    query_cache.jsonl in the output folder, superseded and expired results are dropped
+    when the cache is opened in a next run. Thread safe, and shared by all scenarios
+    through shared().
+    '''
+    instance = None
+
+    def __init__(self, path, max_age=None):
+        self.log = JsonLog(path)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        records = self.log.read()
+        for record in records:
+            self._apply(record)
+
+        self.entries = {scenario: entry for scenario, entry in self.entries.items() if not self._expired(entry)}
+        if len(records) > len(self.entries):
+            self.log.rewrite(
+                {'scenario': scenario, **entry} for scenario, entry in self.entries.items()
+            )
+
+    @classmethod
+    def shared(cls):
+        if not cls.instance:
+            cls.instance = cls(get_folder('output_file_folder') / QUERY_CACHE_FILE,
+                max_age=Settings.get('query_cache_max_age'))
+
+        return cls.instance
+
+    def lookup(self, scenario, fingerprint, queries):
+        '''Returns a dict with the cached results of the queries that are still valid'''
+        with self.lock:
+            entry = self.entries.get(str(scenario))
+
+            if not fingerprint or not entry or entry['fingerprint'] != fingerprint or self._expired(entry):
+                return {}
+
+            return {query: entry['results'][query] for query in queries if query in entry['results']}
+
+    def store(self, scenario, fingerprint, results):
+        '''Adds the results to the scenario, dropping results of an older fingerprint'''
+        if not fingerprint:
+            return
+
+        with self.lock:
+            entry = self.entries.get(str(scenario))
+            stored_at = time.time()
+            if entry and entry['fingerprint'] == fingerprint:
+                stored_at = entry['stored_at']
+
+            record = {'scenario': str(scenario), 'fingerprint': fingerprint, 'stored_at': stored_at,
+                'results': results}
+            self._apply(record)
+            self.log.append(record)
+
+    def _apply(self, record):
+        entry = self.entries.get(record['scenario'])
+
+        if not entry or entry['fingerprint'] != record['fingerprint']:
+            entry = self.entries[record['scenario']] = {
+                'fingerprint': record['fingerprint'],
+                'stored_at': record['stored_at'],
+                'results': {}
+            }
+
+        entry['results'].update(record['results'])
+
+    def _expired(self, entry):
+        if not self.max_age:
+            return False
+
+        return time.time() - entry.get('stored_at', 0) > self.max_age * 3600
+
+
+def scenario_fingerprint(info):
+    '''
+    Returns a hash of the detailed scenario info: its user values, balanced values,
+    area, end year and last update among others. Returns None when the ETM does not
+    tell when the scenario was last updated.
+    '''
+    if not info.get('updated_at'):
+        return None
+
+    state = json.dumps(info, sort_keys=True)
+    return hashlib.sha256(state.encode('utf-8')).hexdigest()
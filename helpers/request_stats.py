@@ -0,0 +1,124 @@
+'''Latency and size of the requests sent to the ETM, aggregated per endpoint'''
+
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from helpers.file_helpers import get_folder
+from helpers.settings import Settings
+
+REQUEST_STATS_FILE = 'request_stats.csv'
+
+# Path segments that are replaced by a placeholder in the endpoint template. The
+# segments after custom_curves and curves (downloads) are names chosen by the user.
+ID_SEGMENT = re.compile(r'^\d+$')
+NAMED_SEGMENTS = {'custom_curves': '{key}', 'curves': '{download}'}
+
+
+class RequestStats:
+    '''
+    Records the endpoint, method, status, latency, request size and response size of
+    each request sent by a SessionWithUrlBase. Retried requests are recorded once for
+    each attempt. Thread safe, and shared by all sessions through shared().
+    '''
+    instance = None
+
+    def __init__(self):
+        self.records = []
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        '''The stats shared by all sessions, or None when request_stats is off in settings.yml'''
+        if not Settings.get('request_stats'):
+            return None
+
+        if not cls.instance:
+            cls.instance = cls()
+
+        return cls.instance
+
+    def record(self, method, url, status, latency, request_bytes, response_bytes):
+        with self.lock:
+            self.records.append(
+                (endpoint_template(url), method.upper(), status, latency, request_bytes, response_bytes)
+            )
+
+    def to_frame(self):
+        '''
+        Returns a pd.DataFrame with a row per method and endpoint: the number of requests,
+        errors, latency percentiles in ms, bytes sent and received, and the number of
+        requests per second over the run
+        '''
+        with self.lock:
+            records = pd.DataFrame(self.records, columns=['endpoint', 'method', 'status', 'latency',
+                'request_bytes', 'response_bytes'])
+            duration = max(time.monotonic() - self.started, 1e-9)
+
+        rows = []
+        for (method, endpoint), group in records.groupby(['method', 'endpoint'], sort=True):
+            latency = group['latency'].to_numpy() * 1000
+            p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+            rows.append({
+                'method': method,
+                'endpoint': endpoint,
+                'requests': len(group),
+                'errors': int((group['status'] >= 400).sum()),
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': latency.max(),
+                'total_s': latency.sum() / 1000,
+                'request_bytes': int(group['request_bytes'].sum()),
+                'response_bytes': int(group['response_bytes'].sum()),
+                'requests_per_s': len(group) / duration
+            })
+
+        return pd.DataFrame(rows, columns=['method', 'endpoint', 'requests', 'errors', 'p50_ms', 'p95_ms',
+            'p99_ms', 'max_ms', 'total_s', 'request_bytes', 'response_bytes', 'requests_per_s'])
+
+    def export(self, path=None):
+        '''Writes the report to request_stats.csv in the output folder, returns the path'''
+        path = path or get_folder('output_file_folder') / REQUEST_STATS_FILE
+        self.to_frame().round(3).to_csv(path, index=False)
+
+        return path
+
+    def summary(self):
+        df = self.to_frame()
+        table = df[['method', 'endpoint', 'requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms']].round(1)
+
+        return f'Requests to the ETM:\n{table.to_string(index=False)}'
+
+
+def endpoint_template(url):
+    '''
+    Returns the path of the url with ids and names replaced by placeholders, e.g.
+    /scenarios/{id}/custom_curves/{key}
+    '''
+    segments = url.split('?', 1)[0].strip('/').split('/')
+    template = []
+
+    for segment in segments:
+        if template and template[-1] in NAMED_SEGMENTS:
+            template.append(NAMED_SEGMENTS[template[-1]])
+            break
+
+        template.append('{id}' if ID_SEGMENT.match(segment) else segment)
+
+    return '/' + '/'.join(template)
+
+
+def print_request_stats():
+    '''Exports and prints the request stats of the run, when they are recorded'''
+    stats = RequestStats.instance
+    if not Settings.get('request_stats') or not stats or not stats.records:
+        return
+
+    path = stats.export()
+    print(f'\n{stats.summary()}')
+    print(f'Written to {path}')
@@ -0,0 +1,179 @@
+'''Runs many sets of user values (samples) on a pool of reused ETM scenarios'''
+
+import csv
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from helpers.Scenario import Scenario
+
+POOL_COLUMNS = ['short_name', 'id', 'title', 'area_code', 'end_year']
+
+
+class SweepPool:
+    '''
+    ETM scenarios that are reused for the samples of a sweep, instead of creating a
+    scenario for each sample. The ids are kept in a csv, so the next sweep reuses the
+    same scenarios. Scenarios of another area or end year are not reused.
+    '''
+
+    def __init__(self, scenarios):
+        self.scenarios = scenarios
+        self.free = queue.Queue()
+        for scenario in scenarios:
+            self.free.put(scenario)
+
+
+    @classmethod
+    def load_or_create(cls, session, template, size, path):
+        '''
+        Returns a pool of size scenarios with the area and end year of the template
+        Scenario. Scenarios missing from the pool csv at path are created in the ETM.
+        '''
+        rows = pd.read_csv(path).to_dict(orient='records') if path.exists() else []
+        matching = [
+            row for row in rows
+            if row['area_code'] == template.area_code and int(row['end_year']) == int(template.end_year)
+        ]
+
+        scenarios = []
+        for index in range(size):
+            if index < len(matching):
+                scenario = Scenario(pd.Series(matching[index]))
+            else:
+                scenario = Scenario(pd.Series({
+                    'short_name': f'{template.short_name}_sweep_{index}',
+                    'title': f'{template.title} (sweep {index})',
+                    'area_code': template.area_code,
+                    'end_year': template.end_year
+                }))
+
+            # Scenarios without an id are created in the ETM here
+            scenario.setup_connection(session)
+            scenarios.append(scenario)
+
+        others = [row for row in rows if row not in matching[:size]]
+        pd.DataFrame(
+            others + [{column: getattr(scenario, column) for column in POOL_COLUMNS} for scenario in scenarios],
+            columns=POOL_COLUMNS
+        ).to_csv(path, index=False)
+
+        return cls(scenarios)
+
+
+    def borrow(self):
+        '''Takes a free scenario from the pool, waits until one is free'''
+        return self.free.get()
+
+
+    def give_back(self, scenario):
+        self.free.put(scenario)
+
+
+class SweepResults:
+    '''
+    Results of a sweep as a csv with a row per sample and a column per query. Each
+    row is written as soon as the sample is done, so a crashed sweep can resume from
+    the samples that are missing. Thread safe.
+    '''
+
+    def __init__(self, path, queries):
+        self.path = path
+        self.queries = list(queries)
+        self.lock = threading.Lock()
+        self.completed = self._read_completed()
+
+
+    def record(self, sample, results):
+        '''Appends the results of the sample, a dict of query: value'''
+        with self.lock:
+            new_file = not self.path.exists()
+
+            with open(self.path, 'a', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(['sample'] + self.queries)
+
+                writer.writerow([sample] + [results.get(query, '') for query in self.queries])
+
+            self.completed.add(sample)
+
+
+    def to_frame(self):
+        return pd.read_csv(self.path, index_col='sample')
+
+
+    def _read_completed(self):
+        if not self.path.exists():
+            return set()
+
+        # Drop a row that was only partly written when the sweep crashed
+        text = self.path.read_text()
+        if text and not text.endswith('\n'):
+            self.path.write_text(text[:text.rfind('\n') + 1])
+
+        with open(self.path, newline='') as f:
+            rows = list(csv.reader(f))
+
+        if rows and rows[0] != ['sample'] + self.queries:
+            raise ValueError(f'{self.path} has results of other queries. '
+                'Move it away to start a new sweep.')
+
+        return {row[0] for row in rows[1:] if row}
+
+
+class SweepRunner:
+    '''
+    Runs samples on a SweepPool: for each sample a free scenario of the pool is reset
+    to the user values of the sample and queried. Samples run concurrently, one per
+    scenario in the pool. Results are checkpointed in SweepResults, and samples that
+    already have results are skipped.
+    '''
+
+    def __init__(self, pool, queries, results):
+        self.pool = pool
+        self.queries = queries
+        self.results = results
+
+
+    def run(self, samples):
+        '''
+        Runs all samples that have no results yet, and yields the name of each sample
+        when it is done. When a sample fails, the samples that have not started yet are
+        cancelled and the error is raised once the running ones are finished.
+
+        Params:
+            samples (dict): The user values of each sample, by sample name
+        '''
+        todo = {name: values for name, values in samples.items() if str(name) not in self.results.completed}
+
+        with ThreadPoolExecutor(max_workers=len(self.pool.scenarios)) as executor:
+            futures = {
+                executor.submit(self.run_sample, name, user_values): name
+                for name, user_values in todo.items()
+            }
+
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    yield futures[future]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+
+    def run_sample(self, name, user_values):
+        '''Resets a scenario from the pool to the user values, and records its query results'''
+        scenario = self.pool.borrow()
+
+        try:
+            scenario.user_values = user_values
+            scenario.api.update_inputs(reset=True)
+            results = scenario.api.query(self.queries, use_cache=False)
+        finally:
+            self.pool.give_back(scenario)
+
+        self.results.record(name, results['future'].to_dict())
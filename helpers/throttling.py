@@ -0,0 +1,153 @@
+'''Client-side rate limiting and retries for requests to the ETM'''
+
+import math
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+from helpers.settings import Settings
+
+# Only these methods are safe to send again
+RETRY_METHODS = ['GET', 'PUT']
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class TokenBucket:
+    '''
+    Token bucket rate limiter. Tokens are added at rate per second up to capacity,
+    each request takes one. Thread safe, and shared by all sessions through shared().
+    '''
+    instance = None
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or 1
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        '''The limiter shared by all sessions, configured by rate_limit in settings.yml'''
+        if not cls.instance:
+            limits = Settings.get('rate_limit') or {}
+            cls.instance = cls(limits.get('requests_per_second'), limits.get('burst'))
+
+        return cls.instance
+
+    def reserve(self):
+        '''Takes a token and returns the number of seconds to wait before using it'''
+        with self.lock:
+            now = time.monotonic()
+            wait = 0.0
+
+            if self.rate:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                wait = max(0.0, -self.tokens / self.rate)
+
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds):
+        '''Hands out no tokens for the next number of seconds, e.g. after a Retry-After'''
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RetryPolicy:
+    '''
+    Decides which responses are retried and how long to wait: exponential backoff
+    with full jitter, or the Retry-After sent by the ETM.
+    '''
+
+    def __init__(self, max_retries=0, backoff_factor=0.5, max_backoff=30.0):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+    @classmethod
+    def from_settings(cls):
+        '''Configured by retries in settings.yml'''
+        return cls(**(Settings.get('retries') or {}))
+
+    def should_retry(self, method, status_code, attempt):
+        return (
+            method.upper() in RETRY_METHODS and
+            status_code in RETRY_STATUSES and
+            attempt < self.max_retries
+        )
+
+    def delay(self, attempt, headers):
+        '''Seconds to wait before the next attempt, never more than max_backoff'''
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+
+class RequestCounters:
+    '''Thread safe counters of throttled and retried requests'''
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def increment(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def __getitem__(self, key):
+        return self.counts[key]
+
+    def summary(self):
+        return (f"{self.counts['throttled']} requests were throttled by the ETM, "
+            f"{self.counts['retries']} requests were retried")
+
+
+counters = RequestCounters()
+
+
+def parse_retry_after(value):
+    '''
+    Returns the seconds in a Retry-After header, given as seconds or as HTTP date,
+    or None when the header is missing or not a finite number of seconds
+    '''
+    if value is None:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    if not math.isfinite(seconds):
+        return None
+
+    return max(0.0, seconds)
+
+
+def register_response(limiter, method, status_code, headers, attempt, policy):
+    '''
+    Counts the response and returns the seconds to wait before retrying it,
+    or None when the response should not be retried
+    '''
+    if status_code == 429:
+        counters.increment('throttled')
+
+    if not policy.should_retry(method, status_code, attempt):
+        return None
+
+    delay = policy.delay(attempt, headers)
+    if status_code == 429:
+        limiter.pause(delay)
+
+    counters.increment('retries')
+    return delay
@@ -0,0 +1,79 @@
+'''Process wide cache of parsed weather inputs, so scenarios sharing a heat_demand folder parse it once'''
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from helpers.settings import Settings
+
+
+class WeatherInputCache:
+    '''
+    LRU cache of parsed input files, keyed by the path, modification time and size of
+    the file, so a changed file is parsed again. The parsed values are read-only numpy
+    arrays (or dicts of them), which are shared by everyone reading the file. Thread
+    safe, and shared by all loaders through shared().
+    '''
+    instance = None
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        '''The cache shared by all loaders, configured by weather_input_cache_size in settings.yml'''
+        if not cls.instance:
+            cls.instance = cls(Settings.get('weather_input_cache_size'))
+
+        return cls.instance
+
+    def load(self, path, parse):
+        '''
+        Returns the parsed contents of the file at path. On a miss the file is parsed
+        with parse(path), which should return an array or a dict of arrays.
+        '''
+        stat = path.stat()
+        key = (str(path), parse.__name__, stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        value = read_only(parse(path))
+
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+
+            if self.max_entries is not None:
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def summary(self):
+        return f'Weather input cache: {self.hits} hits, {self.misses} misses'
+
+
+def read_only(value):
+    '''Returns a read-only copy of an array, or of each array in a dict'''
+    if isinstance(value, dict):
+        return {key: read_only(array) for key, array in value.items()}
+
+    array = np.array(value)
+    array.flags.writeable = False
+
+    return array
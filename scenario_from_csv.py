@@ -6,7 +6,11 @@ from helpers.ETM_API import ETM_API, SessionWithUrlBase
 from helpers.Scenario import ScenarioCollection
 from helpers.Curves import load_curve_file_dict
 from helpers.helpers import process_arguments, print_bold
-from helpers.file_helpers import query_list, data_download_dict, write_csv
+from helpers.file_helpers import query_list, data_download_dict
+from helpers.heat_pipeline import HeatCurvePipeline
+from helpers.request_stats import print_request_stats
+from helpers.throttling import counters
+from helpers.weather_input_cache import WeatherInputCache
 
 if __name__ == "__main__":
 
@@ -32,14 +36,14 @@ if __name__ == "__main__":
                    "outcomes will be collected, no changes to scenarios will "
                    "be made.")
 
-    for scenario in scenarios:
+    def process_scenario(scenario):
         print(f"\nProcessing scenario {scenario.short_name}..")
 
-        if not query_only_mode:
-            if scenario.heat_demand:
-                scenario.set_heat_demand_curves()
+        if pipeline and scenario.heat_demand:
+            scenario.heat_demand_curves = pipeline.curves(scenario)
 
-            scenario.update(curve_file_dict)
+        if not query_only_mode:
+            scenarios.update(scenario, curve_file_dict)
 
         if query_list:
             print(' Getting queries')
@@ -47,12 +51,34 @@ if __name__ == "__main__":
 
         if data_download_dict:
             print(' Getting downloads')
-            for name, download in scenario.get_data_downloads(data_download_dict):
-                write_csv(download, f'{scenario.short_name}_{name}',
-                    folder=scenario.short_name, index=False, header=True)
+            scenario.export_data_downloads(data_download_dict)
+
+    # With heat_curve_workers, heat demand curves are generated in other processes while
+    # the scenarios are updated. Otherwise they are all generated before updating.
+    pipeline = None if query_only_mode else HeatCurvePipeline.from_settings(scenarios)
+
+    if not query_only_mode and not pipeline:
+        for scenario in scenarios:
+            if scenario.heat_demand:
+                scenario.set_heat_demand_curves()
+
+    try:
+        for scenario, _ in scenarios.process(process_scenario):
+            print(f"Finished scenario {scenario.short_name}")
+    finally:
+        if pipeline:
+            pipeline.close()
 
     scenarios.export_scenario_outcomes()
     scenarios.export_ids()
 
+    if counters['throttled'] or counters['retries']:
+        print(f"\n{counters.summary()}")
+
+    if WeatherInputCache.shared().misses:
+        print(WeatherInputCache.shared().summary())
+
+    print_request_stats()
+
     print("\n\nAll done! Open the scenarios in the Energy Transition Model:")
     scenarios.print_urls(model_url)
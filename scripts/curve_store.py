@@ -0,0 +1,41 @@
+# Converts curves between the csv layout and binary curve stores, which are read without
+# parsing text. A store imported next to a curve file in the input curves folder is used by
+# scenario_from_csv instead of the csv, as long as the csv did not change after the import.
+#   python scripts/curve_store.py import data/input/curves/2050_price_curves.csv
+#   python scripts/curve_store.py import data/output/curves/my_scenario --folder
+#   python scripts/curve_store.py export data/input/curves/2050_price_curves.npy prices.csv
+#   python scripts/curve_store.py export data/output/curves/my_scenario.npy my_scenario --folder
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+from helpers.curve_store import CurveStore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert curves between csv files and curve stores.")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('source', type=Path, help='The csv file or folder to import, or the store to export')
+    parser.add_argument('destination', type=Path, nargs='?',
+        help='Where to write the store or csv, defaults to next to the source')
+    parser.add_argument('--folder', action='store_true',
+        help='Use a folder with a csv file per curve instead of one csv file with a column per curve')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        if args.folder:
+            store = CurveStore.from_csv_folder(args.source, args.destination or args.source)
+        else:
+            store = CurveStore.from_curve_file(args.source, args.destination)
+
+        print(f"Imported {len(store)} curves into {store.path}")
+    else:
+        store = CurveStore(args.source)
+        destination = args.destination or store.path.with_suffix('' if args.folder else '.csv')
+
+        if args.folder:
+            store.to_csv_folder(destination)
+        else:
+            store.to_curve_file(destination)
+
+        print(f"Exported {len(store)} curves to {destination}")
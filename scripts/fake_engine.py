@@ -0,0 +1,37 @@
+# Serves a local stand-in for the ETM engine, so the tool can be run and load tested
+# without the live engine. Scenarios are kept in memory until the server stops.
+# The default port matches local_engine_url in settings.yml, so the other scripts can use
+# it with the 'local' argument:
+#   python scripts/fake_engine.py --latency 0.05 --throttle-rate 0.02
+#   python scenario_from_csv.py local
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+from helpers.fake_engine import FakeEngine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the ETM engine.")
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each request takes')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random seconds added to or taken from the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with a 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After sent with a 429, in seconds')
+    parser.add_argument('--seed', type=int, help='Seed for the latency jitter and injected failures')
+    args = parser.parse_args()
+
+    engine = FakeEngine(port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed)
+
+    print(f"Fake engine running at {engine.url}, press Ctrl+C to stop")
+    try:
+        engine.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.server_close()
+
+    print(f"\n{engine.counts['requests']} requests, {engine.counts['throttled']} throttled, "
+        f"{engine.counts['errors']} errors")
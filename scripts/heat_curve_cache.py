@@ -0,0 +1,32 @@
+# Inspects or empties the cache of generated heat demand curves. Curves are cached when
+# a scenario generates heat demand profiles from the weather files in its heat_demand folder.
+#   python scripts/heat_curve_cache.py list
+#   python scripts/heat_curve_cache.py purge
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+from datetime import datetime
+from helpers.file_helpers import get_folder
+from helpers.heat_curve_cache import HeatCurveCache
+from helpers.settings import Settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or empty the heat demand curve cache.")
+    parser.add_argument('command', choices=['list', 'purge'],
+        help='list shows the cached entries, purge removes all of them')
+    args = parser.parse_args()
+
+    cache = HeatCurveCache(get_folder('heat_curve_cache_folder'), Settings.get('heat_curve_cache_size_mb'))
+
+    if args.command == 'list':
+        entries = cache.entries()
+        for entry in entries:
+            last_used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M')
+            print(f"{entry['key'][:12]}  {entry['size'] / 1024 / 1024:6.1f} MB  {last_used}  {len(entry['curves'])} curves")
+
+        total = sum(entry['size'] for entry in entries)
+        print(f"\n{len(entries)} entries, {total / 1024 / 1024:.1f} MB in {cache.folder}")
+    else:
+        print(f"Removed {cache.purge()} entries from {cache.folder}")
@@ -0,0 +1,116 @@
+# Measures the end-to-end throughput of the tool: creates a number of scenarios, and runs
+# them through the same update, query and download steps as scenario_from_csv.py, with
+# scenario_workers at once. By default the scenarios run against a fake engine started by
+# this script (see scripts/fake_engine.py); pass --url to use an engine that is already running.
+# The query cache and curve ledger are turned off, so every run sends all requests.
+#   python scripts/load_test.py --scenarios 100 --workers 8 --latency 0.05 --curves 5
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from helpers.Curves import CurveFile
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.fake_engine import FakeEngine
+from helpers.request_stats import print_request_stats
+from helpers.Scenario import Scenario, ScenarioCollection
+from helpers.settings import Settings
+from helpers.throttling import TokenBucket, counters
+
+
+def load_test_scenarios(count, inputs, curves, rng):
+    '''Scenarios with random values for the given number of inputs, and a shared curve file'''
+    scenarios = []
+    for index in range(count):
+        scenario = Scenario(pd.Series({
+            'short_name': f'load_test_{index}',
+            'title': f'Load test {index}',
+            'area_code': 'nl',
+            'end_year': 2050,
+            'curve_file': 'load_test_curves' if curves else None
+        }))
+        scenario.user_values = {f'input_{key}': value for key, value in enumerate(rng.uniform(0, 100, inputs).round(1))}
+        scenarios.append(scenario)
+
+    return ScenarioCollection(scenarios)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of the tool against a (fake) engine.")
+    parser.add_argument('--scenarios', type=int, default=50, help='Number of scenarios to run')
+    parser.add_argument('--workers', type=int, help='Scenarios processed at once, defaults to scenario_workers')
+    parser.add_argument('--inputs', type=int, default=20, help='Sliders set on each scenario')
+    parser.add_argument('--curves', type=int, default=0, help='Custom curves uploaded to each scenario')
+    parser.add_argument('--queries', type=int, default=10, help='Queries on each scenario')
+    parser.add_argument('--downloads', type=int, default=0, help='Hourly downloads of each scenario')
+    parser.add_argument('--no-rate-limit', action='store_true', help='Ignore rate_limit in settings.yml')
+    parser.add_argument('--url', help='Base url of a running engine, instead of starting a fake engine')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each request to the fake engine takes')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+        help='Share of GET and PUT requests answered with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+        help='Share of GET and PUT requests answered with a 429')
+    args = parser.parse_args()
+
+    Settings.add('request_stats', True)
+    Settings.add('query_cache', False)
+    Settings.add('curve_ledger', False)
+    if args.no_rate_limit:
+        TokenBucket.instance = TokenBucket()
+
+    rng = np.random.default_rng(1337)
+    queries = [f'load_test_query_{index}' for index in range(args.queries)]
+    downloads = {'annual_data': [], 'hourly_data': [f'load_test_download_{index}' for index in range(args.downloads)]}
+    curve_file_dict = {}
+    if args.curves:
+        curve_file_dict['load_test_curves'] = CurveFile('load_test_curves', pd.DataFrame(
+            rng.uniform(0, 100, (8760, args.curves)), columns=[f'load_test_curve_{i}' for i in range(args.curves)]))
+
+    engine = None
+    if not args.url:
+        engine = FakeEngine(latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+            retry_after=0, seed=1337, failing_methods=('GET', 'PUT')).start()
+
+    try:
+        scenarios = load_test_scenarios(args.scenarios, args.inputs, args.curves, rng)
+        session = SessionWithUrlBase(args.url or engine.url)
+
+        started = time.perf_counter()
+        scenarios.setup_connections(session)
+        created = time.perf_counter()
+
+        def process_scenario(scenario):
+            scenarios.update(scenario, curve_file_dict)
+            if queries:
+                scenario.query(queries)
+            if args.downloads:
+                scenario.export_data_downloads(downloads)
+
+        # Keep the output of the steps out of the measurement, and the downloads out of the output folder
+        output_folder = Settings.get('output_file_folder')
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as folder:
+            Settings.add('output_file_folder', folder)
+            for _ in scenarios.process(process_scenario, workers=args.workers):
+                pass
+        finished = time.perf_counter()
+        Settings.add('output_file_folder', output_folder)
+    finally:
+        if engine:
+            engine.stop()
+
+    print(f"Created {len(scenarios)} scenarios in {created - started:.2f}s")
+    print(f"Processed {len(scenarios)} scenarios in {finished - created:.2f}s, "
+        f"{len(scenarios) / (finished - created):.2f} scenarios per second")
+
+    if counters['throttled'] or counters['retries']:
+        print(counters.summary())
+
+    print_request_stats()
@@ -8,6 +8,7 @@ sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 from helpers.Scenario import ScenarioCollection
 from helpers.ETM_API import SessionWithUrlBase
 from helpers.helpers import process_arguments
+from helpers.request_stats import print_request_stats
 from helpers.file_helpers import read_yml
 
 if __name__ == "__main__":
@@ -29,4 +30,6 @@ if __name__ == "__main__":
 
     scenarios.query_all_and_export_outcomes(unpack_queries, 'regional_overview.csv', sections)
 
+    print_request_stats()
+
     print('\nAll done!')
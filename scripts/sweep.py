@@ -0,0 +1,45 @@
+# Runs a sweep: every column of scenario_settings.csv (e.g. the samples written by
+# generate_input.py) is run on a small pool of reused ETM scenarios, instead of creating
+# a scenario per sample. The area and end year of the pool come from the first scenario
+# in scenario_list.csv, and the queries from queries.csv.
+# The results are written to sweep_results.csv in the output folder, one row per sample
+# as soon as it is done. Run the sweep again to resume after a crash.
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.Scenario import Scenario, ScenarioCollection
+from helpers.file_helpers import get_folder, query_list, read_csv
+from helpers.helpers import exit, process_arguments
+from helpers.request_stats import print_request_stats
+from helpers.settings import Settings
+from helpers.sweep import SweepPool, SweepResults, SweepRunner
+
+if __name__ == "__main__":
+    base_url, model_url, _, _ = process_arguments(sys.argv)
+
+    print("Opening CSV files:")
+    template = Scenario(read_csv('scenario_list').iloc[0])
+    settings = ScenarioCollection.read_settings()
+    samples = {name: settings[name].dropna().to_dict() for name in settings.columns}
+    queries = query_list()
+
+    if not queries:
+        exit("A sweep needs queries, please add them to queries.csv")
+
+    output_folder = get_folder('output_file_folder')
+    results = SweepResults(output_folder / 'sweep_results.csv', queries)
+    remaining = len([name for name in samples if str(name) not in results.completed])
+    print(f"\n{len(samples) - remaining} of {len(samples)} samples already done, running {remaining}..")
+
+    pool_size = min(Settings.get('sweep_pool_size') or 1, max(remaining, 1))
+    pool = SweepPool.load_or_create(
+        SessionWithUrlBase(base_url), template, pool_size, output_folder / 'sweep_pool.csv')
+
+    for done, name in enumerate(SweepRunner(pool, queries, results).run(samples), start=1):
+        print(f" Finished {name} ({done}/{remaining})")
+
+    print_request_stats()
+
+    print(f"\nAll done! The results are in {results.path}")
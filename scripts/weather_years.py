@@ -7,6 +7,7 @@ import yaml
 from helpers.ETM_API import ETM_API, SessionWithUrlBase
 from helpers.Scenario import ScenarioCollection
 from helpers.helpers import process_arguments
+from helpers.request_stats import print_request_stats
 
 class HeatDemandCurveGenerator:
     def __init__(self, settings_path='config/local.settings.yml', base_url=None):
@@ -74,3 +75,5 @@ if __name__ == "__main__":
     scenarios = ScenarioCollection.from_csv()
     scenarios.export_ids()
     scenarios.print_urls(model_url)
+
+    print_request_stats()
@@ -0,0 +1,28 @@
+# Generates the heat demand profiles for many weather years at once. The folder
+# (inside the input curves folder) should contain a folder for each weather year with
+# a temperature.csv, irradiation.csv and wind_speed.csv. The thermostat.csv and
+# G2A_parameters.csv in the folder itself are shared by all years.
+# The profiles are written to <folder>_profiles.parquet in the output curves folder.
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+from helpers.file_helpers import get_folder
+from helpers.heat_demand.weather_years_batch import WeatherYearsBatch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate heat demand profiles for a stack of weather years.")
+    parser.add_argument('folder', help='Folder inside the input curves folder with a folder per weather year')
+    parser.add_argument('--processes', type=int, default=1, help='Number of processes used for smoothing')
+    args = parser.parse_args()
+
+    batch = WeatherYearsBatch.from_folder(args.folder)
+    print(f"Generating heat demand profiles for {len(batch.years)} weather years..")
+
+    profiles = batch.generate_all_profiles(processes=args.processes)
+
+    path = get_folder('output_curves_folder') / f'{Path(args.folder).name}_profiles.parquet'
+    WeatherYearsBatch.to_parquet(profiles, path)
+
+    print(f"\nAll done! Written {len(profiles.columns)} profiles to {path}")
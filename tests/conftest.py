@@ -9,6 +9,37 @@ sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 import pytest
 import pandas as pd
 from helpers.Scenario import Scenario
+from helpers.settings import Settings
+from helpers.curve_ledger import CurveLedger
+
+@pytest.fixture(autouse=True)
+def heat_curve_cache_folder(tmp_path):
+    '''Keeps the heat curves generated by the tests out of the data folder'''
+    Settings.add('heat_curve_cache_folder', str(tmp_path / 'heat_curve_cache'))
+
+@pytest.fixture(autouse=True)
+def curve_ledger(tmp_path):
+    '''A fresh ledger of uploaded curves for each test'''
+    CurveLedger.instance = CurveLedger(tmp_path / 'curve_ledger.jsonl')
+    yield CurveLedger.instance
+    CurveLedger.instance = None
+
+@pytest.fixture
+def settings():
+    '''
+    Changes settings for one test: yields a function that adds a setting like Settings.add,
+    and restores the previous value of each added setting afterwards
+    '''
+    previous = {}
+
+    def add(setting, value):
+        previous.setdefault(setting, Settings.get(setting))
+        Settings.add(setting, value)
+
+    yield add
+
+    for setting, value in previous.items():
+        Settings.add(setting, value)
 
 @pytest.fixture
 def default_scenario(test_data=None):
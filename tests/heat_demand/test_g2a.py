@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.buildings_profile_helper import BuildingsModel
+from helpers.heat_demand.g2a import g2a_heat_demand
+from helpers.heat_demand.weather_years_profile_generator import WeatherYearsGenerator
+from helpers.heat_file_utils import load_g2a_parameters, read_heat_demand_input
+from helpers.settings import Settings
+
+
+@pytest.fixture
+def weather():
+    Settings.add('input_curves_folder', 'data/input/curves/')
+
+    return (
+        read_heat_demand_input('dummy_weather_data', 'temperature'),
+        read_heat_demand_input('dummy_weather_data', 'wind_speed'),
+        load_g2a_parameters('dummy_weather_data')
+    )
+
+
+def reference_profile(temperature, wind_speed, parameters):
+    '''The original row by row calculation of the G2A profile, normalized'''
+    parameters = parameters.reset_index(drop=True).copy()
+    parameters['effective'] = (temperature - wind_speed / 1.5).values
+    profile = parameters.apply(lambda row: (
+        (row['reference'] - row['effective']) * row['slope'] + row['constant']
+        if row['effective'] < row['reference'] else row['constant']
+    ), axis=1)
+
+    return (profile / profile.sum() / 3600).values
+
+
+def test_g2a_heat_demand_broadcasts_parameters():
+    effective = np.array([0.0, 10.0, 20.0])
+
+    np.testing.assert_array_equal(g2a_heat_demand(effective, 15.0, 2.0, 1.0), [31.0, 11.0, 1.0])
+    np.testing.assert_array_equal(
+        g2a_heat_demand(effective, [15.0, 5.0, 25.0], 2.0, [1.0, 2.0, 3.0]), [31.0, 2.0, 13.0])
+    np.testing.assert_array_equal(g2a_heat_demand(effective, 0.0, 2.0, 1.0), [1.0, 1.0, 1.0])
+
+
+def test_weather_years_profile_matches_reference(weather):
+    temperature, wind_speed, parameters = weather
+
+    for params in [parameters, parameters.iloc[:1]]:
+        generator = WeatherYearsGenerator(temperature, None, wind_speed, None, params)
+        expected = reference_profile(temperature, wind_speed, pd.concat([params] * (8760 // len(params))))
+
+        np.testing.assert_allclose(
+            generator._make_heat_demand_profile(temperature, wind_speed), expected, rtol=1e-12)
+
+
+def test_weather_years_profile_with_wrong_parameters(weather):
+    temperature, wind_speed, parameters = weather
+    generator = WeatherYearsGenerator(temperature, None, wind_speed, None, parameters.iloc[:2])
+
+    with pytest.raises(ValueError):
+        generator._make_heat_demand_profile(temperature, wind_speed)
+
+
+def test_buildings_model_profile_matches_reference(weather):
+    temperature, wind_speed, parameters = weather
+
+    model = BuildingsModel()
+    model.reference = parameters['reference']
+    model.slope = parameters['slope']
+    model.constant = parameters['constant']
+    profile = model.make_heat_demand_profile(temperature, wind_speed)
+
+    assert profile.name == 'buildings_heating'
+    np.testing.assert_allclose(profile.values, reference_profile(temperature, wind_speed, parameters), rtol=1e-12)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from helpers.heat_demand.config import insulation_config
+from helpers.heat_demand.house import House, calculate_heat_demand_curves
+from helpers.heat_file_utils import read_heat_demand_input, read_thermostat
+from helpers.settings import Settings
+
+
+def test_calculate_heat_demand_curves_matches_per_hour_house():
+    Settings.add('input_curves_folder', 'tests/fixtures/')
+
+    temperature = read_heat_demand_input('heat_demand', 'temperature')
+    irradiation = insulation_config.from_J_cm2_to_Kwh_m2(
+        read_heat_demand_input('heat_demand', 'irradiation'))
+    thermostat = read_thermostat('heat_demand')
+
+    combinations = [
+        (house_type, insulation_type)
+        for house_type in insulation_config.HOUSE_NAMES
+        for insulation_type in insulation_config.INSULATION_TYPES
+    ]
+    houses = [House(house_type, insulation_type, thermostat) for house_type, insulation_type in combinations]
+    heat_demand = calculate_heat_demand_curves(houses, temperature, irradiation)
+
+    assert heat_demand.shape == (8760, 12)
+
+    for column, (house_type, insulation_type) in enumerate(combinations):
+        house = House(house_type, insulation_type, thermostat)
+        expected = np.array([
+            house.calculate_heat_demand(temperature[hour], irradiation[hour], hour % 24)
+            for hour in range(8760)
+        ])
+
+        np.testing.assert_array_equal(heat_demand[:, column], expected)
+        assert houses[column].inside_temperature == house.inside_temperature
@@ -0,0 +1,45 @@
+import numpy as np
+
+from helpers.heat_demand import smoothing
+from helpers.heat_demand.smoothing import calculate_smoothed_demand, INTERPOLATION_STEPS
+
+
+def reference_smoothed_demand(heat_demand, insulation_type):
+    '''The original list based smoothing, to compare against'''
+    steps = INTERPOLATION_STEPS
+    deviations = smoothing.generate_deviations(smoothing.NUMBER_OF_HOUSES,
+        smoothing.HOURS_SHIFTED[insulation_type])
+
+    interpolated = []
+    for index, value in enumerate(heat_demand):
+        stop = heat_demand[0] if index == len(heat_demand) - 1 else heat_demand[index + 1]
+        interpolated.extend(value + i * (stop - value) / steps for i in range(steps))
+
+    cumulative = [0] * len(interpolated)
+    for num in deviations:
+        cumulative = [x + y for x, y in zip(cumulative, np.roll(interpolated, num))]
+
+    cumulative = np.roll(cumulative, steps // 2)
+    return [sum(cumulative[i:(i + steps)]) / steps for i in range(0, len(cumulative), steps)]
+
+
+def test_smoothed_demand_matches_reference():
+    # Two weeks of demand with a warm spell without any demand
+    demand = np.random.default_rng(42).uniform(0, 5, 24 * 14)
+    demand[100:200] = 0.0
+
+    for insulation_type in ['low', 'medium', 'high']:
+        np.random.seed(1337)
+        smoothed = calculate_smoothed_demand(demand, insulation_type)
+        np.random.seed(1337)
+        expected = reference_smoothed_demand(demand, insulation_type)
+
+        assert len(smoothed) == len(demand)
+        np.testing.assert_allclose(smoothed, expected, rtol=1e-12, atol=1e-12)
+        assert (smoothed >= 0).all()
+
+
+def test_interpolate_wraps_around():
+    np.testing.assert_allclose(
+        smoothing.interpolate([0.0, 10.0], 5),
+        [0.0, 2.0, 4.0, 6.0, 8.0, 10.0, 8.0, 6.0, 4.0, 2.0])
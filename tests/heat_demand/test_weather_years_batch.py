@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.heat_demand.smoothing import RANDOM_SEED
+from helpers.heat_demand.weather_years_batch import WeatherYearsBatch
+from helpers.heat_demand.weather_years_profile_generator import WeatherYearsGenerator
+from helpers.heat_file_utils import load_g2a_parameters, read_heat_demand_input, read_thermostat
+
+
+@pytest.fixture
+def weather_folder(tmp_path, settings):
+    '''A folder with two weather years, a cold one and the dummy weather data'''
+    settings('input_curves_folder', 'data/input/curves/')
+    weather = {
+        data_type: read_heat_demand_input('dummy_weather_data', data_type)
+        for data_type in ['temperature', 'irradiation', 'wind_speed']
+    }
+
+    for year, offset in [('1987', -5.0), ('2023', 0.0)]:
+        (tmp_path / 'years' / year).mkdir(parents=True)
+        for data_type, curve in weather.items():
+            curve = curve + offset if data_type == 'temperature' else curve
+            curve.to_csv(tmp_path / 'years' / year / f'{data_type}.csv', index=False, header=False)
+
+    read_thermostat('dummy_weather_data').to_csv(tmp_path / 'years' / 'thermostat.csv', index=False)
+    load_g2a_parameters('dummy_weather_data').to_csv(tmp_path / 'years' / 'G2A_parameters.csv', index=False)
+
+    settings('input_curves_folder', str(tmp_path))
+    return weather
+
+
+def test_batch_matches_single_year_generator(weather_folder):
+    batch = WeatherYearsBatch.from_folder('years')
+    profiles = batch.generate_all_profiles()
+
+    assert batch.years == ['1987', '2023']
+    assert len(profiles.columns) == 2 * 14
+    assert np.allclose(profiles.sum(), 1 / 3600)
+
+    np.random.seed(RANDOM_SEED)
+    generator = WeatherYearsGenerator(
+        weather_folder['temperature'], weather_folder['irradiation'], weather_folder['wind_speed'],
+        batch.therm, batch.g2a_params)
+
+    for curve in generator.generate_all_profiles():
+        np.testing.assert_allclose(profiles[('2023', curve.key)], curve.data, rtol=1e-12)
+
+    # The cold year needs more heating in winter
+    assert not profiles['1987'].equals(profiles['2023'])
+
+
+def test_batch_with_process_pool(weather_folder, tmp_path):
+    batch = WeatherYearsBatch.from_folder('years')
+    sequential = batch.generate_house_profiles()
+    parallel = batch.generate_house_profiles(processes=2)
+
+    pd.testing.assert_frame_equal(sequential, parallel)
+
+    WeatherYearsBatch.to_parquet(parallel, tmp_path / 'profiles.parquet')
+    written = pd.read_parquet(tmp_path / 'profiles.parquet')
+    np.testing.assert_array_equal(
+        written['1987/insulation_apartments_high'], parallel[('1987', 'insulation_apartments_high')])
+
+
+def test_batch_from_arrays_needs_full_years():
+    with pytest.raises(ValueError):
+        WeatherYearsBatch(np.zeros((100, 2)))
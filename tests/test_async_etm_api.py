@@ -0,0 +1,186 @@
+'''Tests for the AsyncETM_API class'''
+
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from helpers.AsyncETM_API import AsyncSessionWithUrlBase, AsyncETM_API, ETMError
+from helpers.Curves import Curve
+
+### FIXTURES & HELPERS & CONSTANTS ###
+
+SCENARIO_ID = 12345
+CURVES = ['interconnector_1_price', 'weather/insulation_apartments_low']
+
+
+def fake_engine(in_flight):
+    '''Returns an aiohttp app answering like the ETM, and counting concurrent requests'''
+    async def track(request, handler):
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        await asyncio.sleep(0.01)
+        try:
+            return await handler(request)
+        finally:
+            in_flight['now'] -= 1
+
+    async def custom_curves(request):
+        return web.json_response([{'key': key, 'attached': True} for key in CURVES] +
+            [{'key': 'not_attached', 'attached': False}])
+
+    async def custom_curve(request):
+        return web.Response(text='\n'.join(['1.0'] * 8760))
+
+    async def heat_network_order(request):
+        return web.json_response({'order': [f"burner_{request.query['subtype']}"]})
+
+    async def custom_order(request):
+        return web.json_response({'order': ['a', 'b']})
+
+    async def update_scenario(request):
+        return web.json_response({})
+
+    async def upload(request):
+        data = await request.post()
+        in_flight.setdefault('uploaded', []).append(request.match_info['key'])
+        if request.match_info['key'] == 'flaky_curve' and not in_flight.get('failed'):
+            in_flight['failed'] = True
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        if len(data['file'].file.read().split()) != 8760:
+            return web.json_response({'errors': ['Curve should have 8760 values']}, status=422)
+        return web.json_response({})
+
+    app = web.Application(middlewares=[web.middleware(track)])
+    app.router.add_put(f'/scenarios/{SCENARIO_ID}', update_scenario)
+    app.router.add_get(f'/scenarios/{SCENARIO_ID}/custom_curves', custom_curves)
+    app.router.add_get(f'/scenarios/{SCENARIO_ID}/custom_curves/{{key:.+}}.csv', custom_curve)
+    app.router.add_put(f'/scenarios/{SCENARIO_ID}/custom_curves/{{key:.+}}', upload)
+    app.router.add_get(f'/scenarios/{SCENARIO_ID}/heat_network_order', heat_network_order)
+    app.router.add_get(f'/scenarios/{SCENARIO_ID}/{{order}}', custom_order)
+
+    return app
+
+
+def run_against_fake_engine(scenario, coroutine_function, max_concurrency=10, in_flight=None):
+    '''
+    Runs coroutine_function(api) against the fake engine, returns the result and max requests
+    in flight. Pass in_flight to inspect the requests afterwards, e.g. the uploaded curves.
+    '''
+    in_flight = {'now': 0, 'max': 0} if in_flight is None else in_flight
+    in_flight.update(now=0, max=0)
+
+    async def run():
+        async with TestServer(fake_engine(in_flight)) as server:
+            async with AsyncSessionWithUrlBase(str(server.make_url('')), max_concurrency) as session:
+                api = await AsyncETM_API.connect(session, scenario)
+                return await coroutine_function(api)
+
+    return asyncio.run(run()), in_flight['max']
+
+
+def heat_demand_only(scenario):
+    '''Leaves only the heat demand of the scenario to be updated'''
+    scenario.id = SCENARIO_ID
+    for setting in ['user_values', 'flexibility_order', 'curve_file']:
+        setattr(scenario, setting, None)
+    scenario.heat_network_orders = {}
+    scenario.heat_demand_curves = [
+        Curve('insulation_apartments_low', [1.0] * 8760),
+        Curve('insulation_apartments_high', [0.0] * 8760)
+    ]
+
+    return scenario
+
+### TESTS ###
+
+def test_get_custom_curves_concurrently(default_scenario):
+    default_scenario.id = SCENARIO_ID
+
+    df, max_in_flight = run_against_fake_engine(
+        default_scenario, lambda api: api.get_custom_curves())
+
+    assert list(df.columns) == CURVES
+    assert len(df.index) == 8760
+    assert max_in_flight == len(CURVES)
+
+
+def test_get_orders_respects_concurrency_limit(default_scenario):
+    default_scenario.id = SCENARIO_ID
+    orders = ['hydrogen_supply_order', 'hydrogen_demand_order', 'forecast_storage_order']
+    heat_orders = ['heat_network_order_lt', 'heat_network_order_mt', 'heat_network_order_ht']
+
+    async def get_orders(api):
+        return (
+            await api.get_custom_orders(orders),
+            await api.get_heat_network_orders(heat_orders)
+        )
+
+    (custom, heat), max_in_flight = run_against_fake_engine(
+        default_scenario, get_orders, max_concurrency=2)
+
+    assert list(custom.columns) == orders
+    assert custom['forecast_storage_order'][0] == 'a b'
+    assert heat.loc['heat_network_order_mt', 0] == 'burner_mt'
+    assert max_in_flight == 2
+
+
+def test_upload_errors_raise(default_scenario):
+    default_scenario.id = SCENARIO_ID
+
+    with pytest.raises(ETMError) as error:
+        run_against_fake_engine(
+            default_scenario, lambda api: api.upload_custom_curve('some_curve', [1.0] * 10, 'file'))
+
+    assert error.value.status == 422
+    assert 'Curve should have 8760 values' in str(error.value)
+
+
+def test_upload_retried_when_engine_is_busy(default_scenario):
+    default_scenario.id = SCENARIO_ID
+
+    # No errors thrown
+    run_against_fake_engine(
+        default_scenario, lambda api: api.upload_custom_curve('flaky_curve', [1.0] * 8760, 'file'))
+
+
+def test_unchanged_curves_are_not_uploaded_again(default_scenario):
+    default_scenario.id = SCENARIO_ID
+
+    async def upload_twice(api):
+        return [
+            await asyncio.gather(*(api.upload_custom_curve(key, [1.0] * 8760, 'file') for key in CURVES))
+            for _ in range(2)
+        ]
+
+    (first, second), _ = run_against_fake_engine(default_scenario, upload_twice)
+
+    assert first == [True, True]
+    assert second == [False, False]
+
+
+def test_update_skips_heat_demand_curves_without_data(default_scenario, settings, tmp_path):
+    settings('output_curves_folder', str(tmp_path))
+    scenario = heat_demand_only(default_scenario)
+    requests = {}
+
+    run_against_fake_engine(scenario, lambda api: api.update({}), in_flight=requests)
+
+    assert requests['uploaded'] == ['weather/insulation_apartments_low']
+    assert scenario.changed_in_run
+
+    # Like ETM_API, the generated curves are written to the output curves folder
+    assert (tmp_path / 'test_scen' / 'insulation_apartments_low.csv').exists()
+    assert not (tmp_path / 'test_scen' / 'insulation_apartments_high.csv').exists()
+
+
+def test_update_uploads_heat_demand_curves_of_curve_file_dict(default_scenario, settings, tmp_path):
+    settings('output_curves_folder', str(tmp_path))
+    scenario = heat_demand_only(default_scenario)
+    requests = {}
+
+    curve_file_dict = {'insulation_terraced_houses_low': Curve('insulation_terraced_houses_low', [2.0] * 8760)}
+    run_against_fake_engine(scenario, lambda api: api.update(curve_file_dict), in_flight=requests)
+
+    assert requests['uploaded'] == ['weather/insulation_terraced_houses_low']
+    assert not (tmp_path / 'test_scen').exists()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from unittest import mock
+
+from helpers import curve_ledger
+from helpers.curve_ledger import CurveLedger, curve_body, curve_hash
+from helpers.json_log import scenario_key
+
+PRO = scenario_key('https://engine.energytransitionmodel.com/api/v3', 12345)
+BETA = scenario_key('https://beta.engine.energytransitionmodel.com/api/v3', 12345)
+
+
+def test_curve_hash_depends_on_values():
+    assert curve_hash(np.arange(10.0)) == curve_hash(list(np.arange(10.0)))
+    assert curve_hash(np.arange(10.0)) != curve_hash(np.arange(1.0, 11.0))
+
+
+def test_curve_hash_of_string_values():
+    strings = pd.Series(['0.5', '1.25', '3'], dtype=str)
+
+    assert curve_hash(strings) == curve_hash(strings.copy(deep=True))
+    assert curve_hash(strings) == curve_hash(pd.Series([0.5, 1.25, 3.0]))
+
+
+def test_curve_body_is_formatted_once_per_curve():
+    data = np.array([0.5, 1.5, 2.5])
+
+    with mock.patch.object(curve_ledger, '_bodies', OrderedDict()) as bodies:
+        assert curve_body(data) == '0.5\n1.5\n2.5'
+        assert list(bodies) == [curve_hash(data)]
+        bodies[curve_hash(data)] = 'cached'
+
+        assert curve_body(data.copy()) == 'cached'
+
+
+def test_ledger_is_kept_between_runs(tmp_path):
+    path = tmp_path / 'curve_ledger.jsonl'
+    ledger = CurveLedger(path)
+    ledger.record(PRO, 'weather/insulation_apartments_low', 'abc', 'insulation_apartments_low')
+
+    entry = CurveLedger(path).lookup(PRO, 'weather/insulation_apartments_low')
+    assert entry == {'hash': 'abc', 'file_name': 'insulation_apartments_low'}
+
+    ledger.forget(PRO)
+    assert not CurveLedger(path).lookup(PRO, 'weather/insulation_apartments_low')
+
+
+def test_ledger_keeps_engines_apart(tmp_path):
+    ledger = CurveLedger(tmp_path / 'curve_ledger.jsonl')
+    ledger.record(PRO, 'interconnector_1_price', 'abc', 'prices')
+
+    assert not ledger.lookup(BETA, 'interconnector_1_price')
+
+
+def test_ledger_appends_and_drops_superseded_records(tmp_path):
+    path = tmp_path / 'curve_ledger.jsonl'
+    ledger = CurveLedger(path)
+    for content_hash in ['a', 'b', 'c']:
+        ledger.record(PRO, 'interconnector_1_price', content_hash, 'prices')
+    ledger.record(PRO, 'interconnector_2_price', 'd', 'prices')
+    ledger.forget(PRO, ['interconnector_2_price'])
+
+    assert len(path.read_text().splitlines()) == 5
+
+    # Opening the ledger in a next run keeps only the current entries
+    assert CurveLedger(path).lookup(PRO, 'interconnector_1_price') == {'hash': 'c', 'file_name': 'prices'}
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_ledger_skips_a_cut_off_record(tmp_path):
+    path = tmp_path / 'curve_ledger.jsonl'
+    CurveLedger(path).record(PRO, 'interconnector_1_price', 'abc', 'prices')
+    with open(path, 'a') as f:
+        f.write('{"scenario": "cut')
+
+    assert CurveLedger(path).lookup(PRO, 'interconnector_1_price')
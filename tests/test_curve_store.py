@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pandas as pd
+
+from helpers.Curves import CurveFile
+from helpers.curve_store import CurveStore
+
+PRICE_CURVES = {
+    'interconnector_1_price': np.linspace(0, 1, 8760),
+    'interconnector_2_price': np.linspace(1, 2, 8760)
+}
+
+
+def test_write_and_read_curves(tmp_path):
+    store = CurveStore.write(tmp_path / 'prices', PRICE_CURVES)
+    store = CurveStore(tmp_path / 'prices')
+
+    assert store.keys() == list(PRICE_CURVES)
+    assert 'interconnector_2_price' in store
+    np.testing.assert_array_equal(store.get('interconnector_2_price'), PRICE_CURVES['interconnector_2_price'])
+
+
+def test_curves_are_read_only_views_on_the_file(tmp_path):
+    store = CurveStore.write(tmp_path / 'prices', PRICE_CURVES)
+    curve = store.get('interconnector_2_price')
+
+    assert isinstance(curve.base, np.memmap)
+    assert not curve.flags.writeable
+
+    with open(store.path, 'rb') as f:
+        f.seek(store.offset('interconnector_2_price'))
+        np.testing.assert_array_equal(np.frombuffer(f.read(8760 * 8)), curve)
+
+
+def test_csv_folder_round_trip(tmp_path):
+    store = CurveStore.write(tmp_path / 'prices', PRICE_CURVES)
+    store.to_csv_folder(tmp_path / 'csv')
+
+    imported = CurveStore.from_csv_folder(tmp_path / 'csv', tmp_path / 'imported')
+
+    assert sorted(imported.keys()) == sorted(PRICE_CURVES)
+    np.testing.assert_allclose(imported.get('interconnector_1_price'), PRICE_CURVES['interconnector_1_price'])
+
+
+def test_curve_file_reads_current_store(tmp_path, settings):
+    settings('input_curves_folder', str(tmp_path))
+    pd.DataFrame(PRICE_CURVES).to_csv(tmp_path / 'prices.csv', index=False)
+    CurveStore.from_curve_file(tmp_path / 'prices.csv')
+
+    # The csv changed after the import
+    pd.DataFrame(PRICE_CURVES).to_csv(tmp_path / 'changed.csv', index=False)
+    CurveStore.from_curve_file(tmp_path / 'changed.csv')
+    pd.DataFrame({'other_price': np.ones(8760)}).to_csv(tmp_path / 'changed.csv', index=False)
+    os.utime(tmp_path / 'changed.npy', (0, 0))
+
+    assert {curve.key for curve in CurveFile.from_csv('prices').curves} == set(PRICE_CURVES)
+    assert {curve.key for curve in CurveFile.from_csv('changed').curves} == {'other_price'}
@@ -0,0 +1,163 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+import pandas as pd
+from unittest import mock
+
+from helpers.Curves import Curve, CurveFile, CurveFileRegistry
+from helpers.Scenario import ScenarioCollection
+
+
+def write_curve_file(tmp_path, df, name='prices'):
+    df.to_csv(tmp_path / f'{name}.csv', index=False)
+
+
+@pytest.fixture(autouse=True)
+def curves_folder(tmp_path, settings):
+    '''Reads the curve files of each test from its own folder'''
+    settings('input_curves_folder', str(tmp_path))
+
+
+def test_curves_are_contiguous_float_arrays(tmp_path):
+    write_curve_file(tmp_path, pd.DataFrame({'a_price': np.arange(8760), 'b_price': np.ones(8760)}))
+
+    curves = {curve.key: curve.data for curve in CurveFile.from_csv('prices').curves}
+
+    assert curves['a_price'].dtype == np.float64
+    assert curves['a_price'].flags.c_contiguous
+    np.testing.assert_array_equal(curves['a_price'], np.arange(8760))
+
+
+def test_all_invalid_cells_are_reported(tmp_path, capsys):
+    df = pd.DataFrame({'a_price': np.ones(8760), 'b_price': np.ones(8760)}).astype(object)
+    df.iloc[3, 0] = 'abc'
+    df.iloc[10, 1] = None
+    write_curve_file(tmp_path, df)
+
+    with pytest.raises(SystemExit):
+        CurveFile.from_csv('prices')
+
+    output = capsys.readouterr().out
+    assert '2 cells are invalid' in output
+    assert "a_price, line 5: 'abc'" in output
+    assert "b_price, line 12: ''" in output
+
+
+def test_duplicate_columns_are_not_allowed(tmp_path):
+    write_curve_file(tmp_path, pd.DataFrame({'a_price': np.ones(8760), 'A_price': np.ones(8760)}))
+
+    with pytest.raises(SystemExit):
+        CurveFile.from_csv('prices')
+
+
+def test_exact_duplicate_columns_are_not_allowed(tmp_path, capsys):
+    (tmp_path / 'prices.csv').write_text('a_price,a_price\n' + '1.0,2.0\n' * 8760)
+
+    with pytest.raises(SystemExit):
+        CurveFile.from_csv('prices')
+
+    assert "'a_price' included twice" in capsys.readouterr().out
+
+
+def test_curves_should_have_8760_values(tmp_path):
+    write_curve_file(tmp_path, pd.DataFrame({'a_price': np.ones(100)}))
+
+    with pytest.raises(SystemExit):
+        CurveFile.from_csv('prices')
+
+
+def fake_curve_file(file_name):
+    curve_file = mock.Mock()
+    curve_file.curves = {Curve(file_name, np.zeros(8760))}
+    return curve_file
+
+
+def test_registry_reads_files_on_first_access():
+    with mock.patch.object(CurveFile, 'from_csv', side_effect=fake_curve_file) as from_csv:
+        registry = CurveFileRegistry(['prices', 'prices', 'profiles'])
+        assert from_csv.call_count == 0
+
+        registry['prices']
+        registry['prices']
+
+        assert from_csv.call_count == 1
+        assert 'profiles' in registry
+        assert list(registry.loaded) == ['prices']
+
+
+def test_registry_drops_files_after_last_release():
+    with mock.patch.object(CurveFile, 'from_csv', side_effect=fake_curve_file):
+        registry = CurveFileRegistry(['prices', 'prices'])
+        registry['prices']
+
+        registry.release('prices')
+        assert 'prices' in registry.loaded
+
+        registry.release('prices')
+        assert not registry.loaded
+
+
+def test_registry_evicts_least_recently_used_files():
+    # Each fake curve file takes 8760 * 8 bytes
+    with mock.patch.object(CurveFile, 'from_csv', side_effect=fake_curve_file) as from_csv:
+        registry = CurveFileRegistry(['a', 'b', 'c'], max_size_mb=2.5 * 8760 * 8 / 1024 / 1024)
+        registry['a']
+        registry['b']
+        registry['a']
+        registry['c']
+
+        assert list(registry.loaded) == ['a', 'c']
+
+        registry['b']
+        assert from_csv.call_count == 4
+
+
+def test_registry_reads_other_files_while_one_is_read():
+    reading, done = threading.Event(), threading.Event()
+
+    def slow_curve_file(file_name):
+        if file_name == 'slow':
+            reading.set()
+            assert done.wait(5)
+        return fake_curve_file(file_name)
+
+    with mock.patch.object(CurveFile, 'from_csv', side_effect=slow_curve_file) as from_csv:
+        registry = CurveFileRegistry(['slow', 'fast'])
+        registry['fast']
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            slow = [executor.submit(registry.__getitem__, 'slow') for _ in range(2)]
+            assert reading.wait(5)
+
+            # The loaded file is available while the other one is read
+            assert registry['fast'] is registry.loaded['fast']
+            done.set()
+
+            assert slow[0].result() is slow[1].result()
+
+        assert from_csv.call_count == 2
+
+
+def test_registry_does_not_keep_released_files():
+    with mock.patch.object(CurveFile, 'from_csv', side_effect=fake_curve_file) as from_csv:
+        registry = CurveFileRegistry(['prices'])
+        registry['prices']
+        registry.release('prices')
+
+        assert dict(registry.items())['prices']
+        assert not registry.loaded
+        assert from_csv.call_count == 2
+
+
+def test_collection_releases_curve_file_after_update(default_scenario):
+    collection = ScenarioCollection([default_scenario])
+    default_scenario.curve_file = 'prices'
+    registry = mock.Mock(spec=CurveFileRegistry)
+
+    with mock.patch.object(default_scenario, 'update', side_effect=SystemExit):
+        with pytest.raises(SystemExit):
+            collection.update(default_scenario, registry)
+
+    registry.release.assert_called_once_with('prices')
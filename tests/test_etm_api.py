@@ -8,6 +8,8 @@ from pathlib import Path
 from helpers.ETM_API import SessionWithUrlBase, ETM_API
 from helpers.Curves import Curve
 from helpers.settings import Settings
+from helpers.throttling import counters
+from helpers.query_cache import QueryCache
 from helpers.heat_demand.config import insulation_config
 
 ### FIXTURES & HELPERS & CONSTANTS ###
@@ -138,3 +140,323 @@ def test_create_etm_scenario_with_falsey_end_year(default_api, default_scenario,
     default_api.create_etm_scenario()
 
     assert default_scenario.end_year == 2050
+
+
+def test_session_mounts_connection_pool(settings):
+    settings('connection_pool', {'pool_connections': 2, 'pool_maxsize': 7})
+
+    session = SessionWithUrlBase(BASE_URL)
+    adapter = session.get_adapter(BASE_URL)
+
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 7
+    assert session.headers['Connection'] == 'keep-alive'
+
+
+def test_requests_keep_connection_alive(default_api, default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+
+    mock_etm_response(requests_mock, endpoint=f'/scenarios/{default_scenario.id}')
+    default_api.update_properties()
+
+    assert requests_mock.last_request.headers.get('Connection') != 'close'
+
+
+def test_throttled_requests_are_retried(default_api, default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    throttled = counters['throttled']
+
+    requests_mock.put(BASE_URL + f'/scenarios/{default_scenario.id}', [
+        {'status_code': 429, 'headers': {'Retry-After': '0'}},
+        {'status_code': 503, 'headers': {'Retry-After': '0'}},
+        {'status_code': 200, 'json': {}}
+    ])
+
+    # No errors thrown
+    default_api.update_properties()
+
+    assert requests_mock.call_count == 3
+    assert counters['throttled'] == throttled + 1
+
+
+def test_scenario_creation_is_not_retried(default_api, default_scenario, requests_mock):
+    default_api.scenario = default_scenario
+    default_scenario.id = None
+
+    mock_etm_response(requests_mock, method='post', resp={'errors': ['Busy']}, status_code=503)
+
+    with pytest.raises(SystemExit):
+        default_api.create_etm_scenario()
+
+    assert requests_mock.call_count == 1
+
+
+def test_export_data_downloads_streams_to_disk(default_api, default_scenario, requests_mock, tmp_path, settings):
+    settings('output_file_folder', str(tmp_path))
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+
+    content = 'key,value\n' + '\n'.join(f'row_{i},{i}.5' for i in range(1000)) + '\n'
+    requests_mock.get(BASE_URL + '/scenarios/12345/energy_flow', text=content)
+    requests_mock.get(BASE_URL + '/scenarios/12345/curves/merit_order', text=content)
+
+    default_api.export_data_downloads({'annual_data': ['energy_flow'], 'hourly_data': ['merit_order']})
+
+    for name in ['energy_flow', 'merit_order']:
+        assert (tmp_path / 'test_scen' / f'test_scen_{name}.csv').read_text() == content
+
+
+def test_export_data_download_with_other_csv_format(default_api, default_scenario, requests_mock, tmp_path,
+        settings):
+    settings('output_file_folder', str(tmp_path))
+    settings('csv_separator', ';')
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+
+    requests_mock.get(BASE_URL + '/scenarios/12345/energy_flow', text='key,value\nrow,1.5\n')
+
+    default_api.export_data_download('energy_flow')
+
+    assert (tmp_path / 'test_scen' / 'test_scen_energy_flow.csv').read_text() == 'key;value\nrow;1.5\n'
+
+
+def test_stream_data_download_without_merit(default_api, default_scenario, requests_mock, tmp_path):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+
+    requests_mock.get(BASE_URL + '/scenarios/12345/curves/merit_order', text='<!DOCTYPE html><html></html>')
+
+    with pytest.raises(SystemExit):
+        default_api.stream_data_download('merit_order', tmp_path / 'merit_order.csv', hourly=True)
+
+    assert not (tmp_path / 'merit_order.csv').exists()
+
+
+def mock_query_responses(requests_mock, scenario_id, updated_at='2024-01-01T00:00:00.000Z'):
+    '''Mocks the scenario info and gqueries, the results are the length of the query key'''
+    def gqueries(request, context):
+        return {'gqueries': {
+            query: {'present': 0, 'future': len(query), 'unit': 'PJ'}
+            for query in request.json().get('gqueries', [])
+        }}
+
+    requests_mock.get(BASE_URL + f'/scenarios/{scenario_id}',
+        json={'user_values': {'slider': 1.0}, 'updated_at': updated_at})
+    requests_mock.put(BASE_URL + f'/scenarios/{scenario_id}', json=gqueries)
+
+
+def query_puts(requests_mock):
+    return [request for request in requests_mock.request_history if request.method == 'PUT']
+
+
+@pytest.fixture
+def query_cache(tmp_path, settings):
+    '''A fresh query cache, switched on for the test'''
+    settings('query_cache', True)
+    QueryCache.instance = QueryCache(tmp_path / 'query_cache.jsonl')
+    yield QueryCache.instance
+    QueryCache.instance = None
+
+
+def info_gets(requests_mock):
+    return [request for request in requests_mock.request_history if request.method == 'GET']
+
+
+def test_query_in_batches(default_api, default_scenario, requests_mock, settings):
+    settings('query_batch_size', 2)
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_query_responses(requests_mock, default_scenario.id)
+
+    queries = ['q', 'qq', 'qqq', 'qqqq', 'qqqqq']
+    results = default_api.query(queries)
+
+    assert len(query_puts(requests_mock)) == 3
+    assert list(results.index) == queries
+    assert list(results['future']) == [1, 2, 3, 4, 5]
+
+
+def test_query_served_from_cache_when_unchanged(default_api, default_scenario, requests_mock, tmp_path,
+        query_cache):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_query_responses(requests_mock, default_scenario.id)
+
+    default_api.query(['q', 'qq'])
+    assert len(query_puts(requests_mock)) == 1
+    assert len(info_gets(requests_mock)) == 1
+
+    # Unchanged scenario, one new query
+    results = default_api.query(['qq', 'qqq', 'q'])
+    assert len(query_puts(requests_mock)) == 2
+    assert query_puts(requests_mock)[-1].json()['gqueries'] == ['qqq']
+    assert list(results['future']) == [2, 3, 1]
+
+    # Everything cached, also for a new run
+    QueryCache.instance = QueryCache(tmp_path / 'query_cache.jsonl')
+    default_api.query(['q', 'qq', 'qqq'])
+    assert len(query_puts(requests_mock)) == 2
+
+    # The scenario was updated
+    mock_query_responses(requests_mock, default_scenario.id, updated_at='2024-02-01T00:00:00.000Z')
+    default_api.query(['q', 'qq'])
+    assert query_puts(requests_mock)[-1].json()['gqueries'] == ['q', 'qq']
+
+
+def test_query_cache_expires(default_api, default_scenario, requests_mock, tmp_path, query_cache):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_query_responses(requests_mock, default_scenario.id)
+
+    default_api.query(['q'])
+    QueryCache.instance = QueryCache(tmp_path / 'query_cache.jsonl', max_age=1)
+    QueryCache.instance.entries[BASE_URL + '/scenarios/12345']['stored_at'] -= 7200
+
+    default_api.query(['q'])
+    assert len(query_puts(requests_mock)) == 2
+
+
+def test_query_skips_cache_for_scenarios_changed_in_run(default_api, default_scenario, requests_mock,
+        query_cache):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_query_responses(requests_mock, default_scenario.id)
+
+    default_api.update_properties()
+    default_api.query(['q', 'qq'])
+
+    assert not info_gets(requests_mock)
+    assert not query_cache.entries
+
+
+def curve_puts(requests_mock):
+    return [request for request in requests_mock.request_history
+        if request.method == 'PUT' and '/custom_curves/' in request.path]
+
+
+def test_unchanged_curves_are_not_uploaded_again(default_api, default_scenario, requests_mock, curve_ledger):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_etm_response(requests_mock, endpoint='/scenarios/12345/custom_curves/interconnector_1_price')
+    requests_mock.get(BASE_URL + '/scenarios/12345/custom_curves?include_internal=true',
+        json=[{'key': 'interconnector_1_price', 'attached': True}])
+
+    assert default_api.upload_custom_curve('interconnector_1_price', [1.0, 2.0], 'prices')
+    assert b'1.0\n2.0' in curve_puts(requests_mock)[0].body
+
+    # Same curve, also in a new run
+    assert not ETM_API(default_api.session, default_scenario).upload_custom_curve(
+        'interconnector_1_price', [1.0, 2.0], 'prices')
+    assert len(curve_puts(requests_mock)) == 1
+
+    # Changed curve
+    assert default_api.upload_custom_curve('interconnector_1_price', [1.0, 3.0], 'prices')
+    assert len(curve_puts(requests_mock)) == 2
+
+
+def test_detached_curves_are_uploaded_again(default_api, default_scenario, requests_mock, curve_ledger):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_etm_response(requests_mock, endpoint='/scenarios/12345/custom_curves/interconnector_1_price')
+    requests_mock.get(BASE_URL + '/scenarios/12345/custom_curves?include_internal=true',
+        json=[{'key': 'interconnector_1_price', 'attached': False}])
+
+    default_api.upload_custom_curve('interconnector_1_price', [1.0, 2.0], 'prices')
+    assert default_api.upload_custom_curve('interconnector_1_price', [1.0, 2.0], 'prices')
+
+    assert len(curve_puts(requests_mock)) == 2
+    assert curve_ledger.lookup(BASE_URL + '/scenarios/12345', 'interconnector_1_price')
+
+
+def test_curves_are_always_uploaded_without_ledger(default_api, default_scenario, requests_mock, settings):
+    settings('curve_ledger', False)
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_etm_response(requests_mock, endpoint='/scenarios/12345/custom_curves/interconnector_1_price')
+
+    default_api.upload_custom_curve('interconnector_1_price', [1.0, 2.0], 'prices')
+    default_api.upload_custom_curve('interconnector_1_price', [1.0, 2.0], 'prices')
+
+    assert len(curve_puts(requests_mock)) == 2
+
+
+def mock_slider_responses(requests_mock, scenario_id):
+    requests_mock.get(BASE_URL + f'/scenarios/{scenario_id}', json={'user_values': {'slider': 1.0}})
+    requests_mock.put(BASE_URL + f'/scenarios/{scenario_id}', json={})
+
+
+def slider_puts(requests_mock):
+    return [request.json()['scenario']['user_values'] for request in query_puts(requests_mock)]
+
+
+def test_update_inputs_sends_only_changed_sliders(default_api, default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_slider_responses(requests_mock, default_scenario.id)
+
+    default_scenario.user_values = {'slider': 1.0, 'other_slider': 2.0}
+    assert default_api.update_inputs()
+
+    default_scenario.user_values = {'slider': 3.0, 'other_slider': 2.0}
+    assert default_api.update_inputs()
+
+    # Nothing changed, nothing is sent
+    assert not default_api.update_inputs()
+
+    assert slider_puts(requests_mock) == [{'other_slider': 2.0}, {'slider': 3.0}]
+    # The remote user values were only requested once
+    assert len([r for r in requests_mock.request_history if r.method == 'GET']) == 1
+
+
+def test_update_inputs_resets_removed_sliders(default_api, default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_slider_responses(requests_mock, default_scenario.id)
+
+    default_scenario.user_values = {'first_set': 1.0}
+    default_api.update_inputs()
+    default_scenario.user_values = {'second_set': 2.0}
+    default_api.update_inputs()
+    default_scenario.user_values = {'third_set': 3.0}
+    default_api.update_inputs()
+
+    # Sliders set outside the tool are left alone
+    assert slider_puts(requests_mock) == [
+        {'first_set': 1.0},
+        {'second_set': 2.0, 'first_set': 'reset'},
+        {'third_set': 3.0, 'second_set': 'reset'}
+    ]
+    assert default_scenario.remote_user_values == {'slider': 1.0, 'third_set': 3.0}
+
+
+def test_update_inputs_with_reset_sends_all_sliders(default_api, default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_api.scenario = default_scenario
+    mock_slider_responses(requests_mock, default_scenario.id)
+
+    default_scenario.user_values = {'slider': 1.0}
+    default_api.update_inputs(reset=True)
+
+    assert query_puts(requests_mock)[0].json() == {'scenario': {'user_values': {'slider': 1.0}}, 'reset': True}
+    assert default_scenario.remote_user_values == {'slider': 1.0}
+    assert not default_api.update_inputs()
+
+
+def test_clone_scenario(default_scenario, requests_mock):
+    default_scenario.id = 12345
+    default_scenario.setup_connection(SessionWithUrlBase(BASE_URL))
+    requests_mock.post(BASE_URL + '/scenarios', json={'id': 67890})
+
+    clone = default_scenario.clone(default_scenario.api.session, 'test_scen_clone_0')
+
+    assert requests_mock.last_request.json() == {'scenario': {
+        'scenario_id': 12345,
+        'title': 'Scenario-Tools Test Scenario (test_scen_clone_0)'
+    }}
+    assert clone.id == 67890
+    assert clone.short_name == 'test_scen_clone_0'
+    assert clone.area_code == default_scenario.area_code
+    assert clone.api.scenario is clone
+    assert default_scenario.id == 12345
@@ -0,0 +1,71 @@
+'''Tests for the FakeEngine, through the ETM_API'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.fake_engine import FakeEngine
+from helpers.Scenario import Scenario
+from helpers.settings import Settings
+from helpers.throttling import TokenBucket
+
+
+@pytest.fixture
+def scenario():
+    return Scenario(pd.Series({'short_name': 'load', 'title': 'Load test', 'area_code': 'nl', 'end_year': 2050}))
+
+
+@pytest.fixture
+def no_query_cache():
+    enabled = Settings.get('query_cache')
+    Settings.add('query_cache', False)
+    yield
+    Settings.add('query_cache', enabled)
+
+
+@pytest.fixture
+def quick_retries():
+    '''Retries without waiting, and without a rate limit'''
+    retries = Settings.get('retries')
+    Settings.add('retries', {'max_retries': 10, 'backoff_factor': 0})
+    TokenBucket.instance = TokenBucket()
+    yield
+    Settings.add('retries', retries)
+    TokenBucket.instance = None
+
+
+def test_scenario_workflow(scenario, no_query_cache):
+    with FakeEngine() as engine:
+        scenario.setup_connection(SessionWithUrlBase(engine.url))
+        scenario.user_values = {'slider': 50.0}
+        scenario.heat_network_orders = {'heat_network_order_lt': 'a b'}
+        scenario.api.update({})
+
+        assert scenario.api.get_scenario_settings() == {'slider': 50.0}
+        assert scenario.api.get_heat_network_orders(['heat_network_order_lt']).iloc[0, 0] == 'a b'
+
+        results = scenario.api.query(['dashboard_co2'])
+        assert results.loc['dashboard_co2', 'future'] == len('dashboard_co2') + 0.5
+
+        assert scenario.api.upload_custom_curve('interconnector_1_price', np.arange(8760.0), 'prices')
+        assert scenario.api.get_attached_curve_keys() == ['interconnector_1_price']
+        assert scenario.api.get_custom_curves()['interconnector_1_price'].sum() == np.arange(8760.0).sum()
+
+        assert len(scenario.api.get_data_download('merit_order.csv', hourly=True)) == 8760
+
+        clone = scenario.clone(scenario.api.session, 'load_clone')
+        assert clone.api.get_scenario_settings() == {'slider': 50.0}
+
+
+def test_throttled_requests_are_retried(scenario, quick_retries):
+    with FakeEngine(throttle_rate=0.5, retry_after=0, seed=1) as engine:
+        scenario.id = engine.create_scenario({})['id']
+        scenario.setup_connection(SessionWithUrlBase(engine.url))
+
+        for value in range(10):
+            scenario.user_values = {'slider': float(value)}
+            scenario.api.update_inputs()
+
+        assert engine.scenarios[scenario.id]['user_values'] == {'slider': 9.0}
+        assert engine.counts['throttled'] > 0
@@ -0,0 +1,48 @@
+import csv
+
+from generate_input import process_data
+
+
+def write_rows(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def all_var_row(index, kind, value, special, database_item):
+    row = [''] * 21
+    row[0], row[1], row[12], row[19], row[20] = str(index), kind, value, special, database_item
+    return row
+
+
+def test_process_data(tmp_path):
+    write_rows(tmp_path / 'all_var.csv', [
+        ['header'] * 21,
+        all_var_row(1, 'Static', '50%', '', 'static_input'),
+        all_var_row(2, 'Static', '10', 'special', 'special_input'),
+        all_var_row(3, 'Variable', '', '', 'variable_input'),
+        all_var_row(4, 'Variable', '', '', 'other_variable_input')
+    ])
+    write_rows(tmp_path / 'param_encoding.csv', [
+        ['var'] + [f's{k}' for k in range(11)],
+        ['3'] + [f' {k}.5 ' for k in range(11)],
+        ['not a number'] + ['1'] * 11,
+        ['4'] + [str(k) for k in range(11)]
+    ])
+
+    process_data(tmp_path / 'all_var.csv', tmp_path / 'param_encoding.csv', output_dir=tmp_path / 'input')
+
+    scenario_list = read_rows(tmp_path / 'input' / 'scenario_list.csv')
+    assert [row[0] for row in scenario_list[1:]] == [f'sample_{k}' for k in range(11)]
+    assert scenario_list[1][-2:] == ['FALSE', '']
+
+    settings = read_rows(tmp_path / 'input' / 'scenario_settings.csv')
+    assert settings[0][:4] == ['input', 'sample_0', 'sample_1', 'sample_10']
+    assert settings[1][:4] == ['static_input', '50.0', '50.0', '50.0']
+    assert settings[2][:4] == ['variable_input', '0.5', '1.5', '10.5']
+    assert settings[3][:4] == ['other_variable_input', '0', '1', '10']
+    assert len(settings) == 4
@@ -0,0 +1,103 @@
+import os
+import shutil
+import numpy as np
+from pathlib import Path
+
+from helpers.settings import Settings
+from helpers.Curves import Curve
+from helpers import heat_curve_cache
+from helpers.heat_curve_cache import HeatCurveCache
+from helpers.heat_demand.weather_years_profile_generator import WeatherYearsGenerator
+
+FIXTURES = Path('tests/fixtures/heat_demand')
+
+
+def curves(value=1.0):
+    return [Curve('a', np.full(8760, value)), Curve('b', np.arange(8760, dtype=float))]
+
+
+def test_put_and_get(tmp_path):
+    cache = HeatCurveCache(tmp_path)
+    cache.put('abc', curves())
+
+    cached = cache.get('abc')
+
+    assert [curve.key for curve in cached] == ['a', 'b']
+    np.testing.assert_array_equal(cached[1].data, np.arange(8760))
+    assert cache.get('def') is None
+
+
+def test_key_changes_with_input_files(tmp_path):
+    folder = tmp_path / 'weather'
+    shutil.copytree(FIXTURES, folder)
+    cache = HeatCurveCache(tmp_path / 'cache')
+
+    key = cache.key(folder)
+    assert cache.key(folder) == key
+
+    with open(folder / 'temperature.csv', 'a') as file:
+        file.write('1.0\n')
+
+    assert cache.key(folder) != key
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = HeatCurveCache(tmp_path)
+    cache.put('old', curves(1.0))
+    cache.put('new', curves(2.0))
+    os.utime(tmp_path / 'old.npz', (0, 0))
+
+    size = (tmp_path / 'new.npz').stat().st_size
+    cache.evict(1.5 * size / 1024 / 1024)
+
+    assert [entry['key'] for entry in cache.entries()] == ['new']
+
+
+def test_keeps_stored_entry_larger_than_the_cache(tmp_path):
+    cache = HeatCurveCache(tmp_path, max_size_mb=0.01)
+    cache.put('old', curves(1.0))
+    cache.put('new', curves(2.0))
+
+    assert [entry['key'] for entry in cache.entries()] == ['new']
+    assert cache.get('new') is not None
+
+
+def test_entries_removed_by_another_process_are_misses(tmp_path, monkeypatch):
+    cache = HeatCurveCache(tmp_path)
+    cache.put('abc', curves())
+    load = np.load
+
+    def evicted_meanwhile(path):
+        Path(path).unlink()
+        return load(path)
+
+    monkeypatch.setattr(heat_curve_cache.np, 'load', evicted_meanwhile)
+
+    assert not cache.entries()
+    cache.put('abc', curves())
+    assert cache.get('abc') is None
+
+
+def test_purge(tmp_path):
+    cache = HeatCurveCache(tmp_path)
+    cache.put('abc', curves())
+
+    assert cache.purge() == 1
+    assert not cache.entries()
+
+
+def test_scenario_uses_cached_curves(default_scenario, monkeypatch):
+    Settings.add('input_curves_folder', 'tests/fixtures/')
+
+    default_scenario.set_heat_demand_curves()
+    generated = list(default_scenario.heat_demand_curves)
+
+    def fail(_):
+        raise AssertionError('Profiles should come from the cache')
+
+    monkeypatch.setattr(WeatherYearsGenerator, 'generate_all_profiles', fail)
+    default_scenario.set_heat_demand_curves()
+
+    cached = list(default_scenario.heat_demand_curves)
+    assert [curve.key for curve in cached] == [curve.key for curve in generated]
+    np.testing.assert_array_equal(cached[0].data, generated[0].data)
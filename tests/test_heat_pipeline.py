@@ -0,0 +1,53 @@
+'''Tests for the HeatCurvePipeline'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.heat_pipeline import HeatCurvePipeline
+from helpers.Scenario import Scenario
+
+
+def heat_demand_scenarios(count):
+    return [
+        Scenario(pd.Series({'short_name': f'scenario_{n}', 'heat_demand': 'heat_demand'}))
+        for n in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def heat_demand_inputs(settings):
+    '''Generates the curves from the fixtures, without the heat curve cache'''
+    settings('input_curves_folder', 'tests/fixtures/')
+    settings('heat_curve_cache', False)
+
+
+def test_pipeline_generates_the_same_curves(default_scenario):
+    default_scenario.set_heat_demand_curves()
+    expected = {curve.key: curve.data for curve in default_scenario.heat_demand_curves}
+
+    scenarios = heat_demand_scenarios(3)
+    with HeatCurvePipeline(scenarios, workers=2) as pipeline:
+        for scenario in scenarios:
+            curves = {curve.key: curve.data for curve in pipeline.curves(scenario)}
+
+            assert curves.keys() == expected.keys()
+            for key, data in curves.items():
+                np.testing.assert_array_equal(data, expected[key])
+
+
+def test_pipeline_closes_with_unclaimed_curves():
+    scenarios = heat_demand_scenarios(4)
+    with HeatCurvePipeline(scenarios, workers=1, lookahead=1) as pipeline:
+        curves = pipeline.curves(scenarios[0])
+        assert len(curves) == 12
+
+    # The curves can be iterated again, e.g. when an update is retried
+    assert len(list(curves)) == 12
+
+    # Scenarios that were not generated get no curves
+    assert pipeline.curves(scenarios[3]) == []
+
+
+def test_pipeline_is_disabled_by_default(default_scenario):
+    assert HeatCurvePipeline.from_settings([default_scenario]) is None
@@ -0,0 +1,49 @@
+import time
+
+from helpers.json_log import scenario_key
+from helpers.query_cache import QueryCache
+
+PRO = scenario_key('https://engine.energytransitionmodel.com/api/v3', 12345)
+BETA = scenario_key('https://beta.engine.energytransitionmodel.com/api/v3', 12345)
+
+
+def test_cache_is_kept_between_runs(tmp_path):
+    path = tmp_path / 'query_cache.jsonl'
+    cache = QueryCache(path)
+    cache.store(PRO, 'abc', {'q': 1})
+    cache.store(PRO, 'abc', {'qq': 2})
+
+    assert QueryCache(path).lookup(PRO, 'abc', ['q', 'qq', 'qqq']) == {'q': 1, 'qq': 2}
+    assert not QueryCache(path).lookup(PRO, 'def', ['q'])
+
+
+def test_cache_keeps_engines_apart(tmp_path):
+    cache = QueryCache(tmp_path / 'query_cache.jsonl')
+    cache.store(PRO, 'abc', {'q': 1})
+
+    assert not cache.lookup(BETA, 'abc', ['q'])
+
+
+def test_cache_appends_and_drops_superseded_results(tmp_path):
+    path = tmp_path / 'query_cache.jsonl'
+    cache = QueryCache(path)
+    cache.store(PRO, 'abc', {'q': 1})
+    cache.store(PRO, 'def', {'q': 2})
+    cache.store(PRO, 'def', {'qq': 3})
+
+    assert len(path.read_text().splitlines()) == 3
+
+    # Opening the cache in a next run keeps only the current results
+    assert QueryCache(path).lookup(PRO, 'def', ['q', 'qq']) == {'q': 2, 'qq': 3}
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_expired_results_are_dropped(tmp_path):
+    path = tmp_path / 'query_cache.jsonl'
+    cache = QueryCache(path)
+    cache.store(PRO, 'abc', {'q': 1})
+    cache.entries[PRO]['stored_at'] = time.time() - 7200
+    cache.log.rewrite([{'scenario': PRO, **cache.entries[PRO]}])
+
+    assert not QueryCache(path, max_age=1).entries
+    assert not path.read_text()
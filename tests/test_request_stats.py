@@ -0,0 +1,70 @@
+'''Tests for the RequestStats'''
+
+import pytest
+
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.request_stats import RequestStats, endpoint_template
+
+BASE_URL = 'http://fake.session'
+
+
+@pytest.fixture
+def request_stats(settings):
+    settings('request_stats', True)
+    RequestStats.instance = None
+    yield RequestStats.shared()
+    RequestStats.instance = None
+
+
+@pytest.mark.parametrize('url, template', [
+    ('/scenarios', '/scenarios'),
+    ('/scenarios/12345', '/scenarios/{id}'),
+    ('/scenarios/12345/custom_curves?include_internal=true', '/scenarios/{id}/custom_curves'),
+    ('/scenarios/12345/custom_curves/weather/insulation_low', '/scenarios/{id}/custom_curves/{key}'),
+    ('/scenarios/12345/custom_curves/interconnector_1_price.csv', '/scenarios/{id}/custom_curves/{key}'),
+    ('/scenarios/12345/curves/merit_order.csv', '/scenarios/{id}/curves/{download}'),
+    ('/scenarios/12345/heat_network_order', '/scenarios/{id}/heat_network_order')
+])
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+
+def test_requests_are_recorded(request_stats, requests_mock):
+    requests_mock.get(BASE_URL + '/scenarios/1', json={'id': 1})
+    requests_mock.get(BASE_URL + '/scenarios/2', json={'id': 2})
+    requests_mock.put(BASE_URL + '/scenarios/1', json={}, status_code=422)
+
+    session = SessionWithUrlBase(BASE_URL)
+    session.get('/scenarios/1')
+    session.get('/scenarios/2')
+    session.put('/scenarios/1', json={'scenario': {}})
+
+    df = request_stats.to_frame().set_index('method')
+
+    assert df.loc['GET', 'endpoint'] == '/scenarios/{id}'
+    assert df.loc['GET', 'requests'] == 2
+    assert df.loc['GET', 'errors'] == 0
+    assert df.loc['GET', 'response_bytes'] == 2 * len(b'{"id": 1}')
+    assert df.loc['PUT', 'errors'] == 1
+    assert df.loc['PUT', 'request_bytes'] == len(b'{"scenario": {}}')
+    assert df.loc['GET', 'p50_ms'] <= df.loc['GET', 'p99_ms']
+
+
+def test_report_is_written(request_stats, requests_mock, tmp_path):
+    requests_mock.get(BASE_URL + '/scenarios/1', json={})
+    SessionWithUrlBase(BASE_URL).get('/scenarios/1')
+
+    path = request_stats.export(tmp_path / 'request_stats.csv')
+
+    assert path.read_text().startswith('method,endpoint,requests,errors,p50_ms')
+    assert '/scenarios/{id}' in request_stats.summary()
+
+
+def test_nothing_is_recorded_when_disabled(requests_mock):
+    requests_mock.get(BASE_URL + '/scenarios/1', json={})
+
+    session = SessionWithUrlBase(BASE_URL)
+    session.get('/scenarios/1')
+
+    assert session.request_stats is None
+    assert RequestStats.instance is None
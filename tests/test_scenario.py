@@ -1,4 +1,5 @@
 
+import time
 import pytest
 import pandas as pd
 from unittest import mock
@@ -112,3 +113,37 @@ def test_query_and_export(monkeypatch):
     assert 'DE_Germany' in outcome.columns
     assert len(outcome.columns) == 4
     outcome_path.unlink()
+
+
+def test_process_keeps_collection_order():
+    collection = ScenarioCollection([
+        Scenario(pd.Series({'short_name': f'scen_{i}'})) for i in range(8)
+    ])
+
+    def pipeline(scenario):
+        # Let the first scenarios finish last
+        time.sleep(0.01 * (8 - int(scenario.short_name.split('_')[-1])))
+        return scenario.short_name
+
+    results = list(collection.process(pipeline, workers=4))
+
+    assert [scenario.short_name for scenario, _ in results] == [f'scen_{i}' for i in range(8)]
+    assert [result for _, result in results] == [f'scen_{i}' for i in range(8)]
+
+
+def test_process_stops_on_fatal_error():
+    collection = ScenarioCollection([
+        Scenario(pd.Series({'short_name': f'scen_{i}'})) for i in range(20)
+    ])
+    processed = []
+
+    def pipeline(scenario):
+        if scenario.short_name == 'scen_1':
+            raise SystemExit()
+        time.sleep(0.01)
+        processed.append(scenario.short_name)
+
+    with pytest.raises(SystemExit):
+        list(collection.process(pipeline, workers=2))
+
+    assert len(processed) < 19
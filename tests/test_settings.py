@@ -1,3 +1,4 @@
+import pytest
 from unittest.mock import patch
 from pathlib import Path
 
@@ -14,9 +15,16 @@ def test_add_setting():
     assert Settings.get('new_setting') == 'my_value'
 
 
-def test_local_settings():
-    # Hack the current settings away so we can patch the fixture
+@pytest.fixture
+def fresh_settings():
+    '''Hacks the current settings away so we can patch the fixture, and restores them afterwards'''
+    instance = Settings.instance
     Settings.instance = None
+    yield
+    Settings.instance = instance
+
+
+def test_local_settings(fresh_settings):
 
     with patch('helpers.settings.BASE_PATH', Path('tests/fixtures/config')):
         assert Settings.get('local_engine_url') is not None
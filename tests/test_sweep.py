@@ -0,0 +1,88 @@
+import re
+import pytest
+import pandas as pd
+
+from helpers.ETM_API import SessionWithUrlBase
+from helpers.Scenario import Scenario
+from helpers.sweep import SweepPool, SweepResults, SweepRunner
+
+BASE_URL = 'http://fake.session'
+
+
+@pytest.fixture
+def template():
+    return Scenario(pd.Series({
+        'short_name': 'sample', 'title': 'Scenario_sample', 'area_code': 'nl', 'end_year': 2050
+    }))
+
+
+@pytest.fixture
+def fake_engine(requests_mock):
+    '''An engine that creates scenarios, and answers the query 'slider' with its value'''
+    state = {'next_id': 100, 'user_values': {}, 'resets': 0}
+
+    def create(request, context):
+        state['next_id'] += 1
+        return {'id': state['next_id'], 'end_year': 2050}
+
+    def put(request, context):
+        scenario_id = int(request.path.split('/')[-1])
+        body = request.json()
+
+        if 'gqueries' in body:
+            return {'gqueries': {
+                query: {'present': 0, 'future': state['user_values'][scenario_id].get(query), 'unit': 'PJ'}
+                for query in body['gqueries']
+            }}
+
+        if body.get('reset'):
+            state['resets'] += 1
+        state['user_values'][scenario_id] = body['scenario']['user_values']
+        return {}
+
+    requests_mock.post(BASE_URL + '/scenarios', json=create)
+    requests_mock.put(re.compile(BASE_URL + r'/scenarios/\d+$'), json=put)
+
+    return state
+
+
+def test_pool_is_created_once(template, fake_engine, requests_mock, tmp_path):
+    session = SessionWithUrlBase(BASE_URL)
+
+    pool = SweepPool.load_or_create(session, template, 2, tmp_path / 'pool.csv')
+    assert [scenario.id for scenario in pool.scenarios] == [101, 102]
+
+    pool = SweepPool.load_or_create(session, template, 3, tmp_path / 'pool.csv')
+    assert [scenario.id for scenario in pool.scenarios] == [101, 102, 103]
+    assert requests_mock.call_count == 3
+
+
+def test_sweep_runs_samples_on_the_pool(template, fake_engine, tmp_path):
+    pool = SweepPool.load_or_create(SessionWithUrlBase(BASE_URL), template, 2, tmp_path / 'pool.csv')
+    results = SweepResults(tmp_path / 'results.csv', ['slider'])
+    samples = {f'sample_{k}': {'slider': float(k)} for k in range(6)}
+
+    done = list(SweepRunner(pool, ['slider'], results).run(samples))
+
+    assert sorted(done) == sorted(samples)
+    assert fake_engine['resets'] == 6
+    assert results.to_frame()['slider'].to_dict() == {name: values['slider'] for name, values in samples.items()}
+
+
+def test_sweep_resumes_after_crash(template, fake_engine, tmp_path):
+    (tmp_path / 'results.csv').write_text('sample,slider\nsample_0,0.0\nsample_1,1')
+    pool = SweepPool.load_or_create(SessionWithUrlBase(BASE_URL), template, 1, tmp_path / 'pool.csv')
+    results = SweepResults(tmp_path / 'results.csv', ['slider'])
+    samples = {f'sample_{k}': {'slider': float(k)} for k in range(3)}
+
+    done = list(SweepRunner(pool, ['slider'], results).run(samples))
+
+    assert done == ['sample_1', 'sample_2']
+    assert list(results.to_frame().index) == ['sample_0', 'sample_1', 'sample_2']
+
+
+def test_results_of_other_queries_are_not_mixed(tmp_path):
+    (tmp_path / 'results.csv').write_text('sample,other_query\nsample_0,0.0\n')
+
+    with pytest.raises(ValueError):
+        SweepResults(tmp_path / 'results.csv', ['slider'])
@@ -0,0 +1,56 @@
+'''Tests for the TemplateCollection'''
+
+import pandas as pd
+import pytest
+
+from helpers.settings import Settings
+from helpers.Template import Template, TemplateCollection
+
+
+@pytest.fixture
+def output_folder(tmp_path):
+    folder = Settings.get('output_file_folder')
+    Settings.add('output_file_folder', str(tmp_path))
+    yield tmp_path
+    Settings.add('output_file_folder', folder)
+
+
+@pytest.fixture
+def templates():
+    first = Template(pd.Series({'id': 1, 'title': 'first'}))
+    first.add_user_values({'slider_a': 1.0, 'slider_b': 2.5})
+    second = Template(pd.Series({'id': 2, 'title': 'second'}))
+    second.add_user_values({'slider_c': 3.0, 'slider_a': 4.0, 'enum_input': 'gas'})
+
+    return TemplateCollection([first, second])
+
+
+def test_to_frame(templates):
+    df = templates.to_frame()
+
+    assert df.index.tolist() == ['slider_a', 'slider_b', 'slider_c', 'enum_input']
+    assert df.columns.tolist() == [('first', 1), ('second', 2)]
+    assert df[('first', 1)].dtype == float
+    assert pd.isna(df.loc['slider_c', ('first', 1)])
+    assert df.loc['enum_input', ('second', 2)] == 'gas'
+
+
+def test_to_csv(templates, output_folder):
+    templates.to_csv('template_settings')
+
+    df = pd.read_csv(output_folder / 'template_settings.csv', header=[0, 1], index_col=0)
+
+    assert df.columns.tolist() == [('first', '1'), ('second', '2')]
+    assert pd.to_numeric(df.loc['slider_a']).tolist() == [1.0, 4.0]
+    assert pd.isna(df.loc['slider_b', ('second', '2')])
+
+
+def test_to_parquet(templates, output_folder):
+    pytest.importorskip('pyarrow')
+    templates.to_parquet('template_settings')
+
+    df = pd.read_parquet(output_folder / 'template_settings.parquet')
+
+    assert df.columns.tolist() == [('first', '1'), ('second', '2')]
+    assert df.loc['slider_b', ('first', '1')] == 2.5
+    assert df.loc['enum_input', ('second', '2')] == 'gas'
@@ -0,0 +1,52 @@
+import time
+import pytest
+from email.utils import formatdate
+
+from helpers.throttling import TokenBucket, RetryPolicy, parse_retry_after
+
+
+def test_token_bucket_allows_burst_then_limits():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    waits = [bucket.reserve() for _ in range(7)]
+
+    assert waits[:5] == [0.0] * 5
+    assert waits[5] == pytest.approx(0.01, abs=0.005)
+    assert waits[6] == pytest.approx(0.02, abs=0.005)
+
+
+def test_token_bucket_without_rate_does_not_limit():
+    bucket = TokenBucket()
+
+    assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket()
+    bucket.pause(2)
+
+    assert bucket.reserve() == pytest.approx(2, abs=0.1)
+
+
+def test_retry_policy():
+    policy = RetryPolicy(max_retries=2, backoff_factor=1, max_backoff=3)
+
+    assert policy.should_retry('get', 503, 0)
+    assert policy.should_retry('PUT', 429, 1)
+    assert not policy.should_retry('PUT', 429, 2)
+    assert not policy.should_retry('POST', 503, 0)
+    assert not policy.should_retry('GET', 422, 0)
+
+    assert 0 <= policy.delay(5, {}) <= 3
+    assert policy.delay(0, {'Retry-After': '2'}) == 2
+    assert policy.delay(0, {'Retry-After': '7'}) == 3
+    assert policy.delay(0, {'Retry-After': formatdate(time.time() + 10 ** 9, usegmt=True)}) == 3
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('inf') is None
+    assert parse_retry_after('nan') is None
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
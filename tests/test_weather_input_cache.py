@@ -0,0 +1,75 @@
+import os
+import pytest
+import numpy as np
+
+from helpers.settings import Settings
+from helpers.heat_file_utils import read_heat_demand_array, read_heat_demand_input, read_thermostat
+from helpers.weather_input_cache import WeatherInputCache
+
+
+def parse(path):
+    return np.loadtxt(path)
+
+
+def test_load_counts_hits_and_misses(tmp_path):
+    path = tmp_path / 'curve.csv'
+    np.savetxt(path, np.arange(10.0))
+    cache = WeatherInputCache()
+
+    first = cache.load(path, parse)
+    second = cache.load(path, parse)
+
+    assert first is second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_load_returns_read_only_arrays(tmp_path):
+    path = tmp_path / 'curve.csv'
+    np.savetxt(path, np.arange(10.0))
+
+    curve = WeatherInputCache().load(path, parse)
+
+    with pytest.raises(ValueError):
+        curve[0] = 1.0
+
+
+def test_load_parses_changed_file_again(tmp_path):
+    path = tmp_path / 'curve.csv'
+    np.savetxt(path, np.arange(10.0))
+    cache = WeatherInputCache()
+    cache.load(path, parse)
+
+    np.savetxt(path, np.arange(20.0))
+    os.utime(path, ns=(0, 0))
+
+    assert cache.load(path, parse).size == 20
+    assert cache.misses == 2
+
+
+def test_evicts_least_recently_used(tmp_path):
+    paths = [tmp_path / f'{name}.csv' for name in 'abc']
+    for path in paths:
+        np.savetxt(path, np.arange(10.0))
+
+    cache = WeatherInputCache(max_entries=2)
+    for path in paths:
+        cache.load(path, parse)
+
+    cache.load(paths[0], parse)
+
+    assert cache.misses == 4
+
+
+def test_heat_file_utils_share_parsed_inputs():
+    Settings.add('input_curves_folder', 'tests/fixtures/')
+    cache = WeatherInputCache.shared()
+    cache.clear()
+
+    temperature = read_heat_demand_array('heat_demand', 'temperature')
+    series = read_heat_demand_input('heat_demand', 'temperature')
+    read_thermostat('heat_demand')
+    read_thermostat('heat_demand')
+
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert not temperature.flags.writeable
+    np.testing.assert_array_equal(series.to_numpy(), temperature)